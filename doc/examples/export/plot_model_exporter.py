@@ -8,8 +8,8 @@ Export a function as Modelica model
 # to export OpenTURNS functions, but this time as Modelica model.
 # This can be useful if you want to include a function produced with OpenTURNS
 # into a Modelica model.
-# Compared to `export_fmu`, here, you cannot export models with time-dependent
-# outputs.
+# Models with time-dependent outputs can only be exported with the "cxx" mode,
+# the outputs are then interpolated at the simulation time.
 
 # One application of the inclusion of a metamodel in
 # `OpenModelica GUI <https://openmodelica.org/?id=78:omconnectioneditoromedit&catid=10:main-category>`_
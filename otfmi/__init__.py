@@ -10,11 +10,30 @@ from .otfmi import (
     FMUFieldFunction,
     OpenTURNSFMUFieldFunction,
 )
-from .function_exporter import FunctionExporter
 from .mo2fmu import mo2fmu
+from .registry import FMUHandle
 
-__all__ = [FMUFunction, OpenTURNSFMUFunction,
-           FMUPointToFieldFunction, OpenTURNSFMUPointToFieldFunction,
-           FMUFieldToPointFunction, OpenTURNSFMUFieldToPointFunction,
-           FMUFieldFunction, OpenTURNSFMUFieldFunction,
-           FunctionExporter, mo2fmu]
+__all__ = ["FMUFunction", "OpenTURNSFMUFunction",
+           "FMUPointToFieldFunction", "OpenTURNSFMUPointToFieldFunction",
+           "FMUFieldToPointFunction", "OpenTURNSFMUFieldToPointFunction",
+           "FMUFieldFunction", "OpenTURNSFMUFieldFunction",
+           "FunctionExporter", "export_batch", "mo2fmu", "FMUPool", "FMUHandle"]
+
+# the exporter and its dependencies (dill, jinja2, pythonfmu) and the
+# multiprocessing machinery are only imported on first access, so that
+# simulating fmus does not pay for them
+_lazy_attributes = {"FunctionExporter": ".function_exporter", "export_batch": ".function_exporter", "FMUPool": ".pool"}
+
+
+def __getattr__(name):
+    if name in _lazy_attributes:
+        import importlib
+
+        value = getattr(importlib.import_module(_lazy_attributes[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy_attributes))
@@ -0,0 +1,197 @@
+# Copyright 2016-2025 EDF Phimeca
+
+"""Content-addressed cache of the build artifacts of exported functions."""
+
+import functools
+import hashlib
+import os
+from pathlib import Path
+import shutil
+import subprocess
+import sys
+import tempfile
+
+
+def get_cache_dir():
+    """Get the build cache directory.
+
+    The directory is given by the OTFMI_CACHE_DIR environment variable,
+    by default the otfmi folder of the user cache directory
+    (~/.cache/otfmi on Linux).
+
+    Returns
+    -------
+    path : :class:`pathlib.Path`
+        Cache directory, which may not exist yet.
+    """
+    path = os.environ.get("OTFMI_CACHE_DIR")
+    if path:
+        return Path(path)
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA", Path.home() / "AppData" / "Local")
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")
+    return Path(base) / "otfmi"
+
+
+def get_max_size():
+    """Get the maximum size of the build cache.
+
+    The size is given in bytes by the OTFMI_CACHE_MAX_SIZE environment
+    variable, by default 2 GiB. The least recently used entries are removed
+    when a build is stored beyond this size, see :func:`prune`.
+
+    Returns
+    -------
+    size : int
+        Maximum size in bytes.
+    """
+    return int(os.environ.get("OTFMI_CACHE_MAX_SIZE", 2 << 30))
+
+
+@functools.lru_cache(maxsize=None)
+def tool_version(*args):
+    """Get the version of a build tool, run once per process.
+
+    Parameters
+    ----------
+    args : str
+        Command printing the version, for instance "cmake", "--version".
+
+    Returns
+    -------
+    version : str
+        Resolved path of the tool and first line of its output, empty if the
+        tool cannot be run.
+    """
+    path = shutil.which(args[0])
+    if path is None:
+        return ""
+    try:
+        cp = subprocess.run([path] + list(args[1:]), capture_output=True, timeout=60)
+    except (OSError, subprocess.SubprocessError):
+        return path
+    lines = (cp.stdout + cp.stderr).decode(errors="replace").splitlines()
+    return f"{os.path.realpath(path)} {lines[0] if lines else ''}"
+
+
+def compute_key(*parts):
+    """Hash the description of a build.
+
+    Parameters
+    ----------
+    parts : str or bytes
+        Everything the artifacts depend on: sources, options, tool versions.
+
+    Returns
+    -------
+    key : str
+        Hexadecimal SHA-256 digest.
+    """
+    sha = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode()
+        sha.update(len(data).to_bytes(8, "little"))
+        sha.update(data)
+    return sha.hexdigest()
+
+
+def _entry(key):
+    return get_cache_dir() / key[:2] / key
+
+
+def lookup(key, destination):
+    """Copy the artifacts of a build from the cache.
+
+    Parameters
+    ----------
+    key : str
+        Key of the build, see :func:`compute_key`.
+
+    destination : str or path-like
+        Directory the artifacts are copied to.
+
+    Returns
+    -------
+    names : list of str or None
+        Names of the copied files, None if the build is not cached.
+    """
+    entry = _entry(key)
+    try:
+        names = sorted(os.listdir(entry))
+        for name in names:
+            shutil.copy2(entry / name, Path(destination) / name)
+        # the modification time of the entry is its last use, see prune
+        os.utime(entry)
+    except OSError:
+        return None
+    return names
+
+
+def store(key, paths):
+    """Store the artifacts of a build in the cache.
+
+    The entry is written in a temporary directory and then renamed, so that
+    concurrent exports never read a partial entry. Errors are ignored: the
+    cache is only an optimization. The cache is then pruned to its maximum
+    size, see :func:`get_max_size`.
+
+    Parameters
+    ----------
+    key : str
+        Key of the build, see :func:`compute_key`.
+
+    paths : sequence of str or path-like
+        Artifact files.
+    """
+    entry = _entry(key)
+    if entry.exists():
+        return
+    temp = None
+    try:
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        temp = tempfile.mkdtemp(prefix=".tmp_", dir=entry.parent)
+        for path in paths:
+            shutil.copy2(path, Path(temp) / Path(path).name)
+        os.rename(temp, entry)
+    except OSError:
+        # another process stored the same entry first, or the cache is not writable
+        if temp is not None:
+            shutil.rmtree(temp, ignore_errors=True)
+        return
+    prune()
+
+
+def prune(max_size=None):
+    """Remove the least recently used entries exceeding the cache size.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        Maximum size in bytes, by default :func:`get_max_size`.
+    """
+    if max_size is None:
+        max_size = get_max_size()
+    entries = []
+    for entry in get_cache_dir().glob("*/*"):
+        if entry.name.startswith(".tmp_"):
+            continue
+        try:
+            size = sum(path.stat().st_size for path in entry.iterdir())
+            entries.append((entry.stat().st_mtime, size, entry))
+        except OSError:
+            # removed by another process
+            continue
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in sorted(entries):
+        if total <= max_size:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+
+
+def clear():
+    """Remove all the cached artifacts."""
+    shutil.rmtree(get_cache_dir(), ignore_errors=True)
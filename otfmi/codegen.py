@@ -0,0 +1,375 @@
+# Copyright 2016-2025 EDF Phimeca
+
+"""Generation of dependency-free C code evaluating OpenTURNS functions."""
+
+import re
+import openturns as ot
+
+# C functions of the symbolic formulas: name -> (C expression, number of arguments or None if variadic)
+_FUNCTIONS = {
+    "sin": ("sin({0})", 1), "cos": ("cos({0})", 1), "tan": ("tan({0})", 1),
+    "asin": ("asin({0})", 1), "acos": ("acos({0})", 1), "atan": ("atan({0})", 1),
+    "sinh": ("sinh({0})", 1), "cosh": ("cosh({0})", 1), "tanh": ("tanh({0})", 1),
+    "asinh": ("asinh({0})", 1), "acosh": ("acosh({0})", 1), "atanh": ("atanh({0})", 1),
+    "sec": ("(1.0 / cos({0}))", 1), "csc": ("(1.0 / sin({0}))", 1), "cot": ("(1.0 / tan({0}))", 1),
+    "exp": ("exp({0})", 1), "expm1": ("expm1({0})", 1),
+    "log": ("log({0})", 1), "ln": ("log({0})", 1), "log10": ("log10({0})", 1), "log2": ("log2({0})", 1),
+    "log1p": ("log1p({0})", 1), "sqrt": ("sqrt({0})", 1), "cbrt": ("cbrt({0})", 1),
+    "abs": ("fabs({0})", 1), "floor": ("floor({0})", 1), "ceil": ("ceil({0})", 1),
+    "trunc": ("trunc({0})", 1), "round": ("round({0})", 1), "frac": ("otfmi_frac({0})", 1),
+    "sign": ("otfmi_sign({0})", 1), "erf": ("erf({0})", 1), "erfc": ("erfc({0})", 1),
+    "atan2": ("atan2({0}, {1})", 2), "pow": ("pow({0}, {1})", 2), "hypot": ("hypot({0}, {1})", 2),
+    "if": ("(({0}) != 0.0 ? ({1}) : ({2}))", 3),
+    "min": ("fmin", None), "max": ("fmax", None), "sum": ("+", None), "avg": ("avg", None),
+}
+
+_CONSTANTS = {"pi_": "3.14159265358979323846", "e_": "2.71828182845904523536"}
+
+# number, name or operator
+_TOKEN = re.compile(r"\s*(?:(\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)"
+                    r"|([A-Za-z_]\w*)|(<=|>=|==|!=|&&|\|\||[-+*/%^(),<>=?:]))")
+
+# helpers of the generated code, by name
+_HELPERS = {
+    "otfmi_sign": "static double otfmi_sign(double x)\n{\n  return (x > 0.0) - (x < 0.0);\n}\n",
+    "otfmi_frac": "static double otfmi_frac(double x)\n{\n  return x - trunc(x);\n}\n",
+}
+
+
+class _FormulaTranslator:
+    """Recursive descent translator of a symbolic formula into a C expression.
+
+    The precedences are the ones of the default OpenTURNS parser: "^" is
+    right associative and binds tighter than the unary operators.
+    """
+
+    def __init__(self, formula, variables):
+        self._formula = formula
+        self._variables = variables
+        self._tokens = []
+        position = 0
+        formula = formula.rstrip()
+        while position < len(formula):
+            match = _TOKEN.match(formula, position)
+            if match is None:
+                raise TypeError(f"Cannot generate C code for the formula {self._formula!r}")
+            number, name, operator = match.groups()
+            if number is not None:
+                self._tokens.append(("number", number))
+            elif name is not None:
+                self._tokens.append(("name", name))
+            else:
+                self._tokens.append(("operator", operator))
+            position = match.end()
+        self._position = 0
+
+    def translate(self):
+        expression = self._ternary()
+        if self._position != len(self._tokens):
+            self._error()
+        return expression
+
+    def _error(self):
+        raise TypeError(f"Cannot generate C code for the formula {self._formula!r}")
+
+    def _peek(self):
+        return self._tokens[self._position] if self._position < len(self._tokens) else (None, None)
+
+    def _accept(self, *operators):
+        kind, value = self._peek()
+        if kind in ["operator", "name"] and value in operators:
+            self._position += 1
+            return value
+        return None
+
+    def _expect(self, operator):
+        if self._accept(operator) is None:
+            self._error()
+
+    def _ternary(self):
+        condition = self._or()
+        if self._accept("?"):
+            first = self._ternary()
+            self._expect(":")
+            second = self._ternary()
+            return f"(({condition}) != 0.0 ? ({first}) : ({second}))"
+        return condition
+
+    def _or(self):
+        expression = self._and()
+        while self._accept("or", "||"):
+            expression = f"(double)(({expression}) != 0.0 || ({self._and()}) != 0.0)"
+        return expression
+
+    def _and(self):
+        expression = self._comparison()
+        while self._accept("and", "&&"):
+            expression = f"(double)(({expression}) != 0.0 && ({self._comparison()}) != 0.0)"
+        return expression
+
+    def _comparison(self):
+        expression = self._additive()
+        while True:
+            operator = self._accept("<", ">", "<=", ">=", "==", "!=", "=")
+            if operator is None:
+                return expression
+            operator = "==" if operator == "=" else operator
+            expression = f"(double)(({expression}) {operator} ({self._additive()}))"
+
+    def _additive(self):
+        expression = self._multiplicative()
+        while True:
+            operator = self._accept("+", "-")
+            if operator is None:
+                return expression
+            expression = f"{expression} {operator} {self._multiplicative()}"
+
+    def _multiplicative(self):
+        expression = self._unary()
+        while True:
+            operator = self._accept("*", "/", "%")
+            if operator is None:
+                return expression
+            if operator == "%":
+                expression = f"fmod({expression}, {self._unary()})"
+            else:
+                expression = f"{expression} {operator} {self._unary()}"
+
+    def _unary(self):
+        operator = self._accept("-", "+")
+        if operator is not None:
+            return f"({operator}{self._unary()})"
+        return self._power()
+
+    def _power(self):
+        base = self._primary()
+        if self._accept("^"):
+            exponent = self._unary()
+            return f"pow({base}, {exponent})"
+        return base
+
+    def _primary(self):
+        kind, value = self._peek()
+        self._position += 1
+        if kind == "number":
+            return repr(float(value))
+        if kind == "operator" and value == "(":
+            expression = self._ternary()
+            self._expect(")")
+            return f"({expression})"
+        if kind != "name":
+            self._error()
+        if self._accept("("):
+            arguments = [self._ternary()]
+            while self._accept(","):
+                arguments.append(self._ternary())
+            self._expect(")")
+            return self._call(value, arguments)
+        if value in self._variables:
+            return f"x[{self._variables.index(value)}]"
+        if value in _CONSTANTS:
+            return _CONSTANTS[value]
+        self._error()
+
+    def _call(self, name, arguments):
+        if name not in _FUNCTIONS:
+            self._error()
+        template, size = _FUNCTIONS[name]
+        if size is not None:
+            if len(arguments) != size:
+                self._error()
+            return template.format(*arguments)
+        if template in ["fmin", "fmax"]:
+            expression = arguments[0]
+            for argument in arguments[1:]:
+                expression = f"{template}({expression}, {argument})"
+            return expression
+        expression = "(" + " + ".join(f"({argument})" for argument in arguments) + ")"
+        return expression if template == "+" else f"({expression} / {len(arguments)}.0)"
+
+
+def translate_formula(formula, variables):
+    """Translate a symbolic formula into a C expression.
+
+    Parameters
+    ----------
+    formula : str
+        Formula in the syntax of :class:`openturns.SymbolicFunction`.
+
+    variables : sequence of str
+        Input variables, read from the x array.
+
+    Returns
+    -------
+    expression : str
+        C expression, using the functions of math.h.
+    """
+    return _FormulaTranslator(formula, list(variables)).translate()
+
+
+def _format_array(values):
+    return "{" + ", ".join(repr(float(value)) for value in values) + "}"
+
+
+class _Generator:
+    """Generate one C function per node of the evaluation tree."""
+
+    def __init__(self):
+        self._functions = []
+
+    def _add(self, body, tables=""):
+        name = f"otfmi_node{len(self._functions)}"
+        code = f"{tables}static void {name}(const double *x, double *y)\n{{\n{body}}}\n"
+        self._functions.append(code)
+        return name
+
+    def evaluation(self, evaluation):
+        """Generate the code of an evaluation, return the name of its C function."""
+        if hasattr(evaluation, "getImplementation"):
+            evaluation = evaluation.getImplementation()
+        if not hasattr(evaluation, "getClassName"):
+            # Python evaluations are not wrapped
+            raise TypeError("Cannot generate C code for a Python function")
+        class_name = evaluation.getClassName()
+        input_dim = evaluation.getInputDimension()
+        output_dim = evaluation.getOutputDimension()
+        if class_name == "SymbolicEvaluation":
+            variables = list(evaluation.getInputDescription())
+            body = "".join(f"  y[{i}] = {translate_formula(formula, variables)};\n"
+                           for i, formula in enumerate(evaluation.getFormulas()))
+            return self._add(body)
+        if class_name == "LinearEvaluation":
+            center = evaluation.getCenter()
+            constant = evaluation.getConstant()
+            linear = evaluation.getLinear()
+            body = ""
+            for j in range(output_dim):
+                terms = [repr(constant[j])]
+                terms += [f"{linear[i, j]!r} * (x[{i}] - {center[i]!r})" for i in range(input_dim) if linear[i, j] != 0.0]
+                body += f"  y[{j}] = {' + '.join(terms)};\n"
+            return self._add(body)
+        if class_name == "ComposedEvaluation":
+            right = self.evaluation(evaluation.getRightEvaluation())
+            left = self.evaluation(evaluation.getLeftEvaluation())
+            middle_dim = evaluation.getRightEvaluation().getOutputDimension()
+            body = f"  double z[{middle_dim}];\n  {right}(x, z);\n  {left}(z, y);\n"
+            return self._add(body)
+        if class_name == "LinearCombinationEvaluation":
+            functions = evaluation.getFunctionsCollection()
+            coefficients = evaluation.getCoefficients()
+            names = [self.evaluation(function.getEvaluation()) for function in functions]
+            body = f"  double z[{output_dim}];\n  int j;\n"
+            body += f"  for (j = 0; j < {output_dim}; ++ j)\n    y[j] = 0.0;\n"
+            for name, coefficient in zip(names, coefficients):
+                body += f"  {name}(x, z);\n"
+                body += f"  for (j = 0; j < {output_dim}; ++ j)\n    y[j] += {coefficient!r} * z[j];\n"
+            return self._add(body)
+        if class_name == "DualLinearCombinationEvaluation":
+            functions = evaluation.getFunctionsCollection()
+            coefficients = evaluation.getCoefficients()
+            names = [self.evaluation(function.getEvaluation()) for function in functions]
+            body = "  double z;\n"
+            body += "".join(f"  y[{j}] = 0.0;\n" for j in range(output_dim))
+            for k, name in enumerate(names):
+                body += f"  {name}(x, &z);\n"
+                body += "".join(f"  y[{j}] += z * {coefficients[k, j]!r};\n"
+                                for j in range(output_dim) if coefficients[k, j] != 0.0)
+            return self._add(body)
+        if class_name == "MarginalTransformationEvaluation":
+            expressions = evaluation.getExpressions()
+            if not all(evaluation.getSimplifications()):
+                raise TypeError("Cannot generate C code for a non-affine marginal transformation")
+            body = ""
+            for i, expression in enumerate(expressions):
+                formula = expression.getEvaluation().getImplementation().getFormulas()[0]
+                variable = expression.getInputDescription()[0]
+                body += f"  y[{i}] = {translate_formula(formula, [variable]).replace('x[0]', f'x[{i}]')};\n"
+            return self._add(body)
+        raise TypeError(f"Cannot generate C code for {class_name}")
+
+    def chaos(self, result):
+        """Generate the code of a polynomial chaos metamodel, return the name of its C function."""
+        transformation = self.evaluation(result.getTransformation().getEvaluation())
+        basis = result.getOrthogonalBasis().getImplementation()
+        if not hasattr(basis, "getPolynomialFamilyCollection"):
+            raise TypeError(f"Cannot generate C code for the basis {basis.getClassName()}")
+        families = basis.getPolynomialFamilyCollection()
+        enumerate_function = basis.getEnumerateFunction()
+        input_dim = result.getMetaModel().getInputDimension()
+        output_dim = result.getMetaModel().getOutputDimension()
+        degrees = [list(enumerate_function(index)) for index in result.getIndices()]
+        max_degrees = [max(degree[j] for degree in degrees) for j in range(input_dim)]
+
+        # coefficients in increasing order of the polynomials of all the degrees of each variable
+        k = len(self._functions)
+        first = [sum(max_degree + 1 for max_degree in max_degrees[:j]) for j in range(input_dim)]
+        variables = []
+        offsets = []
+        coefficients = []
+        for j in range(input_dim):
+            for degree in range(max_degrees[j] + 1):
+                variables.append(j)
+                offsets.append(len(coefficients))
+                coefficients += list(families[j].build(degree).getCoefficients())
+        offsets.append(len(coefficients))
+        terms = ", ".join("{" + ", ".join(str(first[j] + degree[j]) for j in range(input_dim)) + "}" for degree in degrees)
+        values = ", ".join(_format_array(row) for row in result.getCoefficients())
+        tables = f"""static const double otfmi_polynomial{k}[] = {_format_array(coefficients)};
+static const int otfmi_offset{k}[] = {{{', '.join(map(str, offsets))}}};
+static const int otfmi_variable{k}[] = {{{', '.join(map(str, variables))}}};
+static const int otfmi_term{k}[][{input_dim}] = {{{terms}}};
+static const double otfmi_coefficient{k}[][{output_dim}] = {{{values}}};
+"""
+        body = f"""  double z[{input_dim}], p[{len(variables)}], term;
+  int i, j, n;
+  {transformation}(x, z);
+  /* Horner evaluation of the univariate polynomials */
+  for (j = 0; j < {len(variables)}; ++ j)
+  {{
+    p[j] = 0.0;
+    for (n = otfmi_offset{k}[j + 1] - 1; n >= otfmi_offset{k}[j]; -- n)
+      p[j] = p[j] * z[otfmi_variable{k}[j]] + otfmi_polynomial{k}[n];
+  }}
+  for (i = 0; i < {output_dim}; ++ i)
+    y[i] = 0.0;
+  for (n = 0; n < {len(degrees)}; ++ n)
+  {{
+    term = 1.0;
+    for (j = 0; j < {input_dim}; ++ j)
+      term *= p[otfmi_term{k}[n][j]];
+    for (i = 0; i < {output_dim}; ++ i)
+      y[i] += term * otfmi_coefficient{k}[n][i];
+  }}
+"""
+        return self._add(body, tables)
+
+    def code(self, name):
+        functions = "\n".join(self._functions)
+        helpers = "".join(helper + "\n" for helper_name, helper in _HELPERS.items() if helper_name + "(" in functions)
+        return f"#include <math.h>\n\n{helpers}{functions}\n#define otfmi_evaluate {name}\n"
+
+
+def generate(function):
+    """Generate C code evaluating a function.
+
+    The supported functions are the symbolic functions, the linear
+    functions, the linear combinations and compositions of supported
+    functions, and the polynomial chaos metamodels with affine marginal
+    transformations.
+
+    Parameters
+    ----------
+    function : :class:`openturns.Function` or :class:`openturns.FunctionalChaosResult`
+        Function to translate, chaos metamodels are only supported as results.
+
+    Returns
+    -------
+    code : str
+        C code defining otfmi_evaluate(const double *x, double *y).
+    """
+    generator = _Generator()
+    if isinstance(function, ot.FunctionalChaosResult):
+        name = generator.chaos(function)
+    else:
+        name = generator.evaluation(function.getEvaluation())
+    return generator.code(name)
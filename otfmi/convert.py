@@ -0,0 +1,283 @@
+# Copyright 2016-2025 EDF Phimeca
+
+"""Conversions between OpenTURNS containers and NumPy arrays.
+
+OpenTURNS samples expose their contiguous float64 storage through the NumPy
+array interface, so they are read as NumPy arrays without copy. The other way
+around, a NumPy array passed to the Sample constructor is read element by
+element. Optionally (see :func:`set_buffer_copy`), the Sample is allocated
+first and its storage is filled with a single copy of the array buffer.
+Values can also be encoded in reduced precision (float32, or int16 with a
+per-variable offset and scale) and widened back to double precision.
+"""
+
+import numpy as np
+import openturns as ot
+
+# below this number of values, the sequence constructor is cheaper than the
+# allocation followed by a buffer copy
+_MIN_BUFFER_SIZE = 64
+
+# whether to_sample fills the storage of the samples through their array interface
+_buffer_copy = False
+
+
+class _ArrayInterface:
+    """Expose an array interface dictionary to NumPy."""
+
+    def __init__(self, interface):
+        self.__array_interface__ = interface
+
+
+def to_numpy(data):
+    """Convert data to a float64 NumPy array.
+
+    Parameters
+    ----------
+    data : :class:`openturns.Sample`, :class:`openturns.Point`, array-like
+        Data to convert. Samples are returned as read-only views of their
+        storage, without copy.
+
+    Returns
+    -------
+    array : numpy array
+        Converted data.
+    """
+    return np.asarray(data, dtype=float)
+
+
+def _writable_view(sample):
+    """Writable NumPy view on the storage of a Sample.
+
+    OpenTURNS only exposes a read-only array interface: writing through it
+    relies on the layout of the storage, not on a supported API. The write
+    is checked once per process by :func:`_has_writable_view`.
+    """
+    # This is safe as long as the array interface describes the storage
+    # itself, as it does for the read-only views: a contiguous row-major
+    # buffer of size x dimension doubles (checked with OpenTURNS 1.27, the
+    # requirements do not pin a version). The views are only taken on
+    # samples just allocated by to_sample, whose implementation is not
+    # shared by the copy-on-write pointer of any other Sample, and they are
+    # dropped before the sample is returned, so that no reallocation of the
+    # storage can outlive them.
+    interface = dict(sample.__array_interface__)
+    interface["data"] = (interface["data"][0], False)
+    return np.asarray(_ArrayInterface(interface))
+
+
+# whether values written through the array interface are read back by OpenTURNS
+_writable = None
+
+
+def _has_writable_view():
+    """Check once that a Sample is filled through its array interface."""
+    global _writable
+    if _writable is None:
+        try:
+            sample = ot.Sample(2, 3)
+            view = _writable_view(sample)
+            view[...] = np.arange(6.0).reshape(2, 3)
+            _writable = view.shape == (2, 3) and [list(point) for point in sample] == view.tolist()
+        except Exception:
+            _writable = False
+    return _writable
+
+
+def set_buffer_copy(enabled=True):
+    """Toggle the buffer copy of the arrays converted to samples.
+
+    When enabled, :func:`to_sample` copies the values into the storage of a
+    new Sample through its array interface, which OpenTURNS exposes
+    read-only: this writes into memory owned by OpenTURNS, and is only done
+    if a first write is read back as expected. Disabled by default, the
+    samples being built by the constructor.
+
+    Parameters
+    ----------
+    enabled : bool
+        Whether to copy the buffers.
+    """
+    global _buffer_copy
+    _buffer_copy = bool(enabled)
+
+
+def to_sample(values, buffer_copy=None):
+    """Convert a 2-d array to a Sample.
+
+    Parameters
+    ----------
+    values : 2-d array-like
+        Values with points as rows.
+
+    buffer_copy : bool, optional
+        Whether to fill the storage of the Sample with a single buffer
+        copy, see :func:`set_buffer_copy` for the default.
+
+    Returns
+    -------
+    sample : :class:`openturns.Sample`
+        Sample holding a copy of the values.
+    """
+    if isinstance(values, ot.Sample):
+        return values
+    values = np.asarray(values, dtype=float)
+    if values.ndim != 2:
+        raise ValueError(f"Expected a 2-d array, got {values.ndim} dimension(s)")
+    size, dimension = values.shape
+    if size == 0 or dimension == 0:
+        return ot.Sample(size, dimension)
+    if buffer_copy is None:
+        buffer_copy = _buffer_copy
+    if not buffer_copy or size * dimension < _MIN_BUFFER_SIZE or not _has_writable_view():
+        return ot.Sample(values.tolist())
+    sample = ot.Sample(size, dimension)
+    np.copyto(_writable_view(sample), values)
+    return sample
+
+
+def to_process_sample(mesh, values):
+    """Convert a 3-d array to a ProcessSample.
+
+    Parameters
+    ----------
+    mesh : :class:`openturns.Mesh`
+        Mesh of the fields.
+
+    values : 3-d array-like
+        Values indexed by field, vertex and component.
+
+    Returns
+    -------
+    process_sample : :class:`openturns.ProcessSample`
+        Process sample holding a copy of the values.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim != 3:
+        raise ValueError(f"Expected a 3-d array, got {values.ndim} dimension(s)")
+    size, _, dimension = values.shape
+    process_sample = ot.ProcessSample(mesh, size, dimension)
+    for i in range(size):
+        process_sample[i] = to_sample(values[i])
+    return process_sample
+
+
+def process_sample_to_numpy(process_sample):
+    """Convert a ProcessSample to a 3-d array.
+
+    Parameters
+    ----------
+    process_sample : :class:`openturns.ProcessSample`
+        Process sample to convert.
+
+    Returns
+    -------
+    values : 3-d numpy array
+        Values indexed by field, vertex and component.
+    """
+    size = process_sample.getSize()
+    n_vertices = process_sample.getMesh().getVerticesNumber()
+    values = np.empty((size, n_vertices, process_sample.getDimension()))
+    for i in range(size):
+        values[i] = np.asarray(process_sample[i])
+    return values
+
+
+_PRECISIONS = ["float64", "float32", "int16"]
+_INT16_MAX = np.iinfo(np.int16).max
+
+
+def encode(values, precision):
+    """Encode values in reduced precision.
+
+    With "int16", the values of each variable (last axis) are mapped onto
+    the int16 range by an offset and a scale computed from their extrema, so
+    that the absolute error is at most half the scale.
+
+    Parameters
+    ----------
+    values : array-like
+        Finite values, with variables along the last axis.
+
+    precision : str, one of "float64", "float32" or "int16"
+        Storage precision.
+
+    Returns
+    -------
+    data : numpy array
+        Encoded values.
+
+    offset, scale : 1-d numpy arrays or None
+        Per-variable offset and scale for "int16", None otherwise.
+    """
+    if precision not in _PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}, expected one of {_PRECISIONS}")
+    values = np.asarray(values, dtype=float)
+    if precision != "int16":
+        return values.astype(precision, copy=False), None, None
+    axes = tuple(range(values.ndim - 1))
+    lower = values.min(axis=axes)
+    upper = values.max(axis=axes)
+    offset = 0.5 * (lower + upper)
+    scale = (upper - lower) / (2.0 * _INT16_MAX)
+    scale[scale == 0.0] = 1.0
+    data = np.clip(np.rint((values - offset) / scale), -_INT16_MAX, _INT16_MAX).astype(np.int16)
+    return data, offset, scale
+
+
+def decode(data, offset=None, scale=None):
+    """Widen encoded values to float64.
+
+    Parameters
+    ----------
+    data : numpy array
+        Encoded values, with variables along the last axis.
+
+    offset, scale : 1-d array-like or None
+        Per-variable offset and scale of int16 values.
+
+    Returns
+    -------
+    values : numpy array
+        Values in double precision.
+    """
+    values = np.asarray(data, dtype=float)
+    if scale is not None:
+        values = values * scale + offset
+    return values
+
+
+class CompactArray:
+    """Values kept in reduced precision, for storage and transfer between processes.
+
+    Pickling a compact array transfers the encoded values only, which halves
+    (float32) or quarters (int16) the volume of a double precision array.
+
+    Parameters
+    ----------
+    values : 2-d array-like
+        Values with variables as columns, for instance a trajectory.
+
+    precision : str, one of "float32" (default), "int16" or "float64"
+        Storage precision, see :func:`encode`.
+    """
+
+    def __init__(self, values, precision="float32"):
+        self.precision = precision
+        self.data, self.offset, self.scale = encode(to_numpy(values), precision)
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def nbytes(self):
+        """Size of the encoded values in bytes."""
+        return self.data.nbytes
+
+    def to_numpy(self):
+        """Widen the values to a float64 array."""
+        return decode(self.data, self.offset, self.scale)
+
+    def to_sample(self):
+        """Widen the values to a Sample."""
+        return to_sample(self.to_numpy())
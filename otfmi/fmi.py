@@ -2,12 +2,14 @@
 
 """Low level utility functions for common FMU manipulations."""
 
+import bisect
+import concurrent.futures
 import io
 from pathlib import Path
 import pyfmi
 import numpy as np
 import warnings
-import otfmi
+from .convert import to_numpy
 
 
 def load_fmu(path_fmu, kind=None, **kwargs):
@@ -66,6 +68,9 @@ def simulate(
         Toggle resetting the FMU prior to simulation. True by default.
 
     Additional keyword arguments are passed on to pyfmi.simulate.
+    Model exchange FMUs with zero-order hold inputs (see
+    InputInterpolation) are simulated by segments between the jumps of
+    the inputs.
 
     """
     if reset:
@@ -85,11 +90,54 @@ def simulate(
     if initialization_parameters is not None:
         apply_initialization_parameters(model, initialization_parameters)
 
-    return model.simulate(**kwargs)
+    breakpoints = _get_breakpoints(model, kwargs)
+    if len(breakpoints) == 0:
+        return model.simulate(**kwargs)
+    return _simulate_segments(model, breakpoints, **kwargs)
+
+
+def _get_breakpoints(model, kwargs):
+    """Discontinuities of the inputs at which a model exchange simulation is restarted."""
+    options = kwargs.get("options", dict())
+    interpolation = kwargs.get("input", (None, None))[1]
+    if ("FMUModelME" not in model.__class__.__name__ or not isinstance(interpolation, InputInterpolation)
+            or type(options.get("result_handler")) is not ArrayResultHandler):
+        return []
+    start_time = kwargs.get("start_time", model.get_default_experiment_start_time())
+    final_time = kwargs.get("final_time", model.get_default_experiment_stop_time())
+    breakpoints = interpolation.breakpoints
+    return breakpoints[(breakpoints > start_time) & (breakpoints < final_time)].tolist()
+
+
+def _simulate_segments(model, breakpoints, **kwargs):
+    """Simulate a model exchange FMU restarted at each input discontinuity.
+
+    The solver would otherwise step across the jumps of the inputs. Each
+    segment continues the previous one (option initialize=False) with a
+    share of the communication points proportional to its duration, and the
+    result handler appends the values of all the segments.
+    """
+    start_time = kwargs.pop("start_time", model.get_default_experiment_start_time())
+    final_time = kwargs.pop("final_time", model.get_default_experiment_stop_time())
+    options = kwargs.pop("options")
+    handler = options["result_handler"]
+    ncp = options.get("ncp", model.simulate_options()["ncp"])
+    edges = [start_time] + list(breakpoints) + [final_time]
+    try:
+        for k in range(len(edges) - 1):
+            segment_options = dict(options)
+            segment_options["ncp"] = max(1, int(round(ncp * (edges[k + 1] - edges[k]) / (final_time - start_time))))
+            if k > 0:
+                segment_options["initialize"] = False
+                handler.append = True
+            simulation = model.simulate(start_time=edges[k], final_time=edges[k + 1], options=segment_options, **kwargs)
+    finally:
+        handler.append = False
+    return simulation
 
 
 def parse_kwargs_simulate(
-    value_input=None, name_input=None, name_output=None, model=None, **kwargs
+    value_input=None, name_input=None, name_output=None, model=None, interpolation="linear", **kwargs
 ):
     """Parse simulation keyword arguments and feed the
     simulate method of pyfmi's object.
@@ -106,18 +154,23 @@ def parse_kwargs_simulate(
 
     model : pyfmi.FMUModel*
         fmu model.
+
+    interpolation : str, one of "linear" (default), "zoh" or "spline"
+        interpolation of the time-dependent inputs (see InputInterpolation).
     """
 
     value_input_array = reshape_input(value_input, len(name_input))
     time, kwargs = guess_time(value_input_array, **kwargs)
 
-    options = kwargs.pop("dict_option", dict())
+    options = dict(kwargs.pop("dict_option", dict()))
 
     # store only interest variables
     options.setdefault("filter", name_output)
 
-    # store results in memory instead of binary file, cleaner and a bit faster
-    options.setdefault("result_handling", "memory")
+    # store results in preallocated arrays instead of binary file, cleaner and faster
+    if "result_handling" not in options:
+        options["result_handling"] = "custom"
+        options["result_handler"] = ArrayResultHandler(model, name_output)
 
     # only available for CS model
     if "FMUModelCS" in model.__class__.__name__:
@@ -166,7 +219,10 @@ def parse_kwargs_simulate(
         else:  # 2-d array
             value_input_fmi = value_input_array[:, indices_input_fmi]
         if len(name_input_fmi) > 0:
-            kwargs["input"] = (name_input_fmi, np.column_stack((time, value_input_fmi)))
+            kwargs["input"] = (
+                name_input_fmi,
+                InputInterpolation(time, np.reshape(value_input_fmi, (len(time), -1)), kind=interpolation),
+            )
 
     return kwargs
 
@@ -192,11 +248,16 @@ def strip_simulation(simulation, name_output, final=None):
     if final is None:
         final = "final"
 
+    result = getattr(simulation, "result_data", None)
     if final == "final":
+        if isinstance(result, ArrayResult):
+            return result.get_columns(name_output)[-1].tolist()
         return [simulation.final(name) for name in name_output]
     elif final == "result":
         return simulation
     elif final == "trajectory":
+        if isinstance(result, ArrayResult):
+            return result.time, result.get_columns(name_output)
         return (
             simulation["time"],
             np.column_stack([simulation[name] for name in name_output]),
@@ -205,6 +266,617 @@ def strip_simulation(simulation, name_output, final=None):
         raise ValueError("Unexpected value for the 'final' parameter: '%s'." % final)
 
 
+class ArrayResult(pyfmi.common.io.ResultStorage):
+    """Simulation result stored as NumPy arrays.
+
+    Parameters
+    ----------
+    time : 1-d array
+        Time grid.
+
+    values : 2-d array
+        Output values with time steps as rows.
+
+    name_output : Sequence of str
+        Output variable names, in column order.
+
+    sensitivity : 3-d array, optional
+        Derivatives of the outputs with respect to the parameters, indexed
+        by time step, output and parameter.
+    """
+
+    def __init__(self, time, values, name_output, sensitivity=None):
+        self.time = time
+        self.values = values
+        self.sensitivity = sensitivity
+        self.name_output = list(name_output)
+        self._index = {name: i for i, name in enumerate(self.name_output)}
+
+    def get_variable_data(self, name):
+        if name == "time":
+            return pyfmi.common.io.Trajectory(self.time, self.time)
+        try:
+            index = self._index[name]
+        except KeyError:
+            raise pyfmi.common.io.VariableNotFoundError(f"Cannot find variable {name} in result.")
+        return pyfmi.common.io.Trajectory(self.time, self.values[:, index])
+
+    def get_columns(self, name_output):
+        """Get the values of some outputs with time steps as rows.
+
+        Parameters
+        ----------
+        name_output : Sequence of str
+            Output variable names.
+        """
+        name_output = list(name_output)
+        if name_output == self.name_output:
+            return self.values
+        try:
+            return self.values[:, [self._index[name] for name in name_output]]
+        except KeyError as ex:
+            raise pyfmi.common.io.VariableNotFoundError(f"Cannot find variable {ex} in result.")
+
+    def is_variable(self, name):
+        return True
+
+    def is_negated(self, name):
+        return False
+
+
+class ArrayResultHandler(pyfmi.common.io.ResultHandler):
+    """Record only the selected outputs into preallocated NumPy arrays.
+
+    Contrary to pyfmi's memory result handler, no other variable is read,
+    and values are written in place into contiguous buffers instead of
+    growing Python lists.
+
+    Parameters
+    ----------
+    model : pyfmi.fmi.FMUModelBase
+        Pyfmi model object.
+
+    name_output : Sequence of str
+        Output variable names.
+
+    size : int, default=None
+        Expected number of recorded time steps, typically ncp + 1.
+        Buffers are enlarged if more time steps are recorded (e.g. events).
+
+    final : bool, default=False
+        If True, only the values at the last time step are kept.
+
+    decimation : int, default=1
+        Record only one time step out of decimation (the last time step is
+        always recorded).
+
+    Attributes
+    ----------
+    append : bool
+        Whether the next simulation continues the recorded one, its values
+        being appended instead of replacing them. False by default.
+    """
+
+    def __init__(self, model, name_output, size=None, final=False, decimation=1):
+        if isinstance(name_output, str):
+            name_output = [name_output]
+        if int(decimation) < 1:
+            raise ValueError("decimation must be a positive integer")
+        try:
+            super().__init__(model)
+        except TypeError:
+            pass  # Probably pyfmi < 2.10, without base constructor.
+        self.model = model
+        self._name_output = list(name_output)
+        self._size = 1 if final else max(1, 501 if size is None else int(size))
+        self._final = final
+        self._decimation = int(decimation)
+        self.options = None
+        self.append = False
+        self._count = 0
+
+    def set_options(self, options):
+        self.options = options
+
+    def simulation_start(self):
+        model = self.model
+        version = model.get_version()
+        real = pyfmi.fmi.FMI2_REAL if version == "2.0" else pyfmi.fmi.FMI_REAL
+        self._ref_real, self._col_real = [], []
+        self._ref_other, self._col_other = [], []
+        sign = np.ones(len(self._name_output))
+        for i, name in enumerate(self._name_output):
+            if model.get_variable_data_type(name) == real:
+                self._ref_real.append(model.get_variable_valueref(name))
+                self._col_real.append(i)
+            else:
+                self._ref_other.append(name)
+                self._col_other.append(i)
+            if version != "2.0" and model.get_variable_alias(name)[name] == pyfmi.fmi.FMI_NEGATED_ALIAS:
+                sign[i] = -1.0
+        self._sign = sign if (sign < 0.0).any() else None
+        if not (self.append and self._count > 0):
+            self._time = np.empty(self._size)
+            self._values = np.empty((self._size, len(self._name_output)))
+            self._count = 0
+        self._calls = 0
+        self._pending = False
+        self._solver = None
+
+    def _reserve(self):
+        """Return the row to write, enlarging the buffers if needed."""
+        if self._final:
+            self._count = 1
+            return 0
+        if self._count == len(self._time):
+            self._time = np.resize(self._time, 2 * self._count)
+            self._values = np.resize(self._values, (2 * self._count, self._values.shape[1]))
+        self._count += 1
+        return self._count - 1
+
+    def _record(self, row, solver):
+        """Write the current model values in a buffer row."""
+        model = self.model
+        self._time[row] = model.time
+        values = self._values[row]
+        values[self._col_real] = model.get_real(self._ref_real)
+        if self._ref_other:
+            values[self._col_other] = model.get(self._ref_other)
+        if self._sign is not None:
+            values *= self._sign
+
+    def integration_point(self, solver=None):
+        self._calls += 1
+        if not self._final and (self._calls - 1) % self._decimation != 0:
+            # keep track of the skipped step in case it is the last one
+            self._pending = True
+            self._solver = solver
+            return
+        self._pending = False
+        self._record(self._reserve(), solver)
+
+    def simulation_end(self):
+        if self._pending:
+            self._pending = False
+            self._record(self._reserve(), self._solver)
+        self._solver = None
+
+    def get_result(self):
+        count = self._count
+        return ArrayResult(self._time[:count], self._values[:count], self._name_output)
+
+
+class SensitivityResultHandler(ArrayResultHandler):
+    """Record outputs and their forward sensitivities during a simulation.
+
+    The state sensitivities dx/dp computed by the solver are projected onto
+    the outputs with one directional derivative of the FMU per parameter,
+    along the direction (dx/dp, e_p). Finite differences along the same
+    direction are used if the FMU does not provide directional derivatives.
+
+    Parameters
+    ----------
+    model : pyfmi.fmi.FMUModelME2
+        Pyfmi model object.
+
+    name_output : Sequence of str
+        Output variable names.
+
+    name_parameter : Sequence of str
+        Names of the variables with respect to which sensitivities are computed,
+        same as the 'sensitivities' simulation option.
+
+    size : int, default=None
+        Expected number of recorded time steps, see ArrayResultHandler.
+    """
+
+    def __init__(self, model, name_output, name_parameter, size=None):
+        super().__init__(model, name_output, size=size)
+        self._name_parameter = list(name_parameter)
+
+    def simulation_start(self):
+        super().simulation_start()
+        model = self.model
+        self._ref_output = [model.get_variable_valueref(name) for name in self._name_output]
+        self._ref_parameter = [model.get_variable_valueref(name) for name in self._name_parameter]
+        self._ref_state = [var.value_reference for var in model.get_states_list().values()]
+        flags = model.get_capability_flags()
+        self._directional = flags.get("providesDirectionalDerivatives", False)
+        self._sensitivity = np.empty((len(self._time), len(self._ref_output), len(self._ref_parameter)))
+
+    def _reserve(self):
+        row = super()._reserve()
+        if len(self._sensitivity) < len(self._time):
+            self._sensitivity = np.resize(self._sensitivity, (len(self._time),) + self._sensitivity.shape[1:])
+        return row
+
+    def _record(self, row, solver):
+        super()._record(row, solver)
+        model = self.model
+        values = self._values[row]
+        n_parameter = len(self._ref_parameter)
+        n_state = len(self._ref_state)
+        if solver is not None and n_state > 0:
+            sens_state = np.reshape(solver.interpolate_sensitivity(model.time, 0), (n_parameter, n_state))
+        else:
+            sens_state = np.zeros((n_parameter, n_state))
+
+        sensitivity = self._sensitivity[row]
+        if self._directional:
+            for j in range(n_parameter):
+                seed = np.append(sens_state[j], 1.0)
+                sensitivity[:, j] = model.get_directional_derivative(
+                    self._ref_state + [self._ref_parameter[j]], self._ref_output, seed
+                )
+        else:
+            # forward differences along the direction (dx/dp_j, e_j)
+            states = model.continuous_states.copy()
+            parameters = np.asarray(model.get_real(self._ref_parameter))
+            for j in range(n_parameter):
+                h = np.sqrt(np.finfo(float).eps) * max(1.0, abs(parameters[j]))
+                if n_state > 0:
+                    model.continuous_states = states + h * sens_state[j]
+                model.set_real([self._ref_parameter[j]], [parameters[j] + h])
+                sensitivity[:, j] = (np.asarray(model.get_real(self._ref_output)) - values) / h
+                model.set_real([self._ref_parameter[j]], [parameters[j]])
+            if n_state > 0:
+                model.continuous_states = states
+
+    def get_result(self):
+        count = self._count
+        return ArrayResult(self._time[:count], self._values[:count], self._name_output, self._sensitivity[:count])
+
+
+class AdjointResultHandler(ArrayResultHandler):
+    """Record outputs along with the checkpoints of an adjoint pass.
+
+    At each recorded time step the continuous states, their derivatives and
+    the FMU state are stored, so that the model can be evaluated again along
+    the trajectory once the simulation is over, see the 'gradient' method.
+    Event points must not be recorded (option store_event_points=False).
+
+    Parameters
+    ----------
+    model : pyfmi.fmi.FMUModelME2
+        Pyfmi model object, able to get and set its FMU state.
+
+    name_output : Sequence of str
+        Output variable names.
+
+    size : int, default=None
+        Expected number of recorded time steps, see ArrayResultHandler.
+    """
+
+    def __init__(self, model, name_output, size=None):
+        super().__init__(model, name_output, size=size)
+        self._checkpoints = []
+
+    def simulation_start(self):
+        super().simulation_start()
+        model = self.model
+        self.free_checkpoints()
+        self._ref_state = [var.value_reference for var in model.get_states_list().values()]
+        self._ref_derivative = [var.value_reference for var in model.get_derivatives_list().values()]
+        flags = model.get_capability_flags()
+        self._directional = flags.get("providesDirectionalDerivatives", False)
+        self._states = np.empty((len(self._time), len(self._ref_state)))
+        self._derivatives = np.empty_like(self._states)
+
+    def _reserve(self):
+        row = super()._reserve()
+        if len(self._states) < len(self._time):
+            self._states = np.resize(self._states, (len(self._time), self._states.shape[1]))
+            self._derivatives = np.resize(self._derivatives, self._states.shape)
+        return row
+
+    def _record(self, row, solver):
+        super()._record(row, solver)
+        model = self.model
+        if len(self._ref_state) > 0:
+            self._states[row] = model.continuous_states
+            self._derivatives[row] = model.get_derivatives()
+        self._checkpoints.append(model.get_fmu_state())
+
+    def free_checkpoints(self):
+        """Release the recorded FMU states."""
+        for checkpoint in self._checkpoints:
+            self.model.free_fmu_state(checkpoint)
+        self._checkpoints = []
+
+    def _jacobian(self, ref_input, ref_output):
+        """Derivatives of the state derivatives and of an output with respect to the states and inputs.
+
+        Returns
+        -------
+        jacobian : 2-d array
+            Rows are the state derivatives then the output, columns are the
+            states then the inputs.
+        """
+        model = self.model
+        ref_state = self._ref_state
+        n_state = len(ref_state)
+        jacobian = np.empty((n_state + 1, n_state + len(ref_input)))
+        if self._directional:
+            ref_function = self._ref_derivative + [ref_output]
+            for j, ref in enumerate(ref_state + ref_input):
+                jacobian[:, j] = model.get_directional_derivative([ref], ref_function, [1.0])
+            return jacobian
+
+        # forward differences
+        def evaluate():
+            if n_state == 0:
+                return np.asarray(model.get_real([ref_output]))
+            return np.append(model.get_derivatives(), model.get_real([ref_output]))
+
+        reference = evaluate()
+        eps = np.sqrt(np.finfo(float).eps)
+        if n_state > 0:
+            states = model.continuous_states.copy()
+            for j in range(n_state):
+                perturbed = states.copy()
+                h = eps * max(1.0, abs(states[j]))
+                perturbed[j] += h
+                model.continuous_states = perturbed
+                jacobian[:, j] = (evaluate() - reference) / h
+            model.continuous_states = states
+        inputs = np.asarray(model.get_real(ref_input))
+        for j, ref in enumerate(ref_input):
+            h = eps * max(1.0, abs(inputs[j]))
+            model.set_real([ref], [inputs[j] + h])
+            jacobian[:, n_state + j] = (evaluate() - reference) / h
+            model.set_real([ref], [inputs[j]])
+        return jacobian
+
+    def gradient(self, seed, name_input, output=0, substeps=4):
+        """Integrate the adjoint system backward over the recorded trajectory.
+
+        The adjoint :math:`\\lambda` of the states solves
+        :math:`\\dot{\\lambda} = -(\\partial f / \\partial x)^T \\lambda`
+        backward in time, with jumps :math:`\\gamma_k \\partial y / \\partial x`
+        at the recorded time steps, and the gradient of :math:`\\sum_k \\gamma_k y_k`
+        with respect to the inputs u is
+        :math:`\\int \\lambda^T \\partial f / \\partial u \\, dt + \\sum_k \\gamma_k \\partial y / \\partial u`.
+        Each interval between recorded time steps is integrated with
+        fixed-step Runge-Kutta 4, the states being interpolated by cubic
+        Hermite polynomials and the model restored from the checkpoint of
+        the beginning of the interval. The Jacobians are given by directional
+        derivatives of the FMU (or finite differences if the FMU does not
+        provide them). As for the forward sensitivities, the dependence of
+        the initial states on the inputs is ignored.
+        The checkpoints are released afterwards.
+
+        Parameters
+        ----------
+        seed : Sequence of float
+            Weights :math:`\\gamma_k` of the output at the recorded time steps.
+
+        name_input : Sequence of str
+            Names of the inputs, with FMI causality INPUT.
+
+        output : int, default=0
+            Index of the output.
+
+        substeps : int, default=4
+            Number of Runge-Kutta steps per recorded interval.
+
+        Returns
+        -------
+        gradient : 1-d array
+            Derivatives of the weighted sum with respect to the inputs.
+        """
+        model = self.model
+        count = self._count
+        seed = np.ravel(seed)
+        if len(seed) != count:
+            raise ValueError(f"Expected {count} seed values, got {len(seed)}")
+        ref_input = [model.get_variable_valueref(name) for name in name_input]
+        ref_output = model.get_variable_valueref(self._name_output[output])
+        time = self._time[:count]
+        states = self._states[:count]
+        derivatives = self._derivatives[:count]
+        n_state = states.shape[1]
+
+        def evaluate(t, k):
+            """Adjoint Jacobians at time t of the interval [time[k], time[k + 1]]."""
+            if n_state > 0:
+                delta = time[k + 1] - time[k]
+                s = (t - time[k]) / delta
+                model.time = t
+                model.continuous_states = (
+                    (2.0 * s ** 3 - 3.0 * s ** 2 + 1.0) * states[k]
+                    + (s ** 3 - 2.0 * s ** 2 + s) * delta * derivatives[k]
+                    + (3.0 * s ** 2 - 2.0 * s ** 3) * states[k + 1]
+                    + (s ** 3 - s ** 2) * delta * derivatives[k + 1]
+                )
+            jacobian = self._jacobian(ref_input, ref_output)
+            return jacobian[:n_state, :n_state].T, jacobian[:n_state, n_state:].T
+
+        adjoint = np.zeros(n_state)
+        gradient = np.zeros(len(ref_input))
+        try:
+            for k in range(count - 1, -1, -1):
+                if seed[k] != 0.0:
+                    model.set_fmu_state(self._checkpoints[k])
+                    jacobian = self._jacobian(ref_input, ref_output)
+                    adjoint += seed[k] * jacobian[n_state, :n_state]
+                    gradient += seed[k] * jacobian[n_state, n_state:]
+                if k == 0 or n_state == 0 or time[k] <= time[k - 1]:
+                    continue
+                # backward in time: d(adjoint)/d(-t) = A^T adjoint, d(gradient)/d(-t) = B^T adjoint
+                model.set_fmu_state(self._checkpoints[k - 1])
+                h = (time[k] - time[k - 1]) / substeps
+                t = time[k]
+                lower = evaluate(t, k - 1)
+                for _ in range(substeps):
+                    middle = evaluate(t - 0.5 * h, k - 1)
+                    upper = evaluate(max(t - h, time[k - 1]), k - 1)
+                    a1 = lower[0] @ adjoint
+                    a2 = middle[0] @ (adjoint + 0.5 * h * a1)
+                    a3 = middle[0] @ (adjoint + 0.5 * h * a2)
+                    a4 = upper[0] @ (adjoint + h * a3)
+                    gradient += h / 6.0 * (lower[1] @ adjoint + 2.0 * middle[1] @ (adjoint + 0.5 * h * a1)
+                                           + 2.0 * middle[1] @ (adjoint + 0.5 * h * a2) + upper[1] @ (adjoint + h * a3))
+                    adjoint = adjoint + h / 6.0 * (a1 + 2.0 * a2 + 2.0 * a3 + a4)
+                    t -= h
+                    lower = upper
+        finally:
+            self.free_checkpoints()
+        return gradient
+
+
+class InputInterpolation:
+    """Time-dependent input values for the simulate method of pyfmi.
+
+    The input table is interpolated at the times requested by the solver
+    using a cursor on the current interval, so that the lookup has an
+    amortized constant cost when the solver moves forward in time, instead
+    of a search in the whole table at each call. Runs of constant values
+    are compressed beforehand, without changing the interpolated values.
+    Outside of the time range, the first or last values are held.
+
+    Parameters
+    ----------
+    time : Sequence of float
+        Increasing time values.
+
+    value : 2-d array-like
+        Input values, with time steps as rows.
+
+    kind : str, one of "linear" (default), "zoh" (zero-order hold) or
+        "spline" (monotone piecewise cubic Hermite interpolation).
+
+    compress : bool
+        Toggle the removal of the redundant points of constant runs. True by
+        default.
+
+    Attributes
+    ----------
+    breakpoints : 1-d array
+        Times at which the values jump (zero-order hold only): simulations
+        of model exchange FMUs are restarted there (see simulate), so that
+        the solver does not step across the discontinuities.
+    """
+
+    def __init__(self, time, value, kind="linear", compress=True):
+        if kind not in ["linear", "zoh", "spline"]:
+            raise ValueError(f"Unknown interpolation kind: {kind}")
+        time = np.asarray(time, dtype=float).ravel()
+        value = np.asarray(value, dtype=float).reshape(len(time), -1)
+        if len(time) == 0:
+            raise ValueError("Expected at least one time value")
+        if np.any(np.diff(time) <= 0.0):
+            raise ValueError("Expected strictly increasing time values")
+        self.kind = kind
+
+        if compress and len(time) > 2:
+            keep = np.ones(len(time), dtype=bool)
+            same = np.all(value[1:] == value[:-1], axis=1)
+            if kind == "zoh":
+                # a value equal to the previous one does not change the input
+                keep[1:-1] = ~same[:-1]
+            else:
+                keep[1:-1] = ~(same[:-1] & same[1:])
+                if kind == "spline":
+                    # the end slopes depend on the first/last two intervals
+                    keep[:3] = True
+                    keep[-3:] = True
+            time = time[keep]
+            value = value[keep]
+
+        self.breakpoints = time[1:][np.any(value[1:] != value[:-1], axis=1)] if kind == "zoh" else np.empty(0)
+        self._time = time.tolist()
+        self._value = value
+        self._cursor = 0
+        if len(time) == 1:
+            return
+
+        h = np.diff(time)[:, None]
+        delta = np.diff(value, axis=0)
+        if kind == "spline":
+            # coefficients of the cubic polynomial on each interval, in the
+            # normalized variable s = (t - t_i) / h_i
+            slope = self._compute_slope(h, delta / h)
+            self._coefficient = (
+                value[:-1],
+                h * slope[:-1],
+                3.0 * delta - h * (2.0 * slope[:-1] + slope[1:]),
+                -2.0 * delta + h * (slope[:-1] + slope[1:]),
+            )
+        else:
+            self._coefficient = (value[:-1], delta)
+
+    @staticmethod
+    def _compute_slope(h, secant):
+        """Derivatives at the breakpoints preserving monotonicity (Fritsch-Carlson)."""
+        slope = np.zeros((len(secant) + 1, secant.shape[1]))
+        if len(secant) == 1:
+            slope[:] = secant
+            return slope
+
+        # weighted harmonic mean of the secants, zero at local extrema
+        w1 = 2.0 * h[1:] + h[:-1]
+        w2 = h[1:] + 2.0 * h[:-1]
+        monotone = secant[:-1] * secant[1:] > 0.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = (w1 + w2) / (w1 / secant[:-1] + w2 / secant[1:])
+        slope[1:-1] = np.where(monotone, mean, 0.0)
+
+        # one-sided three-point estimates at the ends
+        for end, (h0, h1, s0, s1) in [(0, (h[0], h[1], secant[0], secant[1])),
+                                      (-1, (h[-1], h[-2], secant[-1], secant[-2]))]:
+            d = ((2.0 * h0 + h1) * s0 - h0 * s1) / (h0 + h1)
+            d = np.where(np.sign(d) != np.sign(s0), 0.0, d)
+            d = np.where((np.sign(s0) != np.sign(s1)) & (np.abs(d) > 3.0 * np.abs(s0)), 3.0 * s0, d)
+            slope[end] = d
+        return slope
+
+    def _locate(self, t):
+        """Index i of the interval such that time[i] <= t < time[i + 1]."""
+        time = self._time
+        last = len(time) - 2
+        i = self._cursor
+        # walk a few intervals from the cursor, bisect on large jumps
+        for _ in range(8):
+            if t < time[i]:
+                if i == 0:
+                    break
+                i -= 1
+            elif i < last and t >= time[i + 1]:
+                i += 1
+            else:
+                break
+        else:
+            i = min(max(bisect.bisect_right(time, t) - 1, 0), last)
+        self._cursor = i
+        return i
+
+    def __call__(self, t):
+        """Input values at time t.
+
+        Parameters
+        ----------
+        t : float
+            Time value.
+
+        Returns
+        -------
+        value : 1-d numpy array
+            Interpolated input values.
+        """
+        time = self._time
+        if len(time) == 1:
+            return self._value[0]
+        i = self._locate(t)
+        if self.kind == "zoh":
+            return self._value[i + 1] if t >= time[i + 1] else self._value[i]
+        s = min(max((t - time[i]) / (time[i + 1] - time[i]), 0.0), 1.0)
+        if self.kind == "linear":
+            value, delta = self._coefficient
+            return value[i] + s * delta[i]
+        c0, c1, c2, c3 = self._coefficient
+        return c0[i] + s * (c1[i] + s * (c2[i] + s * c3[i]))
+
+
 def reshape_input(value_input, input_dimension):
     """Ensure appropriate number of dimensions for input data.
     Note: only the dimension is affected. The exact shape is not checked.
@@ -220,6 +892,7 @@ def reshape_input(value_input, input_dimension):
     if value_input is None:
         return None
 
+    value_input = to_numpy(value_input)
     if input_dimension > 1:
         return np.atleast_2d(value_input)
     else:
@@ -546,70 +1219,147 @@ def set_dict_value(model, dict_value):
     model.set(*list(zip(*list(dict_value.items()))))
 
 
-def format_trajectory(model, time, trajectory, time_interpolate=None):
-    """Store trajectories in a dictionary, and possibly reinterpolate them.
+def interpolate_trajectory(time, trajectory, time_interpolate):
+    """Interpolate a sample of trajectories onto a shared time grid.
 
-    Arguments:
-    model -- OpenTURNSFMUFunction, simulated model.
+    The trajectories are linearly interpolated, with constant values beyond
+    the simulation times. When all the trajectories share the same
+    simulation times, the interpolation stencil is computed once and applied
+    to all of them at once.
 
-    time -- Sequence of floats, simulation time.
+    Parameters
+    ----------
+    time : 1-d array-like or sequence of 1-d array-like
+        Simulation times, shared by all the trajectories or one per trajectory.
 
-    trajectory -- Array of floats, trajectories.
+    trajectory : 3-d array-like or sequence of 2-d array-like
+        Trajectories, with time steps as rows and variables as columns.
 
-    time_interpolate -- Sequence of floats, time for interpolation of
-    trajectories.
+    time_interpolate : 1-d array-like
+        Times of interpolation.
 
+    Returns
+    -------
+    values : 3-d numpy array
+        Interpolated values indexed by trajectory, time and variable.
     """
+    time_interpolate = np.asarray(time_interpolate, dtype=float)
+    if np.ndim(time[0]) == 0:
+        time = [time] * len(trajectory)
+    time = [np.asarray(t, dtype=float) for t in time]
+    if all(len(t) == len(time[0]) and np.array_equal(t, time[0]) for t in time[1:]):
+        # shared time grid: one stencil for the whole sample
+        lower, weight = _compute_stencil(time[0], time_interpolate)
+        trajectory = np.asarray(trajectory, dtype=float)
+        return _apply_stencil(trajectory, lower, weight)
+    values = np.empty((len(trajectory), len(time_interpolate), np.shape(trajectory[0])[1]))
+    for k in range(len(trajectory)):
+        lower, weight = _compute_stencil(time[k], time_interpolate)
+        values[k] = _apply_stencil(np.asarray(trajectory[k], dtype=float)[np.newaxis], lower, weight)[0]
+    return values
+
+
+def _compute_stencil(time, time_interpolate):
+    """Index of the preceding simulation time and weight of the following one."""
+    if len(time) == 1:
+        return np.zeros(len(time_interpolate), dtype=int), np.zeros(len(time_interpolate))
+    lower = np.clip(np.searchsorted(time, time_interpolate, side="right") - 1, 0, len(time) - 2)
+    delta = time[lower + 1] - time[lower]
+    weight = (time_interpolate - time[lower]) / np.where(delta > 0.0, delta, 1.0)
+    return lower, np.clip(weight, 0.0, 1.0)
+
+
+def _apply_stencil(trajectory, lower, weight):
+    """Interpolate trajectories indexed by sample, time and variable."""
+    if trajectory.shape[1] == 1:
+        return trajectory[:, lower]
+    weight = weight[:, np.newaxis]
+    return trajectory[:, lower] * (1.0 - weight) + trajectory[:, lower + 1] * weight
+
+
+def format_trajectory(name_output, time, trajectory, time_interpolate=None):
+    """Store trajectories in a dictionary, and possibly reinterpolate them.
+
+    Parameters
+    ----------
+    name_output : Sequence of str
+        Output names, in column order.
 
-    list_output = model.getFMUOutputDescription()
+    time : Sequence of float
+        Simulation time.
 
-    if time_interpolate is not None:
-        list_trajectory = [np.interp(time_interpolate, time, zz) for zz in trajectory.T]
-    else:
-        list_trajectory = list(trajectory.T)
+    trajectory : 2-d array
+        Trajectories, with time steps as rows.
 
-    dict_trajectory = {key: value for key, value in zip(list_output, list_trajectory)}
-    return dict_trajectory
+    time_interpolate : Sequence of float, default=None
+        Time for interpolation of trajectories.
+
+    Returns
+    -------
+    dict_trajectory : dict
+        Trajectory of each output.
+    """
+
+    trajectory = np.asarray(trajectory, dtype=float)
+    if time_interpolate is not None:
+        trajectory = interpolate_trajectory(time, trajectory[np.newaxis], time_interpolate)[0]
+    return {key: trajectory[:, k] for k, key in enumerate(name_output)}
 
 
-# TODO: refactor format_sample_trajectory.
-def format_sample_trajectory(model, list_output, time_interpolate=None):
+def format_sample_trajectory(name_output, list_output, time_interpolate=None):
     """Store samples of trajectories in a dictionary, and possibly
     reinterpolate them.
 
-    Arguments:
-    model -- OpenTURNSFMUFunction, simulated model.
-
-    list_output -- Sequence of pairs of time (vector of floats) and
-    trajectories (array of floats).
+    Parameters
+    ----------
+    name_output : Sequence of str
+        Output names, in column order.
 
-    time_interpolate -- Sequence of floats, time for interpolation of
-    trajectories.
+    list_output : Sequence of pairs of time (vector of floats) and
+        trajectories (array of floats).
 
-    """
+    time_interpolate : Sequence of float, default=None
+        Time for interpolation of trajectories.
 
-    list_dict_trajectory = []
-    for time, trajectory in list_output:
-        list_dict_trajectory.append(
-            format_trajectory(
-                model, time, trajectory, time_interpolate=time_interpolate
-            )
-        )
+    Returns
+    -------
+    list_time : Sequence of time vectors.
 
-    dict_trajectory_sample = dict()
-    for name_output in model.getFMUOutputDescription():
-        dict_trajectory_sample[name_output] = np.column_stack(
-            [dd[name_output] for dd in list_dict_trajectory]
-        )
+    dict_trajectory_sample : dict
+        Trajectories of each output, with time steps as rows and samples as
+        columns.
+    """
 
+    list_time, list_trajectory = zip(*list_output)
     if time_interpolate is None:
-        list_time, _ = zip(*list_output)
+        values = np.asarray(list_trajectory, dtype=float)
     else:
+        values = interpolate_trajectory(list_time, list_trajectory, time_interpolate)
         list_time = [time_interpolate for _ in list_output]
-
+    dict_trajectory_sample = {key: values[:, :, k].T for k, key in enumerate(name_output)}
     return list_time, dict_trajectory_sample
 
 
+def _simulate_trajectory_block(path_fmu, kind, value_input, name_input, name_output, start_time, final_time, ncp):
+    """Simulate a block of input values with a single FMU instance."""
+    model = load_fmu(path_fmu, kind=kind)
+    if name_input is None:
+        fmix_input = pyfmi.fmi.FMI2_INPUT if model.get_version() == "2.0" else pyfmi.fmi.FMI_INPUT
+        name_variable = get_name_variable(model)
+        name_input = [name for name, causality in zip(name_variable, get_causality(model, name_variable))
+                      if causality == fmix_input]
+    list_output = []
+    for x in value_input:
+        dict_option = {"result_handler": ArrayResultHandler(model, name_output, size=None if ncp is None else ncp + 1)}
+        dict_option["result_handling"] = "custom"
+        if ncp is not None:
+            dict_option["ncp"] = ncp
+        kwargs_simulate = parse_kwargs_simulate(x, name_input, name_output, model, dict_option=dict_option)
+        simulation = simulate(model, start_time=start_time, final_time=final_time, **kwargs_simulate)
+        list_output.append(strip_simulation(simulation, name_output, final="trajectory"))
+    return list_output
+
+
 def simulate_trajectory(
     path_fmu,
     value_input,
@@ -618,50 +1368,85 @@ def simulate_trajectory(
     list_output=None,
     final_time=None,
     ncp=None,
+    start_time=0.0,
+    kind=None,
+    n_cpus=1,
 ):
     """Simulate a sample of trajectories with an FMU.
 
-    Arguments:
-    list_input -- Sequence of strings, input names.
+    All the trajectories are interpolated onto a shared time grid at once.
 
-    list_output -- Sequence of strings or single string, output names.
+    Parameters
+    ----------
+    path_fmu : str or path-like
+        Path to the FMU.
 
-    path_fmu -- String, path to FMU.
+    value_input : 2-d array-like
+        Input values, one row per simulation.
 
-    value_input -- Sequence of floats, input values.
+    timestep : float or Sequence of float
+        Time step, or times for trajectory interpolation.
 
-    timestep -- Float or sequence of floats, time step or sequence of times
-    for trajectory interpolation.
+    list_input : Sequence of str, default=None
+        Input names, by default the variables of causality INPUT.
 
-    final_time -- Float, simulation final time.
+    list_output : str or Sequence of str
+        Output names.
 
-    """
+    final_time : float
+        Simulation final time, only used with a time step.
 
-    try:
-        list_output.__iter__
-    except AttributeError:
-        list_output = [list_output]
+    ncp : int, default=None
+        Number of communication points. By default, the number of time
+        steps if the times are regular, that of the FMU otherwise.
 
-    model = otfmi.OpenTURNSFMUFunction(
-        path_fmu=path_fmu, inputs_fmu=list_input, outputs_fmu=list_output
-    )
-    model._OpenTURNSFMUFunction__final = "trajectory"
+    start_time : float, default=0.0
+        Simulation start time, only used with a time step.
 
-    try:
-        timestep.__iter__
-    except AttributeError:
-        time_interpolate = np.linspace(0, final_time, final_time / float(timestep))
-    else:
-        time_interpolate = timestep
-        final_time = time_interpolate[-1]
+    kind : str, one of "ME" or "CS", default=None
+        Kind of FMU, see load_fmu.
 
-    options = dict()
-    if ncp is not None:
-        options["ncp"] = ncp
+    n_cpus : int, default=1
+        Number of processes simulating blocks of the sample in parallel.
 
-    out = model.simulate_sample(
-        list_value_input=value_input, final_time=final_time, options=options
-    )
-    list_time, dict_trajectory = format_sample_trajectory(model, out, time_interpolate)
-    time = list_time[0]
-    return time, dict_trajectory
+    Returns
+    -------
+    time : 1-d numpy array
+        Times of interpolation.
+
+    values : 3-d numpy array
+        Trajectories indexed by simulation, time and output.
+    """
+
+    if isinstance(list_output, str):
+        list_output = [list_output]
+    value_input = to_numpy(value_input)
+    if value_input.ndim < 2:
+        value_input = value_input.reshape(len(value_input), -1)
+
+    if np.ndim(timestep) == 0:
+        n_step = int(round((final_time - start_time) / timestep))
+        time_interpolate = start_time + np.arange(n_step + 1) * timestep
+        time_interpolate[-1] = min(time_interpolate[-1], final_time)
+    else:
+        time_interpolate = np.asarray(timestep, dtype=float)
+        start_time, final_time = time_interpolate[0], time_interpolate[-1]
+
+    if ncp is None:
+        steps = np.diff(time_interpolate)
+        if len(steps) > 0 and np.ptp(steps) <= 1e-6 * steps[0]:
+            # make each time of interpolation a communication point
+            ncp = len(steps)
+    args = (list_input, list_output, start_time, final_time, None if ncp is None else int(ncp))
+
+    n_cpus = max(1, min(n_cpus, len(value_input)))
+    blocks = np.array_split(value_input, n_cpus)
+    if n_cpus == 1:
+        list_output_block = [_simulate_trajectory_block(path_fmu, kind, blocks[0], *args)]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=n_cpus) as executor:
+            futures = [executor.submit(_simulate_trajectory_block, path_fmu, kind, block, *args) for block in blocks]
+            list_output_block = [future.result() for future in futures]
+
+    list_time, list_trajectory = zip(*[pair for block in list_output_block for pair in block])
+    return time_interpolate, interpolate_trajectory(list_time, list_trajectory, time_interpolate)
@@ -1,5 +1,8 @@
 from .mo2fmu import mo2fmu
+from . import cache
+from . import codegen
 import binascii
+import concurrent.futures
 import dill
 import glob
 import hashlib
@@ -11,12 +14,360 @@ from pathlib import Path
 import re
 import subprocess
 import shutil
+import struct
 import sys
 import sysconfig
 import tempfile
+import zlib
 
 dill.settings["recurse"] = True
 
+# function XML compressed with zlib, included as a binary resource with the
+# .incbin assembler directive, or with MSVC from a COFF object defining the
+# same symbols, see _coff_object
+_BLOB_TEMPLATE = r"""
+#ifdef __cplusplus
+extern "C" {
+#endif
+#if !defined(_MSC_VER)
+#ifndef OTFMI_BLOB_PATH
+#define OTFMI_BLOB_PATH "function.xml.z"
+#endif
+#if defined(__ELF__)
+#define OTFMI_BLOB_SECTION ".pushsection .rodata\n"
+#define OTFMI_BLOB_POP ".popsection\n"
+#elif defined(__APPLE__)
+#define OTFMI_BLOB_SECTION ".const_data\n"
+#define OTFMI_BLOB_POP ".text\n"
+#else
+#define OTFMI_BLOB_SECTION ".section .rdata,\"dr\"\n"
+#define OTFMI_BLOB_POP ".text\n"
+#endif
+#if defined(__APPLE__) || (defined(_WIN32) && !defined(_WIN64))
+#define OTFMI_BLOB_SYMBOL(name) "_" #name
+#else
+#define OTFMI_BLOB_SYMBOL(name) #name
+#endif
+__asm__(OTFMI_BLOB_SECTION
+        ".balign 16\n"
+        OTFMI_BLOB_SYMBOL(otfmi_blob_{{ xml_hash }}) ":\n"
+        ".incbin \"" OTFMI_BLOB_PATH "\"\n"
+        OTFMI_BLOB_SYMBOL(otfmi_blob_end_{{ xml_hash }}) ":\n"
+        OTFMI_BLOB_POP);
+#endif
+extern const unsigned char otfmi_blob_{{ xml_hash }}[];
+extern const unsigned char otfmi_blob_end_{{ xml_hash }}[];
+#define otfmi_blob otfmi_blob_{{ xml_hash }}
+#define OTFMI_BLOB_SIZE ((size_t)(otfmi_blob_end_{{ xml_hash }} - otfmi_blob_{{ xml_hash }}))
+#ifdef __cplusplus
+}
+#endif
+"""
+
+_BLOB_CMAKE = r"""
+if (NOT OTFMI_BLOB_FILE)
+  set (OTFMI_BLOB_FILE function.xml.z)
+endif ()
+if (MSVC)
+  # no .incbin: link the object defining the blob, also archived in static libraries
+  target_sources (${OTFMI_TARGET} PRIVATE ${CMAKE_CURRENT_SOURCE_DIR}/${OTFMI_BLOB_FILE}.obj)
+else ()
+  target_compile_definitions (${OTFMI_TARGET} PRIVATE OTFMI_BLOB_PATH="${CMAKE_CURRENT_SOURCE_DIR}/${OTFMI_BLOB_FILE}")
+  set_source_files_properties ({{ source }} PROPERTIES OBJECT_DEPENDS ${CMAKE_CURRENT_SOURCE_DIR}/${OTFMI_BLOB_FILE})
+endif ()
+"""
+
+
+def _coff_object(data, xml_hash):
+    """
+    COFF object embedding a blob for MSVC.
+
+    The object has a single read-only data section holding the blob, and
+    defines the symbols otfmi_blob_<xml_hash> at its start and
+    otfmi_blob_end_<xml_hash> at its end, like the .incbin directive of
+    _BLOB_TEMPLATE. The machine is x64, the platform of the CMake builds.
+
+    Parameters
+    ----------
+    data : bytes
+        Content of the blob.
+    xml_hash : str
+        Hash of the function XML, suffix of the symbols.
+
+    Returns
+    -------
+    object_data : bytes
+        Content of the .obj file.
+    """
+    # IMAGE_SCN_CNT_INITIALIZED_DATA | IMAGE_SCN_ALIGN_16BYTES | IMAGE_SCN_MEM_READ
+    characteristics = 0x00000040 | 0x00500000 | 0x40000000
+    names = [f"otfmi_blob_{xml_hash}", f"otfmi_blob_end_{xml_hash}"]
+    offset_data = 20 + 40
+    offset_symbols = offset_data + len(data)
+    header = struct.pack("<HHIIIHH", 0x8664, 1, 0, offset_symbols, len(names), 0, 0)
+    section = struct.pack("<8sIIIIIIHHI", b".rdata", 0, 0, len(data), offset_data, 0, 0, 0, 0, characteristics)
+    # the names are longer than 8 bytes, stored in the string table
+    symbols = b""
+    strings = b""
+    for name, value in zip(names, [0, len(data)]):
+        # IMAGE_SYM_CLASS_EXTERNAL in section 1
+        symbols += struct.pack("<IIIhHBB", 0, 4 + len(strings), value, 1, 0, 2, 0)
+        strings += name.encode() + b"\0"
+    return header + section + data + symbols + struct.pack("<I", 4 + len(strings)) + strings
+
+
+# CMake project building several wrappers at once, with unique target names
+_BATCH_CMAKE = r"""
+cmake_minimum_required (VERSION 3.18)
+set (CMAKE_BUILD_TYPE "Release" CACHE STRING "build type")
+project (wrappers NONE)
+{%- for index in indices %}
+set (OTFMI_TARGET cwrapper{{ index }})
+add_subdirectory (wrapper{{ index }})
+{%- endfor %}
+"""
+
+# runtime files of the C wrappers, shared by all the instances of the fmu in a
+# directory of the temporary directory named after the function; the wrapper
+# defines access, R_OK, mkdir, getpid and SEP
+_RUNTIME_TEMPLATE = r"""
+/* path of a runtime file, or of the runtime directory if the name is empty */
+static void otfmi_runtime_path(char *path, size_t size, const char *name)
+{
+  const char *tmp = NULL;
+#ifdef _WIN32
+  char buffer[MAX_PATH + 1];
+  if (GetTempPathA(sizeof(buffer), buffer) > 0)
+    tmp = buffer;
+#else
+  tmp = getenv("TMPDIR");
+#endif
+  if (!tmp || !tmp[0])
+    tmp = "{{ default_tmp }}";
+  snprintf(path, size, "%s" SEP "otfmi_{{ runtime_hash }}%s%s", tmp, name[0] ? SEP : "", name);
+}
+
+/* create the runtime directory, return 0 on success */
+static int otfmi_runtime_dir(void)
+{
+  char dir_path[4096];
+  otfmi_runtime_path(dir_path, sizeof(dir_path), "");
+  if (access(dir_path, R_OK) == -1)
+    mkdir(dir_path, 0755);
+  return access(dir_path, R_OK) == -1 ? -1 : 0;
+}
+
+/* write a runtime file if it does not exist, return 0 on success */
+static int otfmi_write_file(const char *path, const unsigned char *data, size_t size, const void *owner)
+{
+  char tmp_path[4096];
+  FILE *fptr;
+  size_t written;
+  if (access(path, R_OK) != -1)
+    return 0;
+  /* write then rename, so that concurrent instances never read a partial file */
+  snprintf(tmp_path, sizeof(tmp_path), "%s.%d.%p", path, (int)getpid(), owner);
+  fptr = fopen(tmp_path, "wb");
+  if (!fptr)
+    return -1;
+  written = fwrite(data, sizeof(char), size, fptr);
+  if (fclose(fptr) != 0 || written != size)
+  {
+    remove(tmp_path);
+    return -1;
+  }
+  /* another instance may have written the file first */
+  if (rename(tmp_path, path) != 0)
+    remove(tmp_path);
+  return access(path, R_OK) == -1 ? -1 : 0;
+}
+"""
+
+# portable lock and one-time initialization of the C wrappers
+_THREAD_TEMPLATE = r"""
+#ifdef _WIN32
+#include <windows.h>
+typedef SRWLOCK otfmi_mutex;
+#define OTFMI_MUTEX_INIT SRWLOCK_INIT
+#define otfmi_mutex_lock AcquireSRWLockExclusive
+#define otfmi_mutex_unlock ReleaseSRWLockExclusive
+typedef INIT_ONCE otfmi_once;
+#define OTFMI_ONCE_INIT INIT_ONCE_STATIC_INIT
+static BOOL CALLBACK otfmi_once_callback(PINIT_ONCE once, PVOID routine, PVOID *context)
+{
+  (void)once;
+  (void)context;
+  ((void (*)(void))routine)();
+  return TRUE;
+}
+static void otfmi_call_once(otfmi_once *once, void (*routine)(void))
+{
+  InitOnceExecuteOnce(once, otfmi_once_callback, (PVOID)routine, NULL);
+}
+#else
+#include <pthread.h>
+typedef pthread_mutex_t otfmi_mutex;
+#define OTFMI_MUTEX_INIT PTHREAD_MUTEX_INITIALIZER
+#define otfmi_mutex_lock pthread_mutex_lock
+#define otfmi_mutex_unlock pthread_mutex_unlock
+typedef pthread_once_t otfmi_once;
+#define OTFMI_ONCE_INIT PTHREAD_ONCE_INIT
+#define otfmi_call_once pthread_once
+#endif
+"""
+
+# fixed-size LRU cache of the evaluations, indexed by a hash of the input,
+# shared by the C and C++ wrappers, one per instance
+_CACHE_TEMPLATE = r"""
+#include <string.h>
+#ifdef _MSC_VER
+#include <intrin.h>
+#define OTFMI_ATOMIC_INCREMENT(counter) _InterlockedIncrement64((volatile __int64 *)&(counter))
+#define OTFMI_ATOMIC_LOAD(counter) _InterlockedOr64((volatile __int64 *)&(counter), 0)
+#else
+#define OTFMI_ATOMIC_INCREMENT(counter) __atomic_fetch_add(&(counter), 1, __ATOMIC_RELAXED)
+#define OTFMI_ATOMIC_LOAD(counter) __atomic_load_n(&(counter), __ATOMIC_RELAXED)
+#endif
+
+/* evaluation counters of the caches of all the instances, see otfmi_cache_statistics */
+static unsigned long long otfmi_cache_hits = 0;
+static unsigned long long otfmi_cache_misses = 0;
+
+{%- if cache_size > 0 %}
+#define OTFMI_CACHE_SIZE {{ cache_size }}
+#define OTFMI_CACHE_BUCKETS {{ cache_buckets }}
+
+typedef struct {
+  double x[OTFMI_CACHE_SIZE][{{ input_dim }}];
+  double y[OTFMI_CACHE_SIZE][{{ output_dim }}];
+  unsigned int hash[OTFMI_CACHE_SIZE];
+  int chain[OTFMI_CACHE_SIZE];
+  int previous[OTFMI_CACHE_SIZE];
+  int next[OTFMI_CACHE_SIZE];
+  int bucket[OTFMI_CACHE_BUCKETS];
+  int head;
+  int tail;
+  int used;
+} otfmi_cache;
+
+static void otfmi_cache_init(otfmi_cache *cache)
+{
+  int i;
+  for (i = 0; i < OTFMI_CACHE_BUCKETS; ++ i)
+    cache->bucket[i] = -1;
+  cache->head = -1;
+  cache->tail = -1;
+  cache->used = 0;
+}
+
+/* FNV-1a hash of the input, with -0.0 and 0.0 hashed alike */
+static unsigned int otfmi_cache_hash(const double *x)
+{
+  unsigned int hash = 2166136261u;
+  int i;
+  size_t k;
+  for (i = 0; i < {{ input_dim }}; ++ i)
+  {
+    unsigned char bytes[sizeof(double)];
+    double value = (x[i] == 0.0) ? 0.0 : x[i];
+    memcpy(bytes, &value, sizeof(double));
+    for (k = 0; k < sizeof(double); ++ k)
+      hash = (hash ^ bytes[k]) * 16777619u;
+  }
+  return hash;
+}
+
+static void otfmi_cache_unlink(otfmi_cache *cache, int slot)
+{
+  if (cache->previous[slot] != -1)
+    cache->next[cache->previous[slot]] = cache->next[slot];
+  else
+    cache->head = cache->next[slot];
+  if (cache->next[slot] != -1)
+    cache->previous[cache->next[slot]] = cache->previous[slot];
+  else
+    cache->tail = cache->previous[slot];
+}
+
+static void otfmi_cache_push_front(otfmi_cache *cache, int slot)
+{
+  cache->previous[slot] = -1;
+  cache->next[slot] = cache->head;
+  if (cache->head != -1)
+    cache->previous[cache->head] = slot;
+  cache->head = slot;
+  if (cache->tail == -1)
+    cache->tail = slot;
+}
+
+/* copy the cached output into y and return 1 if the input is cached, return 0 otherwise */
+static int otfmi_cache_lookup(otfmi_cache *cache, const double *x, double *y)
+{
+  const unsigned int hash = otfmi_cache_hash(x);
+  int slot = cache->bucket[hash & (OTFMI_CACHE_BUCKETS - 1)];
+  while (slot != -1)
+  {
+    int i, same = cache->hash[slot] == hash;
+    for (i = 0; same && i < {{ input_dim }}; ++ i)
+      same = cache->x[slot][i] == x[i];
+    if (same)
+    {
+      memcpy(y, cache->y[slot], {{ output_dim }} * sizeof(double));
+      if (slot != cache->head)
+      {
+        otfmi_cache_unlink(cache, slot);
+        otfmi_cache_push_front(cache, slot);
+      }
+      OTFMI_ATOMIC_INCREMENT(otfmi_cache_hits);
+      return 1;
+    }
+    slot = cache->chain[slot];
+  }
+  OTFMI_ATOMIC_INCREMENT(otfmi_cache_misses);
+  return 0;
+}
+
+/* store an evaluation, replacing the least recently used one if the cache is full */
+static void otfmi_cache_insert(otfmi_cache *cache, const double *x, const double *y)
+{
+  const unsigned int hash = otfmi_cache_hash(x);
+  int slot;
+  if (cache->used < OTFMI_CACHE_SIZE)
+    slot = cache->used ++;
+  else
+  {
+    int *link;
+    slot = cache->tail;
+    otfmi_cache_unlink(cache, slot);
+    link = &cache->bucket[cache->hash[slot] & (OTFMI_CACHE_BUCKETS - 1)];
+    while (*link != slot)
+      link = &cache->chain[*link];
+    *link = cache->chain[slot];
+  }
+  memcpy(cache->x[slot], x, {{ input_dim }} * sizeof(double));
+  memcpy(cache->y[slot], y, {{ output_dim }} * sizeof(double));
+  cache->hash[slot] = hash;
+  cache->chain[slot] = cache->bucket[hash & (OTFMI_CACHE_BUCKETS - 1)];
+  cache->bucket[hash & (OTFMI_CACHE_BUCKETS - 1)] = slot;
+  otfmi_cache_push_front(cache, slot);
+}
+{%- endif %}
+
+/* debug entry point: numbers of cache hits and misses, and size of the cache */
+#ifdef __cplusplus
+extern "C"
+#endif
+#ifdef _WIN32
+__declspec(dllexport)
+#endif
+void otfmi_cache_statistics(unsigned long long *hits, unsigned long long *misses, int *size)
+{
+  *hits = OTFMI_ATOMIC_LOAD(otfmi_cache_hits);
+  *misses = OTFMI_ATOMIC_LOAD(otfmi_cache_misses);
+  *size = {{ cache_size }};
+}
+"""
+
 
 class FunctionExporter(object):
     """
@@ -30,14 +381,21 @@ class FunctionExporter(object):
     Parameters
     ----------
     function : :py:class:`openturns.Function` or :py:class:`openturns.PointToFieldFunction`
-        Function to export.
+        Function to export, or :py:class:`openturns.FunctionalChaosResult` to export its metamodel.
         Temporal functions (PointToFieldFunction with mesh dimension=1) can only be exported
-        in fmu format via "pythonfmu" mode.
+        in "cxx" or "pythonfmu" modes.
+        In "native" mode, polynomial chaos metamodels must be given as
+        functional chaos results, as the polynomial basis is not available
+        from the metamodel alone.
     start : sequence of float
         Initial input values.
     """
 
     def __init__(self, function, start=None):
+        self._chaos = None
+        if isinstance(function, ot.FunctionalChaosResult):
+            self._chaos = function
+            function = function.getMetaModel()
         if not hasattr(function, "getInputDimension"):
             raise ValueError("not an openturns.Function")
         if hasattr(function, "getInputMesh"):
@@ -53,10 +411,15 @@ class FunctionExporter(object):
             if len(start) != function.getInputDimension():
                 raise ValueError("wrong input dimension")
         self._start = start
-
-    def _init_workdir(self):
-        """Reinitialize the working directory"""
-        self._workdir = Path(tempfile.mkdtemp())
+        self._cache_size = 1
+        self._wrapper_key = None
+
+    def _init_workdir(self, workdir=None):
+        """Reinitialize the working directory, a new temporary one by default"""
+        if workdir is None:
+            workdir = tempfile.mkdtemp()
+        self._workdir = Path(workdir)
+        self._workdir.mkdir(parents=True, exist_ok=True)
         self._xml_path = self._workdir / "function.xml"
 
     def _export_xml(self):
@@ -71,9 +434,80 @@ class FunctionExporter(object):
         study.add("function", self._function)
         study.save()
 
+    def _write_blob(self):
+        """Write the compressed function XML next to the wrapper source.
+
+        Returns
+        -------
+        xml_hash : str
+            Hash of the function XML.
+
+        xml_size : int
+            Size of the uncompressed XML in bytes.
+        """
+        with open(self._xml_path, "rb") as f:
+            xml_data = f.read()
+        xml_hash = hashlib.md5(xml_data, usedforsecurity=False).hexdigest()[:16]
+        with open(self._workdir / "function.xml.z", "wb") as f:
+            f.write(zlib.compress(xml_data))
+        self._write_blob_object("function.xml.z", xml_hash)
+        return xml_hash, len(xml_data)
+
+    def _write_blob_object(self, name, xml_hash):
+        """Write the object embedding a blob of the working directory for MSVC."""
+        with open(self._workdir / name, "rb") as f:
+            data = f.read()
+        with open(self._workdir / (name + ".obj"), "wb") as f:
+            f.write(_coff_object(data, xml_hash))
+
+    def _is_field(self):
+        """Whether the function is a temporal field function."""
+        return hasattr(self._function, "getOutputMesh")
+
+    def _get_output_size(self):
+        """Number of output values of an evaluation, whole field for field functions."""
+        size = self._function.getOutputDimension()
+        if self._is_field():
+            size *= self._function.getOutputMesh().getVerticesNumber()
+        return size
+
+    def _render_cache(self):
+        """Render the evaluation cache code of the C/C++ wrappers."""
+        buckets = 1
+        while buckets < 2 * self._cache_size:
+            buckets *= 2
+        return jinja2.Template(_CACHE_TEMPLATE).render(
+            {
+                "cache_size": self._cache_size,
+                "cache_buckets": buckets,
+                "input_dim": self._function.getInputDimension(),
+                "output_dim": self._get_output_size(),
+            }
+        )
+
+    def _runtime_hash(self, xml_hash, script):
+        """Name of the runtime directory of the C wrappers, from the function and the script run by the wrapper."""
+        return hashlib.md5(xml_hash.encode() + script, usedforsecurity=False).hexdigest()[:16]
+
+    def _render_runtime(self, runtime_hash):
+        """Render the runtime file code of the C wrappers."""
+        return jinja2.Template(_RUNTIME_TEMPLATE).render(
+            {
+                "runtime_hash": runtime_hash,
+                "default_tmp": tempfile.gettempdir().replace("\\", "\\\\"),
+            }
+        )
+
     def _write_cwrapper_pyprocess(self):
         """
-        Write the C wrapper.
+        Write the C wrapper running a persistent Python worker.
+
+        The worker is started by the constructor of an external object, that
+        is once per FMU instance, and stopped by its destructor. Input and
+        output values are exchanged as binary doubles through a socket pair
+        (a pair of pipes on Windows) connected to the standard input and
+        output of the worker. The workers are started one at a time, so
+        that instances running in parallel threads never share a pipe.
 
         Parameters
         ----------
@@ -84,121 +518,371 @@ class FunctionExporter(object):
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
+#include <math.h>
 #include <sys/stat.h>
 #ifdef _WIN32
+#include <windows.h>
 #include <io.h>
 #include <direct.h>
 #define R_OK 4
+#define X_OK 0
 #define access _access
 #define mkdir(dir, mod) _mkdir(dir)
+#define getpid GetCurrentProcessId
+#define SEP "\\"
 #else
+#include <errno.h>
+#include <fcntl.h>
 #include <unistd.h>
+#include <sys/socket.h>
+#include <sys/types.h>
+#include <sys/wait.h>
+#define SEP "/"
 #endif
-unsigned char xml_data[] = { {{ xml_data_bin }} };
-void c_func(int nin, double x[], int nout, double y[]) {
-  FILE *fptr;
-  int rc;
-  int i;
-  static int count = 0;
-  static int hits = 0;
-  int same_x;
-  static double prev_x[{{ input_dim }}];
-  static double prev_y[{{ output_dim }}];
-  same_x = count;
-  for (i = 0; i < nin; ++ i) {
-    if(x[i] != prev_x[i]) same_x = 0;
+
+{{ blob_code }}
+static const unsigned char worker_data[] = { {{ worker_data_bin }} };
+{{ thread_code }}
+{{ cache_code }}
+
+/* the workers are started one at a time, so that each one only inherits its own pipes */
+static otfmi_mutex otfmi_start_mutex = OTFMI_MUTEX_INIT;
+
+typedef struct {
+#ifdef _WIN32
+  HANDLE process;
+  HANDLE to_worker;
+  HANDLE from_worker;
+#else
+  pid_t pid;
+  int fd;
+#endif
+  int alive;
+{%- if cache_size > 0 %}
+  otfmi_cache cache;
+{%- endif %}
+} otfmi_worker;
+
+{{ runtime_code }}
+static int otfmi_worker_spawn(otfmi_worker *worker)
+{
+  char xml_path[4096], py_path[4096], log_path[4096];
+  const char *python = "{{ python_executable }}";
+  otfmi_runtime_path(xml_path, sizeof(xml_path), "function.xml.z");
+  otfmi_runtime_path(py_path, sizeof(py_path), "worker.py");
+  otfmi_runtime_path(log_path, sizeof(log_path), "error.log");
+  if (otfmi_runtime_dir() != 0
+      || otfmi_write_file(xml_path, otfmi_blob, OTFMI_BLOB_SIZE, worker) != 0
+      || otfmi_write_file(py_path, worker_data, sizeof(worker_data), worker) != 0)
+    return -1;
+  /* fall back to the interpreter of the PATH if the one of the export is not available */
+  if (access(python, X_OK) == -1)
+    python = "{{ python_fallback }}";
+#ifdef _WIN32
+  {
+    SECURITY_ATTRIBUTES sa = {sizeof(SECURITY_ATTRIBUTES), NULL, TRUE};
+    HANDLE child_in = NULL, child_out = NULL, log = INVALID_HANDLE_VALUE;
+    STARTUPINFOA si;
+    PROCESS_INFORMATION pi;
+    char command[3 * 4096 + 16];
+    BOOL ok;
+    if (!CreatePipe(&child_in, &worker->to_worker, &sa, 0))
+      return -1;
+    if (!CreatePipe(&worker->from_worker, &child_out, &sa, 0))
+    {
+      CloseHandle(child_in);
+      CloseHandle(worker->to_worker);
+      return -1;
+    }
+    SetHandleInformation(worker->to_worker, HANDLE_FLAG_INHERIT, 0);
+    SetHandleInformation(worker->from_worker, HANDLE_FLAG_INHERIT, 0);
+    log = CreateFileA(log_path, FILE_APPEND_DATA, FILE_SHARE_READ | FILE_SHARE_WRITE, &sa,
+                      OPEN_ALWAYS, FILE_ATTRIBUTE_NORMAL, NULL);
+    ZeroMemory(&si, sizeof(si));
+    si.cb = sizeof(si);
+    si.dwFlags = STARTF_USESTDHANDLES;
+    si.hStdInput = child_in;
+    si.hStdOutput = child_out;
+    si.hStdError = log;
+    snprintf(command, sizeof(command), "\"%s\" \"%s\" \"%s\"", python, py_path, xml_path);
+    ok = CreateProcessA(NULL, command, NULL, NULL, TRUE, CREATE_NO_WINDOW, NULL, NULL, &si, &pi);
+    CloseHandle(child_in);
+    CloseHandle(child_out);
+    if (log != INVALID_HANDLE_VALUE)
+      CloseHandle(log);
+    if (!ok)
+    {
+      CloseHandle(worker->to_worker);
+      CloseHandle(worker->from_worker);
+      return -1;
+    }
+    CloseHandle(pi.hThread);
+    worker->process = pi.hProcess;
   }
-  if (!same_x) {
-    /*printf("count=%d hits=%d\n", count, hits);*/
-    char workdir[] = "{{ workdir }}";
-    if (access(workdir, R_OK) == -1)
-      mkdir(workdir, 0733);
-    fptr = fopen("{{ path_point_in }}", "w");
-    for (i = 0; i < nin; ++ i)
-      fprintf(fptr, "%lf\n", x[i]);
-    fclose(fptr);
-    char xml_path[] = "{{ path_function_xml }}";
-    if (access(xml_path, R_OK) == -1) {
-      fptr = fopen(xml_path, "wb");
-      fwrite (xml_data, sizeof(char), sizeof(xml_data), fptr);
-      fclose(fptr);
+#else
+  {
+    int fds[2];
+    pid_t pid;
+    /* the workers of other instances must not inherit this socket */
+#ifdef SOCK_CLOEXEC
+    if (socketpair(AF_UNIX, SOCK_STREAM | SOCK_CLOEXEC, 0, fds) != 0)
+      return -1;
+#else
+    if (socketpair(AF_UNIX, SOCK_STREAM, 0, fds) != 0)
+      return -1;
+    fcntl(fds[0], F_SETFD, FD_CLOEXEC);
+    fcntl(fds[1], F_SETFD, FD_CLOEXEC);
+#endif
+#ifdef SO_NOSIGPIPE
+    {
+      int one = 1;
+      setsockopt(fds[0], SOL_SOCKET, SO_NOSIGPIPE, &one, sizeof(one));
     }
-    char py_path[] = "{{ path_wrapper_py }}";
-    if (access(py_path, R_OK) == -1) {
-      fptr = fopen(py_path, "w");
-      fprintf(fptr, "import openturns as ot\n");
-      fprintf(fptr, "study = ot.Study()\n");
-      fprintf(fptr, "study.setStorageManager(ot.XMLStorageManager(r\"%s\"))\n", xml_path);
-      fprintf(fptr, "study.load()\n");
-      fprintf(fptr, "function = ot.Function()\n");
-      fprintf(fptr, "study.fillObject(\"function\", function)\n");
-      fprintf(fptr, "x = []\n");
-      fprintf(fptr, "with open(r\"{{ path_point_in }}\", \"r\") as f:\n");
-      fprintf(fptr, "    for line in f.readlines():\n");
-      fprintf(fptr, "        x.append(float(line))\n");
-      fprintf(fptr, "y = function(x)\n");
-      fprintf(fptr, "with open(r\"{{ path_point_out }}\", \"w\") as f:\n");
-      fprintf(fptr, "    for v in y:\n");
-      fprintf(fptr, "        f.write(str(v)+\"\\n\")\n");
-      fclose(fptr);
+#endif
+    pid = fork();
+    if (pid == -1)
+    {
+      close(fds[0]);
+      close(fds[1]);
+      return -1;
     }
-    rc = system("python3 {{ path_wrapper_py }} > {{ path_error_log }} 2>&1");
-    if (rc != 0)
-      printf("otfmi: error running \"python {{ path_wrapper_py }}\" rc=%d\n", rc);
-    fptr = fopen("{{ path_point_out }}", "r");
-    for (i = 0; i < nout; ++ i)
-      rc = fscanf(fptr, "%lf", &y[i]);
-    fclose(fptr);
+    if (pid == 0)
+    {
+      int log = open(log_path, O_WRONLY | O_CREAT | O_APPEND, 0644);
+      dup2(fds[1], 0);
+      dup2(fds[1], 1);
+      if (log != -1)
+        dup2(log, 2);
+      close(fds[0]);
+      close(fds[1]);
+      execlp(python, python, py_path, xml_path, (char *)NULL);
+      _exit(127);
+    }
+    close(fds[1]);
+    worker->fd = fds[0];
+    worker->pid = pid;
+  }
+#endif
+  worker->alive = 1;
+  return 0;
+}
+
+static int otfmi_worker_start(otfmi_worker *worker)
+{
+  int status;
+  otfmi_mutex_lock(&otfmi_start_mutex);
+  status = otfmi_worker_spawn(worker);
+  otfmi_mutex_unlock(&otfmi_start_mutex);
+  return status;
+}
 
-    memcpy(prev_x, x, nin * sizeof(double));
-    memcpy(prev_y, y, nout * sizeof(double));
+static void otfmi_worker_stop(otfmi_worker *worker)
+{
+  if (!worker->alive)
+    return;
+  worker->alive = 0;
+  /* the worker exits at the end of its input */
+#ifdef _WIN32
+  CloseHandle(worker->to_worker);
+  WaitForSingleObject(worker->process, 10000);
+  CloseHandle(worker->from_worker);
+  CloseHandle(worker->process);
+#else
+  close(worker->fd);
+  while (waitpid(worker->pid, NULL, 0) == -1 && errno == EINTR) {}
+#endif
+}
+
+static int otfmi_worker_write(otfmi_worker *worker, const void *data, size_t size)
+{
+  const char *buffer = (const char *)data;
+  while (size > 0)
+  {
+#ifdef _WIN32
+    DWORD n = 0;
+    if (!WriteFile(worker->to_worker, buffer, (DWORD)size, &n, NULL))
+      return -1;
+#else
+#ifdef MSG_NOSIGNAL
+    ssize_t n = send(worker->fd, buffer, size, MSG_NOSIGNAL);
+#else
+    ssize_t n = send(worker->fd, buffer, size, 0);
+#endif
+    if (n == -1 && errno == EINTR)
+      continue;
+    if (n <= 0)
+      return -1;
+#endif
+    buffer += n;
+    size -= n;
   }
-  else
-    ++ hits;
-    memcpy(y, prev_y, nout * sizeof(double));
-  ++ count;
+  return 0;
+}
+
+static int otfmi_worker_read(otfmi_worker *worker, void *data, size_t size)
+{
+  char *buffer = (char *)data;
+  while (size > 0)
+  {
+#ifdef _WIN32
+    DWORD n = 0;
+    if (!ReadFile(worker->from_worker, buffer, (DWORD)size, &n, NULL) || n == 0)
+      return -1;
+#else
+    ssize_t n = recv(worker->fd, buffer, size, 0);
+    if (n == -1 && errno == EINTR)
+      continue;
+    if (n <= 0)
+      return -1;
+#endif
+    buffer += n;
+    size -= n;
+  }
+  return 0;
+}
+
+#ifdef _WIN32
+__declspec(dllexport)
+#endif
+void *otfmi_context_new(void)
+{
+  otfmi_worker *worker = (otfmi_worker *)calloc(1, sizeof(otfmi_worker));
+  if (!worker)
+    return NULL;
+{%- if cache_size > 0 %}
+  otfmi_cache_init(&worker->cache);
+{%- endif %}
+  if (otfmi_worker_start(worker) != 0)
+    fprintf(stderr, "otfmi: cannot start the python worker\n");
+  return worker;
 }
 
+#ifdef _WIN32
+__declspec(dllexport)
+#endif
+void otfmi_context_free(void *object)
+{
+  otfmi_worker *worker = (otfmi_worker *)object;
+  if (!worker)
+    return;
+  otfmi_worker_stop(worker);
+  free(worker);
+}
+
+#ifdef _WIN32
+__declspec(dllexport)
+#endif
+void otfmi_context_evaluate(void *object, int nin, double x[], int nout, double y[])
+{
+  otfmi_worker *worker = (otfmi_worker *)object;
+  int i;
+{%- if cache_size > 0 %}
+  if (otfmi_cache_lookup(&worker->cache, x, y))
+    return;
+{%- endif %}
+  if (!worker->alive && otfmi_worker_start(worker) != 0)
+  {
+    fprintf(stderr, "otfmi: cannot start the python worker\n");
+    for (i = 0; i < nout; ++ i)
+      y[i] = NAN;
+    return;
+  }
+  if (otfmi_worker_write(worker, x, nin * sizeof(double)) != 0
+      || otfmi_worker_read(worker, y, nout * sizeof(double)) != 0)
+  {
+    char log_path[4096];
+    otfmi_runtime_path(log_path, sizeof(log_path), "error.log");
+    fprintf(stderr, "otfmi: the python worker failed, see %s\n", log_path);
+    otfmi_worker_stop(worker);
+    for (i = 0; i < nout; ++ i)
+      y[i] = NAN;
+    return;
+  }
+{%- if cache_size > 0 %}
+  otfmi_cache_insert(&worker->cache, x, y);
+{%- endif %}
+}
 """
 
-        with open(self._xml_path, "rb") as f:
-            xml_data = f.read()
+        # evaluation loop of the worker, the compressed XML path is passed as argument
+        worker_data = b"""import array
+import os
+import sys
+import zlib
+import openturns as ot
+
+xml_path = os.path.splitext(sys.argv[1])[0]
+if not os.path.exists(xml_path):
+    with open(sys.argv[1], "rb") as f:
+        xml_data = zlib.decompress(f.read())
+    with open(f"{xml_path}.{os.getpid()}", "wb") as f:
+        f.write(xml_data)
+    os.replace(f"{xml_path}.{os.getpid()}", xml_path)
+study = ot.Study()
+study.setStorageManager(ot.XMLStorageManager(xml_path))
+study.load()
+function = ot.Function()
+study.fillObject("function", function)
+input_dimension = function.getInputDimension()
+output_dimension = function.getOutputDimension()
+stdin = sys.stdin.buffer
+stdout = sys.stdout.buffer
+while True:
+    data = stdin.read(8 * input_dimension)
+    if len(data) < 8 * input_dimension:
+        break
+    try:
+        y = array.array("d", function(array.array("d", data)))
+    except Exception as exc:
+        print(exc, file=sys.stderr, flush=True)
+        y = array.array("d", [float("nan")] * output_dimension)
+    stdout.write(y.tobytes())
+    stdout.flush()
+"""
 
+        xml_hash, _ = self._write_blob()
         data = jinja2.Template(tdata).render(
             {
-                "xml_data_bin": ",".join(
-                    ["0x{:02x}".format(byte) for byte in xml_data]
+                "blob_code": jinja2.Template(_BLOB_TEMPLATE).render({"xml_hash": xml_hash}),
+                "worker_data_bin": ",".join(
+                    ["0x{:02x}".format(byte) for byte in worker_data]
                 ),
+                "runtime_code": self._render_runtime(self._runtime_hash(xml_hash, worker_data)),
+                "thread_code": _THREAD_TEMPLATE,
+                "cache_code": self._render_cache(),
+                "cache_size": self._cache_size,
                 "input_dim": self._function.getInputDimension(),
                 "output_dim": self._function.getOutputDimension(),
-                "workdir": str(self._workdir).replace("\\", "\\\\"),
-                "path_point_in": str(self._workdir / "point.in").replace("\\", "\\\\"),
-                "path_point_out": str(self._workdir / "point.out").replace("\\", "\\\\"),
-                "path_wrapper_py": str(self._workdir / "wrapper.py").replace("\\", "\\\\"),
-                "path_error_log": str(self._workdir / "error.log").replace("\\", "\\\\"),
-                "path_function_xml": str(self._workdir / "function.xml").replace("\\", "\\\\"),
+                "python_executable": sys.executable.replace("\\", "\\\\"),
+                "python_fallback": "python" if sys.platform.startswith("win") else "python3",
             }
         )
         with open(self._workdir / "wrapper.c", "w") as c:
             c.write(data)
 
         # write CMakeLists
-        data = """
+        data = jinja2.Template("""
 cmake_minimum_required (VERSION 3.18)
 set (CMAKE_BUILD_TYPE "Release" CACHE STRING "build type")
 project (wrapper C)
 
+# target name, unique when the wrapper is built in a batch project
+if (NOT OTFMI_TARGET)
+  set (OTFMI_TARGET cwrapper)
+endif ()
+
 # openmodelica uses -Bstatic on Linux
-add_library (cwrapper STATIC wrapper.c)
-set_target_properties (cwrapper PROPERTIES POSITION_INDEPENDENT_CODE ON
-                                           ARCHIVE_OUTPUT_DIRECTORY_RELEASE ${CMAKE_BINARY_DIR}
-                                           LIBRARY_OUTPUT_DIRECTORY_RELEASE ${CMAKE_BINARY_DIR}
-                                           RUNTIME_OUTPUT_DIRECTORY_RELEASE ${CMAKE_BINARY_DIR}
+add_library (${OTFMI_TARGET} STATIC wrapper.c)
+set_target_properties (${OTFMI_TARGET} PROPERTIES OUTPUT_NAME cwrapper)
+set_target_properties (${OTFMI_TARGET} PROPERTIES POSITION_INDEPENDENT_CODE ON
+                                           ARCHIVE_OUTPUT_DIRECTORY_RELEASE ${CMAKE_CURRENT_BINARY_DIR}
+                                           LIBRARY_OUTPUT_DIRECTORY_RELEASE ${CMAKE_CURRENT_BINARY_DIR}
+                                           RUNTIME_OUTPUT_DIRECTORY_RELEASE ${CMAKE_CURRENT_BINARY_DIR}
                                            MSVC_RUNTIME_LIBRARY "MultiThreaded$<$<CONFIG:Debug>:Debug>")
 if (MSVC)
-  target_compile_definitions(cwrapper PRIVATE _CRT_SECURE_NO_WARNINGS)
+  target_compile_definitions(${OTFMI_TARGET} PRIVATE _CRT_SECURE_NO_WARNINGS)
 endif()
-"""
+""" + _BLOB_CMAKE).render({"source": "wrapper.c"})
         with open(self._workdir / "CMakeLists.txt", "w") as cm:
             cm.write(data)
 
@@ -206,6 +890,13 @@ endif()
         """
         Write the C wrapper with Python C API.
 
+        The interpreter is initialized once per process, and each FMU
+        instance loads its own copy of the function through an external
+        object. Evaluations hold the GIL, so that instances can be run from
+        several threads, including in a Python host process.
+        The compressed XML and the module loading it are written at runtime
+        in a directory of the temporary directory named after the function.
+
         Parameters
         ----------
         """
@@ -216,139 +907,199 @@ endif()
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
+#include <math.h>
 #include <sys/stat.h>
 #ifdef _WIN32
+#include <windows.h>
 #include <io.h>
 #include <direct.h>
 #define R_OK 4
 #define access _access
 #define mkdir(dir, mod) _mkdir(dir)
+#define getpid GetCurrentProcessId
+#define SEP "\\"
 #else
 #include <unistd.h>
+#define SEP "/"
 #endif
 #include <Python.h>
-unsigned char xml_data[] = { {{ xml_data_bin }} };
+{{ blob_code }}
+static const unsigned char module_data[] = { {{ module_data_bin }} };
+{{ runtime_code }}
+{{ thread_code }}
+{{ cache_code }}
+
+typedef struct {
+  PyObject *function;
+{%- if cache_size > 0 %}
+  otfmi_cache cache;
+{%- endif %}
+} otfmi_context;
+
+/* module loading the function, shared by all the instances */
+static otfmi_once otfmi_python_once = OTFMI_ONCE_INIT;
+static PyObject *otfmi_module = NULL;
+
+static void otfmi_python_init(void)
+{
+  PyGILState_STATE state;
+  PyObject *sys_path;
+  char dir_path[4096], blob_path[4096], py_path[4096];
+  otfmi_runtime_path(dir_path, sizeof(dir_path), "");
+  otfmi_runtime_path(blob_path, sizeof(blob_path), "function.xml.z");
+  otfmi_runtime_path(py_path, sizeof(py_path), "{{ module_name }}.py");
+  if (otfmi_runtime_dir() != 0
+      || otfmi_write_file(blob_path, otfmi_blob, OTFMI_BLOB_SIZE, &otfmi_module) != 0
+      || otfmi_write_file(py_path, module_data, sizeof(module_data), &otfmi_module) != 0)
+  {
+    fprintf(stderr, "otfmi: cannot write the runtime files in %s\n", dir_path);
+    return;
+  }
+  if (!Py_IsInitialized())
+  {
+    Py_InitializeEx(0);
+    /* release the GIL acquired by the initialization, each call acquires it */
+    PyEval_SaveThread();
+  }
+  state = PyGILState_Ensure();
+  sys_path = PySys_GetObject("path");
+  if (sys_path)
+  {
+    PyObject *folder_path = PyUnicode_FromString(dir_path);
+    PyList_Append(sys_path, folder_path);
+    Py_XDECREF(folder_path);
+  }
+  otfmi_module = PyImport_ImportModule("{{ module_name }}");
+  if (!otfmi_module)
+    PyErr_Print();
+  PyGILState_Release(state);
+}
 
 #ifdef _WIN32
 __declspec(dllexport)
 #endif
-void c_func(int nin, double x[], int nout, double y[])
+void *otfmi_context_new(void)
 {
-  FILE *fptr;
-  static int count = 0;
-  PyObject *pName = NULL;
-  static PyObject *pFunc = NULL;
-  PyObject *pX = NULL;
-  PyObject *pY = NULL;
-  PyObject *pValue = NULL;
-  PyObject *pModule = NULL;
-  int i;
-  if (!pFunc)
-  {
-    char workdir[] = "{{ workdir }}";
-    if (access(workdir, R_OK) == -1)
-      mkdir(workdir, 0733);
-    char xml_path[] = "{{ path_function_xml }}";
-    if (access(xml_path, R_OK) == -1)
-    {
-      fptr = fopen(xml_path, "wb");
-      fwrite (xml_data, sizeof(char), sizeof(xml_data), fptr);
-      fclose(fptr);
-    }
-    char py_path[] = "{{ path_wrapper_py }}";
-    if (access(py_path, R_OK) == -1) {
-      fptr = fopen(py_path, "w");
-      fprintf(fptr, "import openturns as ot\n");
-      fprintf(fptr, "study = ot.Study()\n");
-      fprintf(fptr, "xml_path = r\"%s\"\n", xml_path);
-      fprintf(fptr, "study.setStorageManager(ot.XMLStorageManager(xml_path))\n");
-      fprintf(fptr, "study.load()\n");
-      fprintf(fptr, "function = ot.Function()\n");
-      fprintf(fptr, "study.fillObject(\"function\", function)\n");
-      fprintf(fptr, "def wrap_evaluate_python(x):\n");
-      fprintf(fptr, "    y = function(list(x))\n");
-      //fprintf(fptr, "    print(x, y)\n");
-      fprintf(fptr, "    return y\n");
-      fclose(fptr);
-    }
-    Py_Initialize();
-    if (PyErr_Occurred())
-    {
-       PyErr_Print();
-       return;
-    }
-    pName = PyUnicode_FromString(py_path);
-    if (PyErr_Occurred())
-    {
-       PyErr_Print();
-       return;
-    }
-    PyObject* sys = PyImport_ImportModule("sys");
-    PyObject* sys_path = PyObject_GetAttrString(sys, "path");
-    PyObject* folder_path = PyUnicode_FromString(workdir);
-    PyList_Append(sys_path, folder_path);
-    PyObject* wrapper_name = PyUnicode_FromString("wrapper");
-    pModule = PyImport_Import(wrapper_name);
-    if (PyErr_Occurred())
-    {
-       PyErr_Print();
-       return;
-    }
-    Py_DECREF(pName);
+  PyGILState_STATE state;
+  otfmi_context *context = (otfmi_context *)calloc(1, sizeof(otfmi_context));
+  if (!context)
+    return NULL;
+{%- if cache_size > 0 %}
+  otfmi_cache_init(&context->cache);
+{%- endif %}
+  otfmi_call_once(&otfmi_python_once, otfmi_python_init);
+  if (!otfmi_module)
+    return context;
+  state = PyGILState_Ensure();
+  context->function = PyObject_CallMethod(otfmi_module, "load", NULL);
+  if (!context->function)
+    PyErr_Print();
+  PyGILState_Release(state);
+  return context;
+}
 
-    pFunc = PyObject_GetAttrString(pModule, "wrap_evaluate_python");
-    if (PyErr_Occurred())
-    {
-       PyErr_Print();
-       return;
-    }
+#ifdef _WIN32
+__declspec(dllexport)
+#endif
+void otfmi_context_free(void *object)
+{
+  otfmi_context *context = (otfmi_context *)object;
+  if (!context)
+    return;
+  if (context->function && Py_IsInitialized())
+  {
+    PyGILState_STATE state = PyGILState_Ensure();
+    Py_DECREF(context->function);
+    PyGILState_Release(state);
   }
+  free(context);
+}
 
-  //printf("-- pFunc=%x\n", pFunc);
-  if (pFunc)
+#ifdef _WIN32
+__declspec(dllexport)
+#endif
+void otfmi_context_evaluate(void *object, int nin, double x[], int nout, double y[])
+{
+  otfmi_context *context = (otfmi_context *)object;
+  PyGILState_STATE state;
+  PyObject *pX = NULL;
+  PyObject *pY = NULL;
+  PyObject *pValue = NULL;
+  int i, failed;
+{%- if cache_size > 0 %}
+  if (context && otfmi_cache_lookup(&context->cache, x, y))
+    return;
+{%- endif %}
+  for (i = 0; i < nout; ++ i)
+    y[i] = NAN;
+  if (!context || !context->function)
+    return;
+  state = PyGILState_Ensure();
+  pX = PyTuple_New(nin);
+  for (i = 0; i < nin; ++ i)
+    PyTuple_SetItem(pX, i, PyFloat_FromDouble(x[i]));
+  pY = PyObject_CallOneArg(context->function, pX);
+  Py_DECREF(pX);
+  if (pY)
   {
-    pX = PyTuple_New({{ input_dim }});
-    for (i = 0; i < {{ input_dim }}; ++i)
-    {
-      pValue = PyFloat_FromDouble(x[i]);
-      PyTuple_SetItem(pX, i, pValue);
-      //printf("-- x=%g\n", x[i]); fflush(stdout);
-    }
-    pY = PyObject_CallOneArg(pFunc, pX);
-    if (PyErr_Occurred())
-    {
-       PyErr_Print();
-       return;
-    }
-    for (i = 0; i < {{ output_dim }}; ++i)
+    // OT returns a Point
+    for (i = 0; i < nout; ++ i)
     {
-      // OT returns a Point
       pValue = PySequence_GetItem(pY, i);
+      if (!pValue)
+        break;
       y[i] = PyFloat_AsDouble(pValue);
       Py_DECREF(pValue);
-      //printf("-- y=%g\n", y[i]); fflush(stdout);
     }
+    Py_DECREF(pY);
   }
-
-  ++ count;
+  failed = PyErr_Occurred() != NULL;
+  if (failed)
+    PyErr_Print();
+  PyGILState_Release(state);
+{%- if cache_size > 0 %}
+  if (!failed)
+    otfmi_cache_insert(&context->cache, x, y);
+{%- endif %}
 }
 """
-        with open(self._xml_path, "rb") as f:
-            xml_data = f.read()
+        # module loading the function, next to the compressed XML
+        module_data = b"""import os
+import zlib
+import openturns as ot
+
+xml_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "function.xml")
+if not os.path.exists(xml_path):
+    with open(xml_path + ".z", "rb") as f:
+        xml_data = zlib.decompress(f.read())
+    with open(f"{xml_path}.{os.getpid()}", "wb") as f:
+        f.write(xml_data)
+    os.replace(f"{xml_path}.{os.getpid()}", xml_path)
+
+
+def load():
+    study = ot.Study()
+    study.setStorageManager(ot.XMLStorageManager(xml_path))
+    study.load()
+    function = ot.Function()
+    study.fillObject("function", function)
+
+    def wrap_evaluate_python(x):
+        return function(list(x))
+    return wrap_evaluate_python
+"""
 
+        xml_hash, _ = self._write_blob()
+        runtime_hash = self._runtime_hash(xml_hash, module_data)
         data = jinja2.Template(tdata).render(
             {
-                "xml_data_bin": ",".join(
-                    ["0x{:02x}".format(byte) for byte in xml_data]
-                ),
-                "input_dim": self._function.getInputDimension(),
-                "output_dim": self._function.getOutputDimension(),
-                "workdir": str(self._workdir).replace("\\", "\\\\"),
-                "path_point_in": str(self._workdir / "point.in").replace("\\", "\\\\"),
-                "path_point_out": str(self._workdir / "point.out").replace("\\", "\\\\"),
-                "path_wrapper_py": str(self._workdir / "wrapper.py").replace("\\", "\\\\"),
-                "path_error_log": str(self._workdir / "error.log").replace("\\", "\\\\"),
-                "path_function_xml": str(self._workdir / "function.xml").replace("\\", "\\\\"),
+                "blob_code": jinja2.Template(_BLOB_TEMPLATE).render({"xml_hash": xml_hash}),
+                "module_data_bin": ",".join(["0x{:02x}".format(byte) for byte in module_data]),
+                "module_name": f"otfmi_{runtime_hash}",
+                "runtime_code": self._render_runtime(runtime_hash),
+                "thread_code": _THREAD_TEMPLATE,
+                "cache_code": self._render_cache(),
+                "cache_size": self._cache_size,
             }
         )
         with open(self._workdir / "wrapper.c", "w") as c:
@@ -360,20 +1111,26 @@ cmake_minimum_required (VERSION 3.18)
 set (CMAKE_BUILD_TYPE "Release" CACHE STRING "build type")
 project (wrapper C)
 
+# target name, unique when the wrapper is built in a batch project
+if (NOT OTFMI_TARGET)
+  set (OTFMI_TARGET cwrapper)
+endif ()
+
 # link dynamically for Python
-add_library (cwrapper SHARED wrapper.c)
+add_library (${{OTFMI_TARGET}} SHARED wrapper.c)
+set_target_properties (${{OTFMI_TARGET}} PROPERTIES OUTPUT_NAME cwrapper)
 
 find_package (Python {sysconfig.get_python_version()} COMPONENTS Development EXACT REQUIRED)
-target_link_libraries(cwrapper PRIVATE Python::Python)
+target_link_libraries(${{OTFMI_TARGET}} PRIVATE Python::Python)
 
-set_target_properties (cwrapper PROPERTIES MSVC_RUNTIME_LIBRARY "MultiThreaded$<$<CONFIG:Debug>:Debug>"
-                                           ARCHIVE_OUTPUT_DIRECTORY_RELEASE ${{CMAKE_BINARY_DIR}}
-                                           LIBRARY_OUTPUT_DIRECTORY_RELEASE ${{CMAKE_BINARY_DIR}}
-                                           RUNTIME_OUTPUT_DIRECTORY_RELEASE ${{CMAKE_BINARY_DIR}})
+set_target_properties (${{OTFMI_TARGET}} PROPERTIES MSVC_RUNTIME_LIBRARY "MultiThreaded$<$<CONFIG:Debug>:Debug>"
+                                           ARCHIVE_OUTPUT_DIRECTORY_RELEASE ${{CMAKE_CURRENT_BINARY_DIR}}
+                                           LIBRARY_OUTPUT_DIRECTORY_RELEASE ${{CMAKE_CURRENT_BINARY_DIR}}
+                                           RUNTIME_OUTPUT_DIRECTORY_RELEASE ${{CMAKE_CURRENT_BINARY_DIR}})
 if (MSVC)
-  target_compile_definitions(cwrapper PRIVATE _CRT_SECURE_NO_WARNINGS)
+  target_compile_definitions(${{OTFMI_TARGET}} PRIVATE _CRT_SECURE_NO_WARNINGS)
 endif()
-"""
+""" + jinja2.Template(_BLOB_CMAKE).render({"source": "wrapper.c"})
         with open(self._workdir / "CMakeLists.txt", "w") as cm:
             cm.write(data)
 
@@ -381,65 +1138,229 @@ endif()
         """
         Write the C wrapper using OT C++ API.
 
+        Each FMU instance loads its own copy of the function through an
+        external object, the XML is uncompressed once per process and the
+        functions are loaded one at a time.
+
         Parameters
         ----------
         """
-        with open(self._xml_path, "rb") as f:
-            xml_data = f.read()
-
         tdata = r"""
 #include <openturns/OT.hxx>
 #include <openturns/XMLStorageManager.hxx>
+#include <algorithm>
+#include <cmath>
 #include <fstream>
 #include <filesystem>
+#include <mutex>
+#include <random>
+#include <vector>
+#ifndef OTFMI_BLOB_RAW
+#include <zlib.h>
+#endif
 
 using namespace OT;
 
-const char xml_data[] = { {{ xml_data_bin }} };
-Function function;
+{{ blob_code }}
+{{ cache_code }}
+
+struct otfmi_context
+{
+{%- if field %}
+  PointToFieldFunction function;
+  // time grid, field of the last input, and interval of the last time
+  Point time;
+  std::vector<double> input;
+  std::vector<double> field = std::vector<double>({{ field_size }});
+  UnsignedInteger index = 0;
+{%- else %}
+  Function function;
+{%- endif %}
+{%- if cache_size > 0 %}
+  otfmi_cache cache;
+{%- endif %}
+};
+
+// XML of the function, uncompressed once and shared by all the instances
+static std::once_flag otfmi_xml_once;
+static std::vector<unsigned char> otfmi_xml;
+// the instances load their function one at a time
+static std::mutex otfmi_load_mutex;
+
+static void otfmi_uncompress()
+{
+#ifdef OTFMI_BLOB_RAW
+  otfmi_xml.assign(otfmi_blob, otfmi_blob + OTFMI_BLOB_SIZE);
+#else
+  otfmi_xml.resize({{ xml_size }});
+  uLongf size = otfmi_xml.size();
+  if (uncompress(otfmi_xml.data(), &size, otfmi_blob, OTFMI_BLOB_SIZE) != Z_OK)
+    otfmi_xml.clear();
+#endif
+}
+
+static void otfmi_load(otfmi_context *context)
+{
+  std::call_once(otfmi_xml_once, otfmi_uncompress);
+  if (otfmi_xml.empty())
+    throw InvalidArgumentException(HERE) << "Invalid function data";
+  std::lock_guard<std::mutex> lock(otfmi_load_mutex);
+  // file name unique to this process, other processes may load the same function
+  const String fileName = (std::filesystem::temp_directory_path()
+                           / ("function_{{ xml_hash }}_" + std::to_string(std::random_device()()) + ".xml")).string();
+  std::ofstream xmlFile(fileName, std::ios::out | std::ios::binary);
+  xmlFile.write(reinterpret_cast<const char *>(otfmi_xml.data()), otfmi_xml.size());
+  xmlFile.close();
+  Study study;
+  study.setStorageManager(XMLStorageManager(fileName));
+  try
+  {
+    study.load();
+  }
+  catch (...)
+  {
+    Os::Remove(fileName);
+    throw;
+  }
+  Os::Remove(fileName);
+  study.fillObject("function", context->function);
+  if (context->function.getInputDimension() != {{ input_dim }})
+    throw InvalidDimensionException(HERE) << "Invalid input dimension";
+  if (context->function.getOutputDimension() != {{ output_dim }})
+    throw InvalidDimensionException(HERE) << "Invalid output dimension";
+{%- if field %}
+  context->time = context->function.getOutputMesh().getVertices().asPoint();
+{%- endif %}
+}
 
 extern "C" {
 
 #ifdef _WIN32
 __declspec(dllexport)
 #endif
-void c_func(int nin, double x[], int nout, double y[])
+void *otfmi_context_new(void)
+{
+  otfmi_context *context = new otfmi_context;
+{%- if cache_size > 0 %}
+  otfmi_cache_init(&context->cache);
+{%- endif %}
+  try
+  {
+    otfmi_load(context);
+  }
+  catch (const std::exception & exc)
+  {
+    std::cerr << "otfmi: cannot load the function: " << exc.what() << std::endl;
+    delete context;
+    return nullptr;
+  }
+  return context;
+}
+
+#ifdef _WIN32
+__declspec(dllexport)
+#endif
+void otfmi_context_free(void *object)
+{
+  delete static_cast<otfmi_context *>(object);
+}
+{%- if field %}
+
+#ifdef _WIN32
+__declspec(dllexport)
+#endif
+void otfmi_context_field_evaluate(void *object, int nin, double x[], double t, int nout, double y[])
 {
-  if (!function.getEvaluation().getImplementation()->isActualImplementation())
+  otfmi_context *context = static_cast<otfmi_context *>(object);
+  if (!context)
   {
-    Study study;
-    const String fileName = (std::filesystem::temp_directory_path() / "function_{{ xml_hash }}.xml").string();
-    std::ofstream xmlFile(fileName, std::ios::out | std::ios::binary);
-    if (xmlFile.good())
+    std::fill(y, y + nout, NAN);
+    return;
+  }
+  // the field is only evaluated when the input changes
+  if (context->input.empty() || !std::equal(x, x + nin, context->input.begin()))
+  {
+    context->input.assign(x, x + nin);
+{%- if cache_size > 0 %}
+    if (!otfmi_cache_lookup(&context->cache, x, context->field.data()))
+{%- endif %}
     {
-      xmlFile.write (xml_data, sizeof(xml_data));
-      xmlFile.close();
+      Point inP(nin);
+      std::copy(x, x + nin, inP.begin());
+      const Sample outS(context->function(inP));
+      for (UnsignedInteger i = 0; i < outS.getSize(); ++ i)
+        for (int j = 0; j < nout; ++ j)
+          context->field[i * nout + j] = outS(i, j);
+{%- if cache_size > 0 %}
+      otfmi_cache_insert(&context->cache, x, context->field.data());
+{%- endif %}
     }
-    study.setStorageManager(XMLStorageManager(fileName));
-    study.load();
-    study.fillObject("function", function);
-    if (function.getInputDimension() != nin)
-      std::cerr << "Invalid input dimension";
-    if (function.getOutputDimension() != nout)
-      std::cerr << "Invalid output dimension";
-    Os::Remove(fileName);
   }
+
+  // piecewise linear interpolation, constant outside of the time grid
+  const Point & time = context->time;
+  const std::vector<double> & field = context->field;
+  const UnsignedInteger size = time.getDimension();
+  if (!(t > time[0]))
+    std::copy(field.begin(), field.begin() + nout, y);
+  else if (t >= time[size - 1])
+    std::copy(field.end() - nout, field.end(), y);
+  else
+  {
+    // the simulation time mostly increases: try the last interval first
+    UnsignedInteger i = context->index;
+    if (!(i + 1 < size && time[i] <= t && t < time[i + 1]))
+      i = std::upper_bound(time.begin(), time.end(), t) - time.begin() - 1;
+    context->index = i;
+    const double alpha = (t - time[i]) / (time[i + 1] - time[i]);
+    for (int j = 0; j < nout; ++ j)
+      y[j] = (1.0 - alpha) * field[i * nout + j] + alpha * field[(i + 1) * nout + j];
+  }
+}
+{%- else %}
+
+#ifdef _WIN32
+__declspec(dllexport)
+#endif
+void otfmi_context_evaluate(void *object, int nin, double x[], int nout, double y[])
+{
+  otfmi_context *context = static_cast<otfmi_context *>(object);
+  if (!context)
+  {
+    std::fill(y, y + nout, NAN);
+    return;
+  }
+{%- if cache_size > 0 %}
+  if (otfmi_cache_lookup(&context->cache, x, y))
+    return;
+{%- endif %}
   Point inP(nin);
   std::copy(x, x + nin, inP.begin());
-  const Point outP(function(inP));
+  const Point outP(context->function(inP));
   std::copy(outP.begin(), outP.end(), y);
+{%- if cache_size > 0 %}
+  otfmi_cache_insert(&context->cache, x, y);
+{%- endif %}
 }
+{%- endif %}
 
 } // extern "C"
 """
 
-        xml_hash = hashlib.md5(xml_data, usedforsecurity=False).hexdigest()[:16]
+        xml_hash, xml_size = self._write_blob()
+        # embedded as is when zlib is not found
+        self._write_blob_object("function.xml", xml_hash)
         data = jinja2.Template(tdata).render(
             {
-                "xml_data_bin": ",".join(
-                    ["0x{:02x}".format(byte) for byte in xml_data]
-                ),
+                "blob_code": jinja2.Template(_BLOB_TEMPLATE).render({"xml_hash": xml_hash}),
                 "xml_hash": xml_hash,
+                "xml_size": xml_size,
+                "cache_code": self._render_cache(),
+                "cache_size": self._cache_size,
+                "input_dim": self._function.getInputDimension(),
+                "output_dim": self._function.getOutputDimension(),
+                "field": self._is_field(),
+                "field_size": self._get_output_size(),
             }
         )
         with open(self._workdir / "wrapper.cxx", "w") as cxx:
@@ -451,25 +1372,180 @@ cmake_minimum_required (VERSION 3.18)
 set (CMAKE_BUILD_TYPE "Release" CACHE STRING "build type")
 project (wrapper CXX)
 
-add_library (cwrapper SHARED wrapper.cxx)
+# target name, unique when the wrapper is built in a batch project
+if (NOT OTFMI_TARGET)
+  set (OTFMI_TARGET cwrapper)
+endif ()
+
+add_library (${OTFMI_TARGET} SHARED wrapper.cxx)
+set_target_properties (${OTFMI_TARGET} PROPERTIES OUTPUT_NAME cwrapper)
 
 find_package (OpenTURNS REQUIRED)
 message (STATUS "Found OpenTURNS: ${OPENTURNS_ROOT_DIR} (${OPENTURNS_VERSION_STRING})")
-target_link_libraries (cwrapper PRIVATE ${OPENTURNS_LIBRARY})
+target_link_libraries (${OTFMI_TARGET} PRIVATE ${OPENTURNS_LIBRARY})
 
-set_target_properties (cwrapper PROPERTIES MSVC_RUNTIME_LIBRARY "MultiThreaded$<$<CONFIG:Debug>:Debug>"
-                                           ARCHIVE_OUTPUT_DIRECTORY_RELEASE ${CMAKE_BINARY_DIR}
-                                           LIBRARY_OUTPUT_DIRECTORY_RELEASE ${CMAKE_BINARY_DIR}
-                                           RUNTIME_OUTPUT_DIRECTORY_RELEASE ${CMAKE_BINARY_DIR})
+set_target_properties (${OTFMI_TARGET} PROPERTIES MSVC_RUNTIME_LIBRARY "MultiThreaded$<$<CONFIG:Debug>:Debug>"
+                                           ARCHIVE_OUTPUT_DIRECTORY_RELEASE ${CMAKE_CURRENT_BINARY_DIR}
+                                           LIBRARY_OUTPUT_DIRECTORY_RELEASE ${CMAKE_CURRENT_BINARY_DIR}
+                                           RUNTIME_OUTPUT_DIRECTORY_RELEASE ${CMAKE_CURRENT_BINARY_DIR})
 
 if (MSVC)
-  target_compile_definitions(cwrapper PRIVATE _CRT_SECURE_NO_WARNINGS)
+  target_compile_definitions(${OTFMI_TARGET} PRIVATE _CRT_SECURE_NO_WARNINGS)
 endif()
+
+# the XML is embedded uncompressed without zlib
+find_package (ZLIB)
+if (ZLIB_FOUND)
+  target_link_libraries (${OTFMI_TARGET} PRIVATE ZLIB::ZLIB)
+else ()
+  set (OTFMI_BLOB_FILE function.xml)
+  target_compile_definitions (${OTFMI_TARGET} PRIVATE OTFMI_BLOB_RAW)
+endif ()
+""" + jinja2.Template(_BLOB_CMAKE).render({"source": "wrapper.cxx"})
+        with open(self._workdir / "CMakeLists.txt", "w") as cm:
+            cm.write(data)
+
+    def _write_cwrapper_native(self):
+        """
+        Write the C wrapper evaluating C code generated from the function.
+
+        The generated code only depends on the C math library, see
+        :func:`otfmi.codegen.generate`.
+
+        Parameters
+        ----------
+        """
+        tdata = r"""
+{{ function_code }}
+#include <stdlib.h>
+{{ cache_code }}
+
+/* the generated code is stateless, an instance only holds its cache */
+typedef struct {
+{%- if cache_size > 0 %}
+  otfmi_cache cache;
+{%- else %}
+  int unused;
+{%- endif %}
+} otfmi_context;
+
+#ifdef _WIN32
+__declspec(dllexport)
+#endif
+void *otfmi_context_new(void)
+{
+  otfmi_context *context = (otfmi_context *)calloc(1, sizeof(otfmi_context));
+{%- if cache_size > 0 %}
+  if (context)
+    otfmi_cache_init(&context->cache);
+{%- endif %}
+  return context;
+}
+
+#ifdef _WIN32
+__declspec(dllexport)
+#endif
+void otfmi_context_free(void *object)
+{
+  free(object);
+}
+
+#ifdef _WIN32
+__declspec(dllexport)
+#endif
+void otfmi_context_evaluate(void *object, int nin, double x[], int nout, double y[])
+{
+  otfmi_context *context = (otfmi_context *)object;
+  (void)nin;
+  (void)nout;
+{%- if cache_size > 0 %}
+  if (context && otfmi_cache_lookup(&context->cache, x, y))
+    return;
+{%- else %}
+  (void)context;
+{%- endif %}
+  otfmi_evaluate(x, y);
+{%- if cache_size > 0 %}
+  if (context)
+    otfmi_cache_insert(&context->cache, x, y);
+{%- endif %}
+}
+"""
+        data = jinja2.Template(tdata).render(
+            {
+                "function_code": codegen.generate(self._function if self._chaos is None else self._chaos),
+                "cache_code": self._render_cache(),
+                "cache_size": self._cache_size,
+            }
+        )
+        with open(self._workdir / "wrapper.c", "w") as c:
+            c.write(data)
+
+        # write CMakeLists
+        data = r"""
+cmake_minimum_required (VERSION 3.18)
+set (CMAKE_BUILD_TYPE "Release" CACHE STRING "build type")
+project (wrapper C)
+
+# target name, unique when the wrapper is built in a batch project
+if (NOT OTFMI_TARGET)
+  set (OTFMI_TARGET cwrapper)
+endif ()
+
+# openmodelica uses -Bstatic on Linux
+add_library (${OTFMI_TARGET} STATIC wrapper.c)
+set_target_properties (${OTFMI_TARGET} PROPERTIES OUTPUT_NAME cwrapper)
+set_target_properties (${OTFMI_TARGET} PROPERTIES POSITION_INDEPENDENT_CODE ON
+                                           ARCHIVE_OUTPUT_DIRECTORY_RELEASE ${CMAKE_CURRENT_BINARY_DIR}
+                                           LIBRARY_OUTPUT_DIRECTORY_RELEASE ${CMAKE_CURRENT_BINARY_DIR}
+                                           RUNTIME_OUTPUT_DIRECTORY_RELEASE ${CMAKE_CURRENT_BINARY_DIR}
+                                           MSVC_RUNTIME_LIBRARY "MultiThreaded$<$<CONFIG:Debug>:Debug>")
 """
         with open(self._workdir / "CMakeLists.txt", "w") as cm:
             cm.write(data)
 
-    def _build_cwrapper(self, verbose):
+    def _build_env(self):
+        """Environment of the C wrapper build, None for the current environment."""
+        # use conda compiler if available
+        env = None
+        if shutil.which(f"{platform.machine()}-conda-linux-gnu-cc") is not None:
+            env = os.environ.copy()
+            env["CC"] = f"{platform.machine()}-conda-linux-gnu-cc"
+            env["CXX"] = f"{platform.machine()}-conda-linux-gnu-c++"
+        return env
+
+    def _build_key(self, mode):
+        """
+        Key of the C wrapper build in the build cache.
+
+        The key depends on the generated sources, the mode and the versions
+        of the toolchain, OpenTURNS and Python.
+
+        Parameters
+        ----------
+        mode : str
+            Export mode.
+        """
+        env = self._build_env() or os.environ
+        parts = [
+            "cwrapper", mode, sys.platform, platform.machine(),
+            ot.__version__, Path(ot.__file__).parent, sysconfig.get_python_version(),
+            cache.tool_version("cmake", "--version"),
+            cache.tool_version(env.get("CC", "cc"), "--version"),
+            cache.tool_version(env.get("CXX", "c++"), "--version"),
+        ]
+        # the sources do not depend on the working directory
+        for name in sorted(os.listdir(self._workdir)):
+            with open(self._workdir / name, "rb") as f:
+                parts += [name, f.read()]
+        return cache.compute_key(*parts)
+
+    def _get_libraries(self):
+        """Get the built C wrapper libraries."""
+        return [path for path in self._workdir.glob("*cwrapper*")
+                if path.is_file() and path.suffix in [".a", ".so", ".dylib", ".lib", ".dll"]]
+
+    def _build_cwrapper(self, verbose, workdir=None, jobs=None):
         """
         Build C wrapper.
 
@@ -479,7 +1555,13 @@ endif()
         ----------
         verbose : bool
             Verbose output (default=False).
+        workdir : path-like object
+            CMake project directory, by default the working directory.
+        jobs : int
+            Number of parallel build jobs, by default the CMake default.
         """
+        if workdir is None:
+            workdir = self._workdir
         cmake_args = ["cmake"]
         if sys.platform.startswith("win"):
             # bits = platform.architecture()[0]
@@ -495,16 +1577,10 @@ endif()
         # in-source build
         cmake_args += ["-S", "."]
 
-        # use conda compiler if available
-        env = None
-        if shutil.which(f"{platform.machine()}-conda-linux-gnu-cc") is not None:
-            env = os.environ.copy()
-            env["CC"] = f"{platform.machine()}-conda-linux-gnu-cc"
-            env["CXX"] = f"{platform.machine()}-conda-linux-gnu-c++"
-
+        env = self._build_env()
         try:
             cp = subprocess.run(
-                cmake_args, capture_output=True, cwd=self._workdir, check=True, env=env,
+                cmake_args, capture_output=True, cwd=workdir, check=True, env=env,
             )
             if verbose:
                 print(cp.stdout.decode(), file=sys.stderr)
@@ -514,9 +1590,9 @@ endif()
 
         try:
             cp = subprocess.run(
-                ["cmake", "--build", ".", "--config", "Release"],
+                ["cmake", "--build", ".", "--config", "Release"] + ([] if jobs is None else ["--parallel", str(jobs)]),
                 capture_output=True,
-                cwd=self._workdir,
+                cwd=workdir,
                 check=True,
             )
             if verbose:
@@ -611,7 +1687,7 @@ endif()
             )
         return string
 
-    def _write_modelica_wrapper(self, className, dirName, libs, gui, move):
+    def _write_modelica_wrapper(self, className, dirName, libs, gui, move, field=False):
         """
         Write the Modelica model importing Cfunction.
 
@@ -628,23 +1704,61 @@ endif()
             The model cannot be exported as FMU in command line if gui=True.
         move : bool
             Move the model from temporary folder to user folder
+        field : bool
+            If True, the C function takes the simulation time and returns
+            the field interpolated at this time (cxx mode).
+
+        The C functions take an external object holding the state of each
+        instance, so that instances can be simulated in parallel threads.
         """
         link_dir = dirName if move else self._workdir
         _ = link_dir
         tdata = r"""
 model {{ className }}
 
+class Context
+extends ExternalObject;
+function constructor
+output Context context;
+external "C" context = otfmi_context_new();
+annotation(Library={{ libs }}, LibraryDirectory="{{ link_dir }}");
+end constructor;
+function destructor
+input Context context;
+external "C" otfmi_context_free(context);
+annotation(Library={{ libs }}, LibraryDirectory="{{ link_dir }}");
+end destructor;
+end Context;
+{%- if field %}
+
+function ExternalFunc
+input Context context;
+input Real[{{ input_dim }}] x;
+input Real t;
+output Real[{{ output_dim }}] y;
+external "C" otfmi_context_field_evaluate(context, {{ input_dim }}, x, t, {{ output_dim }}, y);
+annotation(Library={{ libs }}, LibraryDirectory="{{ link_dir }}");
+end ExternalFunc;
+{%- else %}
+
 function ExternalFunc
+input Context context;
 input Real[{{ input_dim }}] x;
 output Real[{{ output_dim }}] y;
-external "C" c_func({{ input_dim }}, x, {{ output_dim }}, y);
+external "C" otfmi_context_evaluate(context, {{ input_dim }}, x, {{ output_dim }}, y);
 annotation(Library={{ libs }}, LibraryDirectory="{{ link_dir }}");
 end ExternalFunc;
+{%- endif %}
 
 {{ io_vars }}
 
 protected
-  Real output_array_zzz__[{{ output_dim }}] = ExternalFunc({ {{ inputs }} });
+  parameter Context context = Context();
+{%- if field %}
+  Real output_array_zzz__[{{ output_dim }}] = ExternalFunc(context, { {{ inputs }} }, time);
+{%- else %}
+  Real output_array_zzz__[{{ output_dim }}] = ExternalFunc(context, { {{ inputs }} });
+{%- endif %}
 
 equation
 {%- for output in outputs %}
@@ -661,6 +1775,7 @@ end {{ className }};
         data = jinja2.Template(tdata).render(
             {
                 "className": className,
+                "field": field,
                 "input_dim": self._function.getInputDimension(),
                 "output_dim": self._function.getOutputDimension(),
                 "libs": libs,
@@ -681,12 +1796,18 @@ end {{ className }};
         with open(self._workdir / (className + ".mo"), "w") as mo:
             mo.write(data)
 
-    def export_model(self, model_path, gui=False, verbose=False, binary=True, mode="cxx", **kwargs):
+    def export_model(self, model_path, gui=False, verbose=False, binary=True, mode="cxx", cache_size=1, build_cache=True,
+                     **kwargs):
         """
         Export to model file (.mo).
 
         Requires CMake, a C/C++ compiler.
-        Unlike export_fmu, field functions (temporal models) cannot be exported.
+        Field functions (temporal models) can only be exported in cxx mode:
+        the field is evaluated when the inputs change, and the outputs are
+        interpolated at the simulation time.
+        Each instance of the model holds its own copy of the function and its
+        own cache through a Modelica external object, so that instances can
+        be simulated in parallel threads of the same process.
 
         Parameters
         ----------
@@ -702,14 +1823,33 @@ end {{ className }};
             Verbose output (default=False).
         binary : bool, optional
             Whether to generate binaries or source (default=True)
-        mode : str, optional, either 'pyprocess', 'cpython' or 'cxx'
-            - pyprocess: the function is run via a Python process by file I/O;
-              slow but should work almost everywhere.
+        mode : str, optional, either 'pyprocess', 'cpython', 'cxx' or 'native'
+            - pyprocess: the function is run by a Python worker process started once
+              per model instance, exchanging binary values through a pipe;
+              should work almost everywhere.
               The Python environment is required to run the resulting FMU (eg run OMEdit from the conda env).
             - cpython: the function is run via the Python C API; quite fast (no file I/O)
               but requires Python development headers and libs.
             - cxx (default): the function is directly evaluated trough the OpenTURNS C++ API;
               even faster but requires the OpenTURNS development headers and libraries.
+            - native: the function is translated to C code evaluated without OpenTURNS,
+              the fastest and the model has no runtime dependency; only symbolic and
+              linear functions, their linear combinations and compositions, and
+              functional chaos results are supported, see :func:`otfmi.codegen.generate`.
+              Evaluations are so cheap that cache_size=0 is recommended.
+        cache_size : int, optional
+            Number of evaluations kept in the least recently used cache of each
+            instance, indexed by a hash of the input, 0 to disable the cache (default=1).
+            The numbers of cache hits and misses are returned by the exported
+            C function otfmi_cache_statistics(unsigned long long *hits,
+            unsigned long long *misses, int *size).
+        build_cache : bool, optional
+            Whether to reuse the libraries of an identical previous build,
+            stored in the directory given by the OTFMI_CACHE_DIR environment
+            variable, by default ~/.cache/otfmi (default=True). The least
+            recently used builds are removed beyond the size given by the
+            OTFMI_CACHE_MAX_SIZE environment variable, by default 2 GiB, and
+            :func:`otfmi.cache.clear` removes them all.
         """
 
         p = Path(model_path)
@@ -721,10 +1861,59 @@ end {{ className }};
         if not dirName.exists():
             raise FileNotFoundError(f"parent directory {dirName} does not exist")
 
+        self._check_mode(mode, cache_size)
         self._init_workdir()
-        self._export_xml()
+        c_ext, libs = self._write_cwrapper(mode)
+        if binary and not self._lookup_cwrapper(mode, build_cache, verbose):
+            self._build_cwrapper(verbose)
+            self._store_cwrapper()
+
+        # the "move" private kwarg moves the model from temporary folder to user folder
+        move = kwargs.get("move", True)
+
+        self._write_modelica_wrapper(className, dirName, libs, gui, move, field=self._is_field())
+
+        if move:
+            self._move_model(model_path, className, dirName, binary, mode, c_ext)
+
+    def _check_mode(self, mode, cache_size):
+        """Check the export mode and the cache size."""
+        if mode not in ["pyprocess", "cpython", "cxx", "native"]:
+            raise ValueError(f"Invalid mode: {mode}")
+        if int(cache_size) < 0:
+            raise ValueError("cache_size must be positive")
+        if self._is_field():
+            if mode != "cxx":
+                raise TypeError(f"Cannot export field functions in {mode} mode")
+            time_grid = self._function.getOutputMesh().getVertices().asPoint()
+            if any(time_grid[i + 1] <= time_grid[i] for i in range(time_grid.getDimension() - 1)):
+                raise ValueError("The time grid of the field function must be increasing")
+        self._cache_size = int(cache_size)
+
+    def _write_cwrapper(self, mode):
+        """
+        Write the function XML and the C wrapper sources in the working directory.
+
+        Parameters
+        ----------
+        mode : str
+            Export mode.
+
+        Returns
+        -------
+        c_ext : str
+            Extension of the wrapper source.
+        libs : str
+            Libraries linked by the Modelica model.
+        """
+        self._wrapper_key = None
         c_ext = ".c"
         libs = r'"cwrapper"'
+        if mode == "native":
+            # the function is translated, the XML is not needed
+            self._write_cwrapper_native()
+            return c_ext, libs
+        self._export_xml()
         if mode == "pyprocess":
             self._write_cwrapper_pyprocess()
         elif mode == "cpython":
@@ -733,33 +1922,63 @@ end {{ className }};
             c_ext = ".cxx"
             libs = r'{"cwrapper", "OT"}'
             self._write_cwrapper_cxx()
-        else:
-            raise ValueError(f"Invalid mode: {mode}")
-        if binary:
-            self._build_cwrapper(verbose)
+        return c_ext, libs
 
-        # the "move" private kwarg moves the model from temporary folder to user folder
-        move = kwargs.get("move", True)
+    def _lookup_cwrapper(self, mode, build_cache, verbose):
+        """Copy the C wrapper libraries from the build cache, return whether they were cached."""
+        self._wrapper_key = self._build_key(mode) if build_cache else None
+        if self._wrapper_key is None or cache.lookup(self._wrapper_key, self._workdir) is None:
+            return False
+        if verbose:
+            print(f"Reused the cached C wrapper build {self._wrapper_key}", file=sys.stderr)
+        return True
 
-        self._write_modelica_wrapper(className, dirName, libs, gui, move)
+    def _store_cwrapper(self):
+        """Store the built C wrapper libraries in the build cache."""
+        if self._wrapper_key is not None:
+            cache.store(self._wrapper_key, self._get_libraries())
 
-        if move:
-            list_file = [className + extension]
-            if binary:
-                # licwrapper.a/.so, cwrapper.lib/dll
-                libfiles = glob.glob(str(self._workdir / "*cwrapper*"))
-                list_file += [Path(x).name for x in libfiles]
-            else:
-                list_file += ["wrapper" + c_ext, "CMakeLists.txt"]
-            for file in list_file:
-                src = self._workdir / file
-                dest = dirName / file
-                shutil.move(src, dest)
-            shutil.rmtree(self._workdir)
-            file_list_msg = ", ".join(list_file[1:])
-            ot.Log.Warn(f"Exported modelica model into: {model_path} (and {file_list_msg})")
-
-    def export_fmu(self, fmu_path, fmuType="me", mode="pyprocess", verbose=False):
+    def _move_model(self, model_path, className, dirName, binary, mode, c_ext):
+        """Move the model and the wrapper libraries or sources to the user folder."""
+        list_file = [className + ".mo"]
+        if binary:
+            # licwrapper.a/.so, cwrapper.lib/dll
+            libfiles = glob.glob(str(self._workdir / "*cwrapper*"))
+            list_file += [Path(x).name for x in libfiles]
+        else:
+            list_file += ["wrapper" + c_ext, "CMakeLists.txt"]
+            if mode != "native":
+                list_file += ["function.xml.z", "function.xml.z.obj"]
+            if mode == "cxx":
+                # embedded as is when zlib is not found
+                list_file += ["function.xml", "function.xml.obj"]
+        for file in list_file:
+            src = self._workdir / file
+            dest = dirName / file
+            shutil.move(src, dest)
+        shutil.rmtree(self._workdir)
+        file_list_msg = ", ".join(list_file[1:])
+        ot.Log.Warn(f"Exported modelica model into: {model_path} (and {file_list_msg})")
+
+    def _build_fmu(self, className, dirName, fmuType, build_cache, verbose):
+        """Build the FMU of the Modelica model of the working directory, and move it to the user folder."""
+        path_mo = self._workdir / (className + ".mo")
+        path_fmu = self._workdir / (className + ".fmu")
+        key = None
+        if build_cache:
+            # the model links the C wrapper from the working directory
+            model = path_mo.read_text().replace(self._workdir.as_uri(), "")
+            key = cache.compute_key("fmu", self._wrapper_key, model, fmuType, cache.tool_version("omc", "--version"))
+        if key is not None and cache.lookup(key, self._workdir) is not None:
+            if verbose:
+                print(f"Reused the cached FMU {key}", file=sys.stderr)
+        else:
+            mo2fmu(path_mo, path_fmu=path_fmu, fmuType=fmuType, verbose=verbose)
+            if key is not None:
+                cache.store(key, [path_fmu])
+        shutil.move(path_fmu, dirName / (className + ".fmu"))
+
+    def export_fmu(self, fmu_path, fmuType="me", mode="pyprocess", verbose=False, cache_size=1, build_cache=True):
         """
         Export the Modelica model as FMU.
 
@@ -775,13 +1994,19 @@ end {{ className }};
             model type, either me (model exchange), cs (co-simulation),
             me_cs (both model exchange and co-simulation)
         mode : str
-            either pyprocess or pythonfmu
-            Only pythonfmu mode is allowed for temporal models (PointToFieldFunction)
+            either pyprocess, cpython, cxx, native (see export_model) or pythonfmu
+            Only cxx and pythonfmu modes are allowed for temporal models (PointToFieldFunction)
             Note that pythonfmu mode yields cosimulation-only, pyfmi/otfmi incompatible fmus.
             While pythonfmu mode is fine for use with fmpy, for other tools (eg OMSimulator) it might require
             LD_PRELOAD=/usr/lib/libpython3.so variable to be set (adjust depending on Python install path).
         verbose : bool
             Verbose output (default=False).
+        cache_size : int
+            Size of the evaluation cache of the C wrapper, see export_model
+            (default=1, not used in pythonfmu mode).
+        build_cache : bool
+            Whether to reuse the C wrapper and the FMU of an identical previous
+            export, see export_model (default=True, not used in pythonfmu mode).
         """
 
         p = Path(fmu_path)
@@ -794,20 +2019,12 @@ end {{ className }};
         if not dirName.exists():
             raise FileNotFoundError(f"parent directory {dirName} does not exist")
         self._init_workdir()
-        if mode == "pyprocess":
-            if hasattr(self._function, "getOutputMesh"):
-                raise TypeError("Cannot export field functions in pyprocess mode")
-
+        if mode in ["pyprocess", "cpython", "cxx", "native"]:
             model_path = p.with_suffix(".mo")
 
-            self.export_model(model_path, gui=False, verbose=verbose, move=False)
-
-            path_mo = self._workdir / (className + ".mo")
-            path_fmu = self._workdir / (className + extension)
-            mo2fmu(path_mo, path_fmu=path_fmu, fmuType=fmuType, verbose=verbose)
-
-            shutil.move(self._workdir / (className + extension),
-                        dirName / (className + extension))
+            self.export_model(model_path, gui=False, verbose=verbose, mode=mode, move=False, cache_size=cache_size,
+                              build_cache=build_cache)
+            self._build_fmu(className, dirName, fmuType, build_cache, verbose)
 
         elif mode == "pythonfmu":
             from pythonfmu import FmuBuilder
@@ -820,6 +2037,10 @@ import shutil
 import tempfile
 import os
 import binascii
+import operator
+{%- if is_field_f %}
+import numpy as np
+{%- endif %}
 
 xml_b64 = {{ xml_b64 }}
 
@@ -852,21 +2073,45 @@ class {{ className }}(Fmi2Slave):
             setattr(self, var, -1.0)
             self.register_variable(Real(var, causality=Fmi2Causality.output))
 
+        # the function is only evaluated when the inputs change
+        self._outputs = list(self._function.getOutputDescription())
+        getter = operator.attrgetter(*self._function.getInputDescription())
+        self._get_input = getter if self._function.getInputDimension() > 1 else lambda slave: (getter(slave),)
+        self._last_input = None
+{%- if is_field_f %}
+        # field of the last input and slopes of its segments
+        self._time = np.asarray(self._function.getOutputMesh().getVertices()).ravel()
+        self._values = None
+        self._slopes = None
+{%- endif %}
+
     def do_step(self, current_time, step_size):
-        inP = [getattr(self, var) for var in self._function.getInputDescription()]
-        try:
-            f_output = self._function(inP)
-        except Exception as exc:
-            print(f"{{ className }}: {exc}")
-            return False
-{% if is_field_f %}
-        mesh = self._function.getOutputMesh()
-        timeGrid = mesh.getVertices().asPoint()
-        interpolation = ot.PiecewiseLinearEvaluation(timeGrid, f_output)
-        f_output = interpolation([current_time])
-{% endif %}
-        for i, var in enumerate(self._function.getOutputDescription()):
-            setattr(self, var, f_output[i])
+        inP = self._get_input(self)
+        if inP != self._last_input:
+            try:
+                f_output = self._function(inP)
+            except Exception as exc:
+                print(f"{{ className }}: {exc}")
+                return False
+            self._last_input = inP
+{%- if is_field_f %}
+            self._values = np.asarray(f_output)
+            self._slopes = np.diff(self._values, axis=0) / np.diff(self._time)[:, np.newaxis]
+
+        # piecewise linear interpolation, constant outside of the time grid
+        index = np.searchsorted(self._time, current_time, side="right") - 1
+        if index < 0:
+            f_output = self._values[0]
+        elif index >= len(self._time) - 1:
+            f_output = self._values[-1]
+        else:
+            f_output = self._values[index] + (current_time - self._time[index]) * self._slopes[index]
+        for var, value in zip(self._outputs, f_output.tolist()):
+            setattr(self, var, value)
+{%- else %}
+            for var, value in zip(self._outputs, f_output):
+                setattr(self, var, value)
+{%- endif %}
         return True
 """
             is_field_f = hasattr(self._function, "getOutputMesh")
@@ -887,5 +2132,162 @@ class {{ className }}(Fmi2Slave):
                 raise RuntimeError("pythonfmu.FmuBuilder binary is missing, check the pythonfmu installation")
 
             FmuBuilder.build_FMU(slave_file, dest=str(dirName))
+        else:
+            raise ValueError(f"Invalid mode: {mode}")
         shutil.rmtree(self._workdir)
         ot.Log.Warn(f"Exported FMU into: {dirName}")
+
+
+def export_batch(functions, paths, start=None, mode="cxx", fmuType="me", binary=True, cache_size=1, build_cache=True,
+                 n_jobs=None, verbose=False):
+    """
+    Export several functions at once.
+
+    The C wrappers missing from the build cache are generated as the
+    subprojects of a single CMake project, configured once and built with
+    parallel jobs, and the FMUs are built by a pool of omc processes.
+
+    Parameters
+    ----------
+    functions : sequence of :py:class:`openturns.Function` or :py:class:`openturns.PointToFieldFunction`
+        Functions to export.
+    paths : sequence of str or path-like object
+        Path to the generated .mo or .fmu file of each function.
+        The models (.mo) must be exported to distinct folders, as their
+        wrapper libraries have the same name.
+    start : sequence of sequence of float, optional
+        Initial input values of each function.
+    mode : str, optional, either 'pyprocess', 'cpython', 'cxx' or 'native'
+        Export mode, see FunctionExporter.export_model (default='cxx').
+    fmuType : str, optional
+        model type of the FMUs, either me (model exchange), cs (co-simulation),
+        me_cs (both model exchange and co-simulation) (default='me').
+    binary : bool, optional
+        Whether to generate binaries or source of the models (default=True),
+        the wrappers of the FMUs are always built.
+    cache_size : int, optional
+        Size of the evaluation cache of the C wrappers, see FunctionExporter.export_model
+        (default=1).
+    build_cache : bool, optional
+        Whether to reuse the libraries and FMUs of identical previous exports,
+        see FunctionExporter.export_model (default=True).
+    n_jobs : int, optional
+        Number of parallel build jobs and omc processes, by default the number of CPUs.
+    verbose : bool, optional
+        Verbose output (default=False).
+
+    Examples
+    --------
+    >>> otfmi.export_batch([f1, f2], ["f1/F1.fmu", "f2/F2.fmu"], n_jobs=4)  # doctest: +SKIP
+    """
+    functions = list(functions)
+    paths = [Path(path) for path in paths]
+    if len(paths) != len(functions):
+        raise ValueError("functions and paths must have the same size")
+    if start is None:
+        start = [None] * len(functions)
+    n_jobs = os.cpu_count() if n_jobs is None else int(n_jobs)
+    model_dirs = set()
+    for path in paths:
+        if path.suffix not in [".mo", ".fmu"]:
+            raise ValueError(f"Expected a .mo or .fmu file name: {path}")
+        if not path.parent.exists():
+            raise FileNotFoundError(f"parent directory {path.parent} does not exist")
+        if path.suffix == ".mo" and binary:
+            if path.parent.resolve() in model_dirs:
+                raise ValueError(f"Cannot export several models to the same folder {path.parent}")
+            model_dirs.add(path.parent.resolve())
+
+    # generate all the wrappers, and build the ones missing from the cache in one project
+    workdir = Path(tempfile.mkdtemp())
+    exporters = []
+    indices = []
+    for index, (function, path, x0) in enumerate(zip(functions, paths, start)):
+        exporter = FunctionExporter(function, x0)
+        exporter._check_mode(mode, cache_size)
+        exporter._init_workdir(workdir / f"wrapper{index}")
+        c_ext, libs = exporter._write_cwrapper(mode)
+        if (binary or path.suffix == ".fmu") and not exporter._lookup_cwrapper(mode, build_cache, verbose):
+            indices.append(index)
+        exporters.append((exporter, c_ext, libs))
+    if len(indices) > 0:
+        with open(workdir / "CMakeLists.txt", "w") as cm:
+            cm.write(jinja2.Template(_BATCH_CMAKE).render({"indices": indices}))
+        exporters[indices[0]][0]._build_cwrapper(verbose, workdir=workdir, jobs=n_jobs)
+        for index in indices:
+            exporters[index][0]._store_cwrapper()
+
+    fmus = []
+    for (exporter, c_ext, libs), path in zip(exporters, paths):
+        className = path.stem[0].upper() + path.stem[1:]
+        move = path.suffix == ".mo"
+        exporter._write_modelica_wrapper(className, path.parent, libs, False, move,
+                                         field=exporter._is_field())
+        if move:
+            exporter._move_model(path, className, path.parent, binary, mode, c_ext)
+        else:
+            fmus.append((exporter, className, path.parent))
+
+    # each omc session is a separate process
+    with concurrent.futures.ThreadPoolExecutor(max(1, min(n_jobs, len(fmus)))) as executor:
+        futures = [executor.submit(exporter._build_fmu, className, dirName, fmuType, build_cache, verbose)
+                   for exporter, className, dirName in fmus]
+        for future in futures:
+            future.result()
+    for exporter, className, dirName in fmus:
+        ot.Log.Warn(f"Exported FMU into: {dirName / (className + '.fmu')}")
+    shutil.rmtree(workdir)
+
+
+def _load_functions(path_study, labels=None):
+    """Load the functions of an OpenTURNS XML study, by label."""
+    study = ot.Study()
+    study.setStorageManager(ot.XMLStorageManager(str(path_study)))
+    study.load()
+    functions = {}
+    for label in study.getLabels() if labels is None else labels:
+        implementation = getattr(ot, study.getObject(label).getClassName(), None)
+        if implementation is not None and issubclass(implementation, ot.FunctionImplementation):
+            function = ot.Function()
+        elif implementation is not None and issubclass(implementation, ot.PointToFieldFunctionImplementation):
+            function = ot.PointToFieldFunction()
+        elif labels is None:
+            continue
+        else:
+            raise TypeError(f"{label} is not a function")
+        study.fillObject(label, function)
+        functions[label] = function
+    return functions
+
+
+def main():
+    """
+    otfmi-export entry point.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the functions of an OpenTURNS study as FMUs or Modelica models")
+    parser.add_argument("path_study", type=str, help="Path to the OpenTURNS XML study holding the functions")
+    parser.add_argument("output_dir", nargs="?", type=str, default=".",
+                        help="Output directory, the functions are exported to one folder per label")
+    parser.add_argument("--labels", metavar="LABELS", type=str, action="extend", nargs="+",
+                        help="Labels of the functions to export, by default all the functions of the study")
+    parser.add_argument("--format", choices=["fmu", "mo"], default="fmu", help="Export format")
+    parser.add_argument("--mode", choices=["pyprocess", "cpython", "cxx", "native"], default="cxx", help="Export mode")
+    parser.add_argument("--fmuType", metavar="TYPE", type=str, default="me", help="model type me|cs|me_cs")
+    parser.add_argument("--no-binary", action="store_false", dest="binary", help="Export the sources of the models")
+    parser.add_argument("--cache-size", metavar="SIZE", type=int, default=1, help="Size of the evaluation cache")
+    parser.add_argument("--no-build-cache", action="store_false", dest="build_cache", help="Rebuild everything")
+    parser.add_argument("-j", "--jobs", metavar="N", type=int, dest="n_jobs", help="Number of parallel jobs")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    functions = _load_functions(args.path_study, args.labels)
+    paths = []
+    for label in functions:
+        name = re.sub(r"\W", "_", label)
+        directory = Path(args.output_dir) / name
+        directory.mkdir(parents=True, exist_ok=True)
+        paths.append(directory / f"{name[0].upper() + name[1:]}.{args.format}")
+    export_batch(functions.values(), paths, mode=args.mode, fmuType=args.fmuType, binary=args.binary,
+                 cache_size=args.cache_size, build_cache=args.build_cache, n_jobs=args.n_jobs, verbose=args.verbose)
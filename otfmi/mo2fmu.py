@@ -1,5 +1,3 @@
-import argparse
-import jinja2
 from pathlib import Path
 import tempfile
 import subprocess
@@ -77,6 +75,8 @@ loadFile("{{ fileName }}"); getErrorString();
 buildModelFMU({{ className }}, version="{{ version }}", fmuType="{{ fmuType }}", platforms={{ platforms }}); getErrorString();
 """
 
+    import jinja2
+
     data = jinja2.Template(tdata).render(
         {
             "libs": libs,
@@ -119,6 +119,8 @@ def main():
     """
     mo2fmu entry point.
     """
+    import argparse
+
     parser = argparse.ArgumentParser(description="Export a model .mo to .fmu")
     parser.add_argument("path_mo", type=str, help="Path to the source model file")
     parser.add_argument(
@@ -2,13 +2,39 @@
 
 """Middle and high level classes to simulate FMU files through OpenTURNS objects."""
 
+import io
 import openturns as ot
 import pyfmi
+import re
+import weakref
 import numpy as np
-from . import fmi
+from . import fmi, registry
+from .convert import to_sample, CompactArray
+from .storage import TrajectoryStore
+from .streaming import FieldStatistics, FieldSobolIndices, IncrementalPOD
 from pathlib import Path
 
 
+def _resolve_kind(description, kind):
+    """Kind of FMU to load from the model description, "ME", "CS" or None if not resolved."""
+    if kind is None:
+        # co-simulation is preferred, as in fmi.load_fmu
+        return "CS" if "<CoSimulation" in description else "ME"
+    if kind.upper() == "AUTO":
+        # model exchange is preferred, as in pyfmi.load_fmu
+        return "ME" if "<ModelExchange" in description else "CS"
+    if kind.upper() in ["ME", "CS"]:
+        return kind.upper()
+    return None
+
+
+def _instantiated_once(description, kind):
+    """Whether the model description forbids several instances of a kind of FMU per process."""
+    element = {"ME": "ModelExchange", "CS": "CoSimulation"}[kind]
+    return re.search(f"<{element}\\b[^>]*\\bcanBeInstantiatedOnlyOncePerProcess\\s*=\\s*[\"']true[\"']",
+                     description) is not None
+
+
 class _FMUBaseFunction:
     """Base Function skeleton."""
 
@@ -39,6 +65,7 @@ class _FMUBaseFunction:
 
         # set output mesh
         self._set_output_mesh(output_mesh, field_output)
+        self._set_communication_grid()
 
         self._set_inputs_fmu(inputs_fmu)
         self._set_outputs_fmu(outputs_fmu)
@@ -131,6 +158,7 @@ class _FMUBaseFunction:
     def _set_input_mesh(self, input_mesh, field_input):
         self._field_input = field_input
         self._input_mesh = None
+        self._input_time = None
         if field_input:
             if input_mesh is None:
                 input_mesh = self._get_default_mesh(self._start_time, self._final_time)
@@ -138,6 +166,7 @@ class _FMUBaseFunction:
                 if not isinstance(input_mesh, ot.Mesh):
                     raise TypeError("Expected mesh of type ot.Mesh")
             self._input_mesh = input_mesh
+            self._input_time = np.asarray(input_mesh.getVertices()).ravel()
             self._check_mesh_validity(input_mesh)
 
     def _set_output_mesh(self, output_mesh, field_output):
@@ -152,6 +181,80 @@ class _FMUBaseFunction:
             self._output_mesh = output_mesh
             self._check_mesh_validity(output_mesh)
 
+    def _set_communication_grid(self):
+        """Derive the communication points from the input and output meshes.
+
+        When the mesh vertices lie on regular grids aligned with the
+        simulation interval, the number of communication points is chosen so
+        that each vertex is a communication point (at least as fine as the
+        default number): the outputs are then read directly at the vertices,
+        and the co-simulation steps reach each input breakpoint.
+        Otherwise the output interpolation weights are computed once per
+        simulation time grid and reused across calls.
+        """
+        self._output_time = None
+        self._ncp = None
+        self._output_index = None
+        self._interpolation_cache = None
+
+        n_step_output = None
+        if self._field_output:
+            self._output_time = np.asarray(self._output_mesh.getVertices()).ravel()
+            n_step_output, index = self._get_regular_step(self._output_time)
+
+        # inputs are held between communication points in co-simulation only
+        n_step_input = None
+        if self._field_input and "FMUModelCS" in self._model.__class__.__name__:
+            n_step_input, _ = self._get_regular_step(self._input_time)
+
+        n_step = n_step_output
+        if n_step_input is not None:
+            if n_step is None:
+                n_step = n_step_input
+            else:
+                # do not refine much further than the meshes for the alignment of the inputs
+                n_step_common = int(np.lcm(n_step, n_step_input))
+                if n_step_common <= 10 * max(n_step, n_step_input):
+                    n_step = n_step_common
+        if n_step is None:
+            return
+
+        default_ncp = self._model.simulate_options()["ncp"]
+        self._ncp = n_step * max(1, -(-default_ncp // n_step))
+        if n_step_output is not None:
+            self._output_index = index * (self._ncp // n_step_output)
+
+    def _get_regular_step(self, time):
+        """Check whether time values lie on a regular grid spanning the simulation interval.
+
+        Parameters
+        ----------
+        time : 1-d array
+            Mesh vertices.
+
+        Returns
+        -------
+        n_step : int or None
+            Number of steps of the grid on the simulation interval, None if
+            the values do not lie on such a grid.
+        index : 1-d array of int or None
+            Index of each time value on the grid.
+        """
+        unique = np.unique(time)
+        if len(unique) < 2:
+            return None, None
+        step = unique[1] - unique[0]
+        tol = 1e-6 * step
+        if np.ptp(np.diff(unique)) > tol:
+            return None, None
+        if unique[0] < self._start_time - tol or unique[-1] > self._final_time + tol:
+            return None, None
+        n_step = (self._final_time - self._start_time) / step
+        index = (time - self._start_time) / step
+        if abs(n_step - round(n_step)) * step > tol or np.max(np.abs(index - np.round(index))) * step > tol:
+            return None, None
+        return int(round(n_step)), np.round(index).astype(int)
+
     def _check_mesh_validity(self, mesh):
         """Check if the mesh time interval and simulation time interval are consistent."""
         mesh_time = ot.Interval(mesh.getVertices().getMin(), mesh.getVertices().getMax())
@@ -195,7 +298,7 @@ class _FMUBaseFunction:
         if self._final_time <= self._start_time:
             raise ValueError("Final time must be > start time")
 
-    def load_fmu(self, path_fmu, kind=None, **kwargs):
+    def load_fmu(self, path_fmu, kind=None, share=True, **kwargs):
         """Load an FMU.
 
         Parameters
@@ -203,14 +306,44 @@ class _FMUBaseFunction:
         path_fmu : str or path-like
             Path to the FMU file, or unzipped FMU directory.
 
-        kind : str, one of "ME" (model exchange) or "CS" (co-simulation)
-            Select a kind of FMU if both are available.
+        kind : str, one of "ME" (model exchange), "CS" (co-simulation) or "auto"
+            Select a kind of FMU if both are available, "auto" selects
+            model exchange as pyfmi does. Other values are passed on to pyfmi.
+
+        share : bool, default=True
+            Whether to load an FMI 2.0 FMU file from a directory unzipped
+            once per process (see :func:`otfmi.registry.acquire_unzipped`):
+            all the functions of the same FMU file then share its shared
+            library and resources, and the directory is removed with the
+            last of them. FMUs declaring canBeInstantiatedOnlyOncePerProcess
+            are not shared. Use share=False for FMUs whose binary keeps a
+            global state without declaring it.
 
         Additional keyword arguments are passed on to pyfmi's 'load_fmu'
         function.
 
         """
+        lease = self.__dict__.pop("_lease", None)
+        if lease is not None:
+            # release the directory of a previously loaded model
+            lease()
         if Path(path_fmu).is_file():
+            if share:
+                directory, key = registry.acquire_unzipped(path_fmu)
+                with open(Path(directory) / "modelDescription.xml") as xmlf:
+                    description = xmlf.read()
+                unzipped_kind = _resolve_kind(description, kind)
+                # the instances of a shared directory share the globals of its binary
+                if ('fmiVersion="2.0"' in description and unzipped_kind is not None
+                        and not _instantiated_once(description, unzipped_kind)):
+                    try:
+                        self._load_unzipped(directory, unzipped_kind, **kwargs)
+                    except Exception:
+                        registry.release_unzipped(key)
+                        raise
+                    self._lease = weakref.finalize(self, registry.release_unzipped, key)
+                    return
+                registry.release_unzipped(key)
             self._model = fmi.load_fmu(
                 path_fmu=path_fmu, kind=kind, **kwargs
             )
@@ -227,14 +360,25 @@ class _FMUBaseFunction:
                             break
                 if kind is None:
                     raise ValueError("Cannot guess FMU type from modelDescription.xml")
-            try:
-                if kind == "CS":
-                    self._model = pyfmi.fmi.FMUModelCS2(fmu=path_fmu, allow_unzipped_fmu=True, **kwargs)
-                else:
-                    self._model = pyfmi.fmi.FMUModelME2(fmu=path_fmu, allow_unzipped_fmu=True, **kwargs)
-            except pyfmi.fmi.InvalidVersionException:
-                # unified type for both ME and CS
-                self._model = pyfmi.fmi.FMUModelME3(fmu=path_fmu, allow_unzipped_fmu=True, **kwargs)
+            else:
+                with open(Path(path_fmu) / "modelDescription.xml") as xmlf:
+                    kind = _resolve_kind(xmlf.read(), kind)
+                if kind is None:
+                    raise ValueError("kind must be one of 'ME', 'CS' or 'auto' for an unzipped FMU")
+            self._load_unzipped(path_fmu, kind, **kwargs)
+
+    def _load_unzipped(self, directory, kind, **kwargs):
+        """Load an unzipped FMU of known kind."""
+        # pyfmi writes a log file in current folder even with log_level=0
+        kwargs.setdefault("log_file_name", io.StringIO())
+        try:
+            if kind.upper() == "CS":
+                self._model = pyfmi.fmi.FMUModelCS2(fmu=str(directory), allow_unzipped_fmu=True, **kwargs)
+            else:
+                self._model = pyfmi.fmi.FMUModelME2(fmu=str(directory), allow_unzipped_fmu=True, **kwargs)
+        except pyfmi.fmi.InvalidVersionException:
+            # unified type for both ME and CS
+            self._model = pyfmi.fmi.FMUModelME3(fmu=str(directory), allow_unzipped_fmu=True, **kwargs)
 
     def initialize(self, initialization_script=None):
         """Initialize the FMU, using initialization script if available.
@@ -276,6 +420,9 @@ class _FMUBaseFunction:
 
         timestep : float, time step in seconds (optional).
 
+        interpolation : str, interpolation of the field inputs, one of "linear"
+        (default), "zoh" or "spline" (optional).
+
         Additional keyword arguments are passed on to the 'simulate' method of
         the underlying PyFMI model object.
 
@@ -289,7 +436,21 @@ class _FMUBaseFunction:
         kwargs.setdefault("initialization_script", self.initialization_script)
 
         if self._field_input:
-            kwargs.setdefault("time", self._input_mesh.getVertices().asPoint())
+            kwargs.setdefault("time", self._input_time)
+
+        kwargs["dict_option"] = dict(kwargs.get("dict_option", dict()))
+        if self._ncp is not None:
+            kwargs["dict_option"].setdefault("ncp", self._ncp)
+        if "result_handling" not in kwargs["dict_option"]:
+            # only record the outputs, and only their final values for vector outputs
+            ncp = kwargs["dict_option"].get("ncp")
+            kwargs["dict_option"]["result_handling"] = "custom"
+            kwargs["dict_option"]["result_handler"] = fmi.ArrayResultHandler(
+                self._model,
+                self._outputs_fmu,
+                size=None if ncp is None else ncp + 1,
+                final=not self._field_output,
+            )
 
         kwargs_simulate = fmi.parse_kwargs_simulate(
             value_input,
@@ -314,22 +475,427 @@ class _FMUBaseFunction:
 
         if self._field_output:
             time, values = fmi.strip_simulation(simulation, name_output=self.get_outputs_fmu(), final="trajectory")
-            local_mesh = ot.Mesh(
-                [[t] for t in time], [[i, i + 1] for i in range(len(time) - 1)]
-            )
-            interpolation = ot.P1LagrangeInterpolation(
-                local_mesh, self._output_mesh, len(self.get_outputs_fmu())
-            )
-            return interpolation(values)
+            return self._interpolate_output(time, values)
         else:
             # output is a vector
             return fmi.strip_simulation(simulation, name_output=self.get_outputs_fmu())
 
+    def simulate_store(self, value_inputs, path, resume=True, precision="float64", **kwargs):
+        """Simulate the fmu for a sample of inputs, writing the trajectories to disk.
+
+        Each trajectory is written to a :class:`~otfmi.storage.TrajectoryStore`
+        as soon as it is computed, so that the memory usage does not depend on
+        the sample size and the completed trajectories can be read while the
+        other ones are computed.
+
+        Parameters
+        ----------
+        value_inputs : Sequence of input values (Sample, ProcessSample, list).
+
+        path : str or path-like, directory of the store.
+
+        resume : bool, toggle skipping the trajectories already completed in
+        an existing store of the same size. True by default.
+
+        precision : str, storage precision of the values, one of "float64"
+        (default), "float32" or "int16".
+
+        Additional keyword arguments are passed on to the 'simulate' method.
+
+        """
+
+        if not self._field_output:
+            raise ValueError("Trajectories can only be stored for field outputs")
+        size = len(value_inputs)
+        if resume and (Path(path) / TrajectoryStore._metadata).exists():
+            store = TrajectoryStore(path, mode="r+")
+            if (len(store) != size or list(store.get_description()) != list(self._outputs_fmu)
+                    or store.get_precision() != precision):
+                raise ValueError(f"The store in {path} does not match the sample size, the outputs or the precision")
+        else:
+            store = TrajectoryStore.create(path, self._output_mesh, size, self._outputs_fmu, precision)
+
+        completed = store.get_completed()
+        for i in range(size):
+            if not completed[i]:
+                store.write(i, self.simulate(value_inputs[i], **kwargs))
+        store.flush()
+        return store
+
+    def simulate_compact(self, value_input, precision="float32", **kwargs):
+        """Simulate the fmu, returning the output trajectories in reduced precision.
+
+        Parameters
+        ----------
+        value_input : Vector of input values.
+
+        precision : str, one of "float32" (default), "int16" or "float64".
+
+        Additional keyword arguments are passed on to the 'simulate' method.
+
+        Returns
+        -------
+        values : :class:`~otfmi.convert.CompactArray`, encoded trajectories,
+        to be widened with its 'to_sample' method.
+
+        """
+        if not self._field_output:
+            raise ValueError("Compact values are only available for field outputs")
+        return CompactArray(self.simulate(value_input, **kwargs), precision)
+
+    def simulate_statistics(self, value_inputs, quantile_levels=(), statistics=None, **kwargs):
+        """Simulate the fmu for a sample of inputs, keeping only per-vertex statistics.
+
+        Each trajectory is added to a :class:`~otfmi.streaming.FieldStatistics`
+        accumulator then discarded, so that the memory usage does not depend
+        on the sample size.
+
+        Parameters
+        ----------
+        value_inputs : Sequence of input values (Sample, ProcessSample, list).
+
+        quantile_levels : Sequence of float, levels of the estimated quantiles.
+
+        statistics : FieldStatistics, accumulator to update (optional).
+
+        Additional keyword arguments are passed on to the 'simulate' method.
+
+        """
+
+        if statistics is None:
+            statistics = FieldStatistics(self._output_mesh, len(self._outputs_fmu), quantile_levels)
+        return self.simulate_accumulate(value_inputs, statistics, **kwargs)
+
+    def simulate_pod(self, value_inputs, n_modes, threshold=0.0, pod=None, **kwargs):
+        """Simulate the fmu for a sample of inputs, keeping only a reduced basis and modal coefficients.
+
+        The trajectories are added by blocks to an
+        :class:`~otfmi.streaming.IncrementalPOD` decomposition then discarded.
+
+        Parameters
+        ----------
+        value_inputs : Sequence of input values (Sample, ProcessSample, list).
+
+        n_modes : int, maximum number of modes.
+
+        threshold : float, relative singular value under which modes are
+        discarded.
+
+        pod : IncrementalPOD, decomposition to update (optional).
+
+        Additional keyword arguments are passed on to the 'simulate' method.
+
+        """
+        if pod is None:
+            pod = IncrementalPOD(self._output_mesh, len(self._outputs_fmu), n_modes, threshold)
+        return self.simulate_accumulate(value_inputs, pod, **kwargs)
+
+    def simulate_sobol(self, distribution, size, block_size=None, sobol=None, **kwargs):
+        """Estimate per-vertex Sobol' indices of the fmu outputs from a streamed pick-freeze design.
+
+        Pick-freeze designs of block_size rows are generated in turn with
+        :class:`openturns.SobolIndicesExperiment`, and the trajectories of
+        each row are added to a :class:`~otfmi.streaming.FieldSobolIndices`
+        accumulator then discarded, so that the memory usage does not depend
+        on the sample size. Accumulators computed by separate processes can
+        be merged.
+
+        Parameters
+        ----------
+        distribution : :class:`openturns.Distribution`, distribution of the
+        inputs, with an independent copula.
+
+        size : int, number of rows of the design.
+
+        block_size : int, number of rows generated at once (default: size).
+
+        sobol : FieldSobolIndices, accumulator to update (optional).
+
+        Additional keyword arguments are passed on to the 'simulate' method.
+
+        """
+        if self._field_input or not self._field_output:
+            raise ValueError("Sobol' indices are only computed for vector inputs and field outputs")
+        dimension = len(self._inputs_fmu)
+        if distribution.getDimension() != dimension:
+            raise ValueError(f"Expected a distribution of dimension {dimension}")
+        if sobol is None:
+            sobol = FieldSobolIndices(self._output_mesh, len(self._outputs_fmu), dimension)
+        block_size = size if block_size is None else block_size
+        remaining = size
+        while remaining > 0:
+            n = min(block_size, remaining)
+            design = np.asarray(ot.SobolIndicesExperiment(distribution, n).generate()).reshape(dimension + 2, n, dimension)
+            for k in range(n):
+                sobol.update([self.simulate(design[j, k], **kwargs) for j in range(dimension + 2)])
+            remaining -= n
+        return sobol
+
+    def simulate_accumulate(self, value_inputs, accumulator, **kwargs):
+        """Simulate the fmu for a sample of inputs, feeding each trajectory to an accumulator.
+
+        Parameters
+        ----------
+        value_inputs : Sequence of input values (Sample, ProcessSample, list).
+
+        accumulator : object with an 'update' method taking a trajectory,
+        such as the estimators of otfmi.streaming.
+
+        Additional keyword arguments are passed on to the 'simulate' method.
+
+        """
+        if not self._field_output:
+            raise ValueError("Trajectories can only be accumulated for field outputs")
+        for i in range(len(value_inputs)):
+            accumulator.update(self.simulate(value_inputs[i], **kwargs))
+        return accumulator
+
+    def simulate_sensitivity(self, value_input, reset=True, **kwargs):
+        """Simulate the fmu along with the forward sensitivities of its outputs.
+
+        The sensitivities of the outputs with respect to the inputs are
+        integrated alongside the states by the CVode solver, and projected
+        onto the outputs using directional derivatives of the FMU (or
+        finite differences if the FMU does not provide them).
+        This requires a model exchange FMU whose inputs have FMI causality INPUT.
+
+        Parameters
+        ----------
+        value_input : Vector of input values.
+
+        reset : bool, toggle resetting the FMU prior to simulation. True by
+        default.
+
+        Additional keyword arguments are passed on to the 'simulate' method of
+        the underlying PyFMI model object.
+
+        Returns
+        -------
+        values : :class:`openturns.Sample`
+            Output values on the output mesh.
+        jacobian : :class:`openturns.Sample`
+            Derivatives of the outputs with respect to the inputs on the output
+            mesh, the column k * n + i holds the derivative of the k-th output
+            with respect to the i-th input, n being the input dimension.
+        """
+
+        self._check_sensitivity(kwargs)
+        kwargs.setdefault("initialization_script", self.initialization_script)
+        options = dict(kwargs.pop("dict_option", dict()))
+        options["sensitivities"] = list(self._inputs_fmu)
+        if self._ncp is not None:
+            options.setdefault("ncp", self._ncp)
+        options["result_handling"] = "custom"
+        ncp = options.get("ncp")
+        options["result_handler"] = fmi.SensitivityResultHandler(
+            self._model, self._outputs_fmu, self._inputs_fmu, size=None if ncp is None else ncp + 1
+        )
+
+        # inputs are set as constant values prior to initialization
+        value_input = [float(x) for x in value_input]
+        simulation = fmi.simulate(
+            self._model,
+            reset=reset,
+            initialization_parameters=(self._inputs_fmu, value_input),
+            start_time=self._start_time,
+            final_time=self._final_time,
+            options=options,
+            **kwargs
+        )
+
+        result = simulation.result_data
+        n_outputs = len(self._outputs_fmu)
+        n_sensitivities = n_outputs * len(self._inputs_fmu)
+        interpolated = self._interpolate_output(
+            result.time,
+            np.column_stack((result.values, result.sensitivity.reshape(-1, n_sensitivities))),
+        )
+        values = interpolated.getMarginal(list(range(n_outputs)))
+        jacobian = interpolated.getMarginal(list(range(n_outputs, n_outputs + n_sensitivities)))
+        return values, jacobian
+
+    def _check_sensitivity(self, kwargs):
+        """Check that the derivatives with respect to the inputs can be computed."""
+        if not self._field_output:
+            raise TypeError("Sensitivities are only available for field outputs")
+        if "FMUModelME2" not in self._model.__class__.__name__:
+            raise TypeError("Sensitivities require a model exchange FMU (FMI 2.0), load it with kind='ME'")
+        causality = fmi.get_causality(self._model, self._inputs_fmu)
+        for name, causality_name in zip(self._inputs_fmu, causality):
+            if causality_name != pyfmi.fmi.FMI2_INPUT:
+                raise ValueError(f"Variable {name} cannot be used for sensitivities"
+                                 f" (causality {fmi.get_causality_str(self._model, name)})")
+        if "final_time" in kwargs.keys():
+            raise Warning("final_time must be set in the constructor.")
+        if "start_time" in kwargs.keys():
+            raise Warning("start_time must be set in the constructor.")
+
+    def simulate_adjoint(self, value_input, seed, output=0, substeps=4, reset=True, **kwargs):
+        """Simulate the fmu and compute a gradient by the adjoint method.
+
+        The gradient of :math:`\\sum_t \\gamma_t y(t)` with respect to the
+        inputs, for one output y and weights :math:`\\gamma` on the output
+        mesh, is obtained with one simulation recording checkpoints of the FMU
+        state, followed by the backward integration of the adjoint system, of
+        the size of the state vector, see
+        :meth:`otfmi.fmi.AdjointResultHandler.gradient`. No equation is
+        integrated per input, only the Jacobians of the model are evaluated
+        with one directional derivative per state and per input at each step
+        of the backward pass.
+        This requires a model exchange FMU whose inputs have FMI causality
+        INPUT, and which can get and set its FMU state.
+
+        Parameters
+        ----------
+        value_input : Vector of input values.
+
+        seed : Sequence of float, weights of the output at the output mesh
+        vertices, or a callable returning them from the output values on the
+        output mesh (2-d array).
+
+        output : int, index of the output.
+
+        substeps : int, number of Runge-Kutta steps of the backward pass per
+        simulation time step.
+
+        reset : bool, toggle resetting the FMU prior to simulation. True by
+        default.
+
+        Additional keyword arguments are passed on to the 'simulate' method of
+        the underlying PyFMI model object.
+
+        Returns
+        -------
+        values : :class:`openturns.Sample`
+            Output values on the output mesh.
+        gradient : 1-d array
+            Gradient with respect to the inputs.
+        """
+
+        self._check_sensitivity(kwargs)
+        if not self._model.get_capability_flags().get("canGetAndSetFMUstate", False):
+            raise TypeError("The adjoint method requires an FMU able to get and set its state")
+        kwargs.setdefault("initialization_script", self.initialization_script)
+        options = dict(kwargs.pop("dict_option", dict()))
+        if self._ncp is not None:
+            options.setdefault("ncp", self._ncp)
+        # the checkpoints are taken in continuous time mode
+        options["store_event_points"] = False
+        options["result_handling"] = "custom"
+        ncp = options.get("ncp")
+        handler = fmi.AdjointResultHandler(self._model, self._outputs_fmu, size=None if ncp is None else ncp + 1)
+        options["result_handler"] = handler
+
+        value_input = [float(x) for x in value_input]
+        try:
+            simulation = fmi.simulate(
+                self._model,
+                reset=reset,
+                initialization_parameters=(self._inputs_fmu, value_input),
+                start_time=self._start_time,
+                final_time=self._final_time,
+                options=options,
+                **kwargs
+            )
+            time = simulation.result_data.time
+            values = self._interpolate_output(time, simulation.result_data.values)
+            if callable(seed):
+                seed = seed(np.asarray(values))
+            seed = np.ravel(seed)
+            if len(seed) != len(self._output_time):
+                raise ValueError(f"Expected {len(self._output_time)} seed values, got {len(seed)}")
+            gradient = handler.gradient(self._transpose_interpolation(time, seed), self._inputs_fmu, output, substeps)
+        finally:
+            handler.free_checkpoints()
+        return values, gradient
+
+    def _interpolate_output(self, time, values):
+        """Interpolate simulated trajectories onto the output mesh.
+
+        Values are picked directly when the simulation time grid contains the
+        output mesh vertices (see _set_communication_grid), otherwise they are
+        linearly interpolated, the values outside of the simulation time grid
+        being those of the nearest simulation time.
+
+        Parameters
+        ----------
+        time : Sequence of float
+            Simulation time grid.
+        values : 2-d array
+            Simulated values with time steps as rows.
+        """
+        time = np.asarray(time, dtype=float)
+        values = np.asarray(values, dtype=float)
+        index = self._output_index
+        if index is not None and len(time) == self._ncp + 1:
+            tol = 1e-6 * (self._final_time - self._start_time) / self._ncp
+            if np.max(np.abs(time[index] - self._output_time)) <= tol:
+                return to_sample(values[index])
+
+        # the interpolation stencil only depends on the simulation time grid
+        cache = self._interpolation_cache
+        if cache is None or not np.array_equal(cache[0], time):
+            cache = (time,) + self._compute_interpolation(time)
+            self._interpolation_cache = cache
+        _, lower, weight = cache
+        if len(time) == 1:
+            return to_sample(values[lower])
+        weight = weight[:, np.newaxis]
+        return to_sample(values[lower] * (1.0 - weight) + values[lower + 1] * weight)
+
+    def _transpose_interpolation(self, time, seed):
+        """Transpose of _interpolate_output: map weights on the output mesh onto the simulation time grid.
+
+        Parameters
+        ----------
+        time : Sequence of float
+            Simulation time grid.
+        seed : 1-d array
+            Weights of the output mesh vertices.
+        """
+        time = np.asarray(time, dtype=float)
+        time_seed = np.zeros(len(time))
+        index = self._output_index
+        if index is not None and len(time) == self._ncp + 1:
+            tol = 1e-6 * (self._final_time - self._start_time) / self._ncp
+            if np.max(np.abs(time[index] - self._output_time)) <= tol:
+                np.add.at(time_seed, index, seed)
+                return time_seed
+        lower, weight = self._compute_interpolation(time)
+        np.add.at(time_seed, lower, seed * (1.0 - weight))
+        if len(time) > 1:
+            np.add.at(time_seed, lower + 1, seed * weight)
+        return time_seed
+
+    def _compute_interpolation(self, time):
+        """Compute the linear interpolation stencil from a time grid to the output mesh.
+
+        Parameters
+        ----------
+        time : 1-d array
+            Increasing simulation time grid.
+
+        Returns
+        -------
+        lower : 1-d array of int
+            Index of the simulation time preceding each output mesh vertex.
+        weight : 1-d array of float
+            Weight of the following simulation time.
+        """
+        if len(time) == 1:
+            return np.zeros(len(self._output_time), dtype=int), np.zeros(len(self._output_time))
+        lower = np.clip(np.searchsorted(time, self._output_time, side="right") - 1, 0, len(time) - 2)
+        delta = time[lower + 1] - time[lower]
+        weight = (self._output_time - time[lower]) / np.where(delta > 0.0, delta, 1.0)
+        return lower, np.clip(weight, 0.0, 1.0)
+
     def __getstate__(self):
-        data = super(_FMUBaseFunction, self).__getstate__()
+        # object.__getstate__ returns the instance dictionary itself
+        data = dict(super(_FMUBaseFunction, self).__getstate__())
         # remove pyfmi model
         if "_model" in data:
             data.pop("_model")
+        data.pop("_lease", None)
         return data
 
     def __setstate__(self, data):
@@ -610,6 +1176,217 @@ class OpenTURNSFMUPointToFieldFunction(ot.OpenTURNSPythonPointToFieldFunction):
 
         return self.base.simulate(value_input=value_input, **kwargs)
 
+    def computeSensitivity(self, value_input, **kwargs):
+        """Simulate the FMU along with the forward sensitivities of its outputs.
+
+        A single simulation yields both the output field and the derivatives of
+        the outputs with respect to the inputs over the whole output mesh.
+        This requires a model exchange FMU (kind="ME") whose inputs have FMI
+        causality INPUT.
+
+        Parameters
+        ----------
+        value_input : Vector of input values.
+
+        See the 'simulate_sensitivity' method for additional keyword arguments.
+
+        Returns
+        -------
+        values : :class:`openturns.Field`
+            Output values on the output mesh.
+        jacobian : :class:`openturns.Field`
+            Jacobian on the output mesh, the component k * n + i holds the
+            derivative of the k-th output with respect to the i-th input,
+            n being the input dimension.
+        """
+
+        values, jacobian = self.base.simulate_sensitivity(value_input, **kwargs)
+        jacobian.setDescription(
+            [f"d{name_output}/d{name_input}" for name_output in self.base.get_outputs_fmu()
+             for name_input in self.base.get_inputs_fmu()]
+        )
+        values.setDescription(self.base.get_outputs_fmu())
+        mesh = self.base.get_output_mesh()
+        return ot.Field(mesh, values), ot.Field(mesh, jacobian)
+
+    def computeLeastSquaresGradient(self, value_input, observations, output=0, weights=None, **kwargs):
+        """Compute a least squares trajectory objective and its gradient.
+
+        The objective is the weighted sum over the output mesh of the squared
+        residuals of one output, :math:`J(x) = \\sum_t w_t (y(x, t) - y^{obs}_t)^2`.
+        The gradient with respect to all the inputs is obtained by the adjoint
+        method: one simulation, then one backward integration of the adjoint
+        system whose size is the number of states, whatever the number of
+        inputs (see the 'simulate_adjoint' method).
+        Same requirements as 'computeSensitivity', and the FMU must be able
+        to get and set its state.
+
+        Parameters
+        ----------
+        value_input : Vector of input values.
+
+        observations : Sequence of float
+            Observed values of the output at the output mesh vertices.
+
+        output : int or str, default=0
+            Index or name of the observed output.
+
+        weights : Sequence of float, default=None
+            Weights of the squared residuals, all equal to 1 by default.
+
+        See the 'simulate_adjoint' method for additional keyword arguments.
+
+        Returns
+        -------
+        objective : float
+            Value of the objective.
+        gradient : :class:`openturns.Point`
+            Gradient of the objective with respect to the inputs.
+        """
+
+        if isinstance(output, str):
+            output = self.base.get_outputs_fmu().index(output)
+        observations = np.ravel(observations)
+        n_vertices = self.base.get_output_mesh().getVerticesNumber()
+        if len(observations) != n_vertices:
+            raise ValueError(f"Expected {n_vertices} observations, got {len(observations)}")
+        weights = np.ones(n_vertices) if weights is None else np.ravel(weights)
+
+        # the gradient of the objective is that of sum_t 2 w_t r_t y(t), the
+        # residuals r_t being known at the end of the simulation
+        def seed(values):
+            return 2.0 * weights * (values[:, output] - observations)
+
+        values, gradient = self.base.simulate_adjoint(value_input, seed, output, **kwargs)
+        objective = float(np.dot(weights, (np.asarray(values)[:, output] - observations) ** 2))
+        return objective, ot.Point(gradient)
+
+    def computeSobolIndices(self, distribution, size, block_size=None, **kwargs):
+        """Estimate per-vertex Sobol' indices of the outputs from a streamed pick-freeze design.
+
+        The first order indices are estimated as with
+        :class:`openturns.SaltelliSensitivityAlgorithm` and the total order
+        indices as with :class:`openturns.JansenSensitivityAlgorithm`, without
+        keeping the trajectories.
+
+        Parameters
+        ----------
+        distribution : :class:`openturns.Distribution`
+            Distribution of the inputs, with an independent copula.
+
+        size : int
+            Number of rows of the pick-freeze design.
+
+        block_size : int, default=None
+            Number of rows generated at once, all of them by default.
+
+        See the 'simulate_sobol' method for additional keyword arguments.
+
+        Returns
+        -------
+        sobol : :class:`~otfmi.streaming.FieldSobolIndices`
+            Accumulator giving the first and total order indices fields, which
+            can be merged with the ones of other designs.
+        """
+
+        return self.base.simulate_sobol(distribution, size, block_size, **kwargs)
+
+    def computeCompact(self, value_input, precision="float32", **kwargs):
+        """Simulate the FMU, returning the output trajectories in reduced precision.
+
+        The result is cheaper to keep in memory or to transfer between
+        processes (for instance as the result of a
+        concurrent.futures.ProcessPoolExecutor task) than a Field.
+
+        Parameters
+        ----------
+        value_input : Vector of input values.
+
+        precision : str, default="float32"
+            Storage precision, one of "float32", "int16" (values mapped onto
+            16-bit integers with a per-variable offset and scale) or "float64".
+
+        See the 'simulate' method for additional keyword arguments.
+
+        Returns
+        -------
+        values : :class:`~otfmi.convert.CompactArray`
+            Encoded output values, widened to double precision by its
+            'to_numpy' and 'to_sample' methods.
+        """
+
+        return self.base.simulate_compact(value_input, precision, **kwargs)
+
+    def computeStatistics(self, value_inputs, quantile_levels=(), **kwargs):
+        """Simulate the FMU for a sample of inputs, keeping only per-vertex statistics.
+
+        Parameters
+        ----------
+        value_inputs : :class:`openturns.Sample` of input values.
+
+        quantile_levels : Sequence of float, default=()
+            Levels of the estimated quantiles.
+
+        See the 'simulate_statistics' method for additional keyword arguments.
+
+        Returns
+        -------
+        statistics : :class:`~otfmi.streaming.FieldStatistics`
+            Accumulator of the mean, variance, extrema and quantiles, which can
+            be merged with the ones of other samples.
+        """
+
+        return self.base.simulate_statistics(value_inputs, quantile_levels, **kwargs)
+
+    def computePOD(self, value_inputs, n_modes, threshold=0.0, **kwargs):
+        """Simulate the FMU for a sample of inputs, keeping only a reduced basis and modal coefficients.
+
+        Parameters
+        ----------
+        value_inputs : :class:`openturns.Sample` of input values.
+
+        n_modes : int
+            Maximum number of modes.
+
+        threshold : float, default=0.0
+            Modes whose singular value is below threshold times the largest one
+            are discarded.
+
+        See the 'simulate_pod' method for additional keyword arguments.
+
+        Returns
+        -------
+        pod : :class:`~otfmi.streaming.IncrementalPOD`
+            Decomposition of the output trajectories, giving the mean, the
+            modes and the modal coefficients of each trajectory.
+        """
+
+        return self.base.simulate_pod(value_inputs, n_modes, threshold, **kwargs)
+
+    def computeTrajectoryStore(self, value_inputs, path, precision="float64", **kwargs):
+        """Simulate the FMU for a sample of inputs, writing the trajectories to disk.
+
+        Parameters
+        ----------
+        value_inputs : :class:`openturns.Sample` of input values.
+
+        path : str or path-like
+            Directory of the store.
+
+        precision : str, default="float64"
+            Storage precision of the values, one of "float64", "float32" or "int16".
+
+        See the 'simulate_store' method for additional keyword arguments.
+
+        Returns
+        -------
+        store : :class:`~otfmi.storage.TrajectoryStore`
+            Handle on the trajectories, read on demand, see its
+            'to_process_sample' method.
+        """
+
+        return self.base.simulate_store(value_inputs, path, precision=precision, **kwargs)
+
 
 class FMUFieldToPointFunction(ot.FieldToPointFunction):
     """
@@ -840,3 +1617,99 @@ class OpenTURNSFMUFieldFunction(ot.OpenTURNSPythonFieldFunction):
 
         """
         return self.base.simulate(value_input=value_input, **kwargs)
+
+    def computeCompact(self, value_input, precision="float32", **kwargs):
+        """Simulate the FMU, returning the output trajectories in reduced precision.
+
+        The result is cheaper to keep in memory or to transfer between
+        processes (for instance as the result of a
+        concurrent.futures.ProcessPoolExecutor task) than a Field.
+
+        Parameters
+        ----------
+        value_input : Field of input values, with time steps as rows.
+
+        precision : str, default="float32"
+            Storage precision, one of "float32", "int16" (values mapped onto
+            16-bit integers with a per-variable offset and scale) or "float64".
+
+        See the 'simulate' method for additional keyword arguments.
+
+        Returns
+        -------
+        values : :class:`~otfmi.convert.CompactArray`
+            Encoded output values, widened to double precision by its
+            'to_numpy' and 'to_sample' methods.
+        """
+
+        return self.base.simulate_compact(value_input, precision, **kwargs)
+
+    def computeStatistics(self, value_inputs, quantile_levels=(), **kwargs):
+        """Simulate the FMU for a sample of inputs, keeping only per-vertex statistics.
+
+        Parameters
+        ----------
+        value_inputs : :class:`openturns.ProcessSample` of input values.
+
+        quantile_levels : Sequence of float, default=()
+            Levels of the estimated quantiles.
+
+        See the 'simulate_statistics' method for additional keyword arguments.
+
+        Returns
+        -------
+        statistics : :class:`~otfmi.streaming.FieldStatistics`
+            Accumulator of the mean, variance, extrema and quantiles, which can
+            be merged with the ones of other samples.
+        """
+
+        return self.base.simulate_statistics(value_inputs, quantile_levels, **kwargs)
+
+    def computePOD(self, value_inputs, n_modes, threshold=0.0, **kwargs):
+        """Simulate the FMU for a sample of inputs, keeping only a reduced basis and modal coefficients.
+
+        Parameters
+        ----------
+        value_inputs : :class:`openturns.ProcessSample` of input values.
+
+        n_modes : int
+            Maximum number of modes.
+
+        threshold : float, default=0.0
+            Modes whose singular value is below threshold times the largest one
+            are discarded.
+
+        See the 'simulate_pod' method for additional keyword arguments.
+
+        Returns
+        -------
+        pod : :class:`~otfmi.streaming.IncrementalPOD`
+            Decomposition of the output trajectories, giving the mean, the
+            modes and the modal coefficients of each trajectory.
+        """
+
+        return self.base.simulate_pod(value_inputs, n_modes, threshold, **kwargs)
+
+    def computeTrajectoryStore(self, value_inputs, path, precision="float64", **kwargs):
+        """Simulate the FMU for a sample of inputs, writing the trajectories to disk.
+
+        Parameters
+        ----------
+        value_inputs : :class:`openturns.ProcessSample` of input values.
+
+        path : str or path-like
+            Directory of the store.
+
+        precision : str, default="float64"
+            Storage precision of the values, one of "float64", "float32" or "int16".
+
+        See the 'simulate_store' method for additional keyword arguments.
+
+        Returns
+        -------
+        store : :class:`~otfmi.storage.TrajectoryStore`
+            Handle on the trajectories, read on demand, see its
+            'to_process_sample' method.
+        """
+
+        return self.base.simulate_store(value_inputs, path, precision=precision, **kwargs)
@@ -0,0 +1,186 @@
+# Copyright 2016-2025 EDF Phimeca
+
+"""Worker pool forked from a process holding a loaded FMU function."""
+
+import concurrent.futures
+import multiprocessing
+import os
+import pickle
+import weakref
+import openturns as ot
+from .convert import to_numpy
+
+# function of the template process, inherited by the forked workers
+_function = None
+
+
+def _load(data):
+    """Unpickle the function, which loads the FMU."""
+    global _function
+    _function = pickle.loads(data)
+
+
+def _evaluate(value_input):
+    return _function(value_input)
+
+
+def _send_error(connection, exc):
+    try:
+        connection.send(("error", exc))
+    except Exception:
+        # the exception cannot be pickled
+        connection.send(("error", RuntimeError(repr(exc))))
+
+
+def _serve(connection, data, max_workers, warmup_input):
+    """Template process: load the function once, fork the workers and relay the requests."""
+    try:
+        _load(data)
+        if warmup_input is not None:
+            _evaluate(warmup_input)
+        if "fork" in multiprocessing.get_all_start_methods():
+            # the workers inherit the loaded FMU
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers, mp_context=multiprocessing.get_context("fork"))
+        else:
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers, mp_context=multiprocessing.get_context("spawn"), initializer=_load, initargs=(data,))
+        # the workers are only started on submit: start them, and load the FMU
+        # in the spawned ones, before the first request
+        for future in [executor.submit(os.getpid) for _ in range(max_workers)]:
+            future.result()
+    except Exception as exc:
+        _send_error(connection, exc)
+        return
+    connection.send(("ready", os.getpid()))
+    with executor:
+        while True:
+            request = connection.recv()
+            if request is None:
+                break
+            value_inputs, chunksize = request
+            try:
+                result = list(executor.map(_evaluate, value_inputs, chunksize=chunksize))
+            except Exception as exc:
+                _send_error(connection, exc)
+            else:
+                connection.send(("result", result))
+
+
+def _shutdown(connection, template):
+    try:
+        connection.send(None)
+    except (OSError, ValueError):
+        pass
+    template.join()
+    connection.close()
+
+
+class FMUPool:
+    """Pool of worker processes sharing a loaded FMU function.
+
+    Unpickling an FMU function in a worker process reloads the FMU, that is
+    it unzips the FMU and loads its shared library again. Here a template
+    process loads the function once, optionally runs a first simulation,
+    and then forks the workers, which inherit the loaded FMU copy-on-write:
+    the first evaluations are as fast as the following ones.
+    The template process is itself started with the "forkserver" method
+    when available, so that the calling process is never forked. Where
+    "fork" is not available, the workers are spawned and each of them loads
+    the function before the first request.
+
+    Parameters
+    ----------
+    function : callable
+        Picklable function, for instance an :class:`~otfmi.FMUFunction`.
+
+    max_workers : int, default=None
+        Number of worker processes, by default the number of CPUs.
+
+    prewarm : bool, default=True
+        Whether to start the template process and the workers in the
+        background at construction, instead of at the first evaluation.
+
+    warmup_input : Sequence of float, default=None
+        Input of a first evaluation run by the template process before
+        forking the workers.
+
+    Examples
+    --------
+    >>> model = otfmi.FMUFunction(path_fmu, inputs_fmu=["E", "F", "L", "I"], outputs_fmu=["y"])  # doctest: +SKIP
+    >>> pool = otfmi.FMUPool(model, max_workers=4)  # doctest: +SKIP
+    >>> values = pool.map(inputs)  # doctest: +SKIP
+    """
+
+    def __init__(self, function, max_workers=None, prewarm=True, warmup_input=None):
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count()
+        self._data = pickle.dumps(function)
+        self._warmup_input = None if warmup_input is None else to_numpy(warmup_input).tolist()
+        self._connection = None
+        self._ready = False
+        self._finalizer = None
+        if prewarm:
+            self._start()
+
+    def _start(self):
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        context = multiprocessing.get_context(method)
+        self._connection, connection = context.Pipe()
+        # not a daemon: the template process has children
+        template = context.Process(target=_serve, args=(connection, self._data, self.max_workers, self._warmup_input))
+        template.start()
+        connection.close()
+        self._finalizer = weakref.finalize(self, _shutdown, self._connection, template)
+
+    def _receive(self):
+        status, value = self._connection.recv()
+        if status == "error":
+            raise value
+        return value
+
+    def wait(self):
+        """Wait for the workers to be ready."""
+        if self._connection is None:
+            self._start()
+        if not self._ready:
+            try:
+                self._receive()
+            except Exception:
+                self.shutdown()
+                raise
+            self._ready = True
+
+    def map(self, value_inputs, chunksize=1):
+        """Evaluate the function on a sample of inputs.
+
+        Parameters
+        ----------
+        value_inputs : :class:`openturns.Sample` or Sequence
+            Inputs of the function, one per evaluation.
+
+        chunksize : int, default=1
+            Number of inputs sent to a worker at once.
+
+        Returns
+        -------
+        values : list
+            Values of the function, in the order of the inputs.
+        """
+        if self._finalizer is not None and not self._finalizer.alive:
+            raise RuntimeError("The pool is shut down")
+        self.wait()
+        if isinstance(value_inputs, ot.Sample):
+            value_inputs = to_numpy(value_inputs).tolist()
+        self._connection.send((list(value_inputs), chunksize))
+        return self._receive()
+
+    def shutdown(self):
+        """Stop the workers and the template process."""
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
@@ -0,0 +1,209 @@
+# Copyright 2016-2025 EDF Phimeca
+
+"""Per-process registries of FMU function instances and unzipped FMUs."""
+
+import atexit
+import hashlib
+import os
+from pathlib import Path
+import pickle
+import shutil
+import tempfile
+import zipfile
+import numpy as np
+import openturns as ot
+
+# instances built in this process, by handle key
+_instances = dict()
+
+# unzipped FMU directories shared in this process, by FMU file:
+# [directory, number of users]
+_unzipped = dict()
+
+# directories that could not be removed on release (libraries still loaded)
+_leftover = []
+
+
+def _file_digest(path, sha=None):
+    """SHA-256 digest of the content of a file."""
+    sha = hashlib.sha256() if sha is None else sha
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _fmu_digest(path_fmu):
+    """SHA-256 digest of an FMU file, or of the model description and binaries of an unzipped FMU."""
+    path = Path(path_fmu)
+    if not path.is_dir():
+        return _file_digest(path)
+    sha = hashlib.sha256()
+    files = [path / "modelDescription.xml"] + sorted(item for item in (path / "binaries").rglob("*") if item.is_file())
+    for item in files:
+        sha.update(item.relative_to(path).as_posix().encode() + b"\0")
+        _file_digest(item, sha)
+    return sha.hexdigest()
+
+
+def _encode_mesh(mesh):
+    """Compact picklable description of a mesh."""
+    if isinstance(mesh, ot.RegularGrid):
+        return ("grid", mesh.getStart(), mesh.getStep(), mesh.getN())
+    vertices = np.array(mesh.getVertices())
+    simplices = np.array(mesh.getSimplices(), dtype=np.int64).reshape(-1, mesh.getDimension() + 1)
+    return ("mesh", vertices, simplices)
+
+
+def _decode_mesh(data):
+    if data[0] == "grid":
+        return ot.RegularGrid(*data[1:])
+    vertices, simplices = data[1:]
+    if len(simplices) > 0:
+        return ot.Mesh(vertices, ot.IndicesCollection(simplices))
+    return ot.Mesh(vertices)
+
+
+def _unzipped_key(path_fmu):
+    """Identify an FMU file by its path, size and modification time."""
+    path = Path(path_fmu).resolve()
+    stat = path.stat()
+    return (str(path), stat.st_size, stat.st_mtime_ns)
+
+
+def acquire_unzipped(path_fmu):
+    """Unzip an FMU, or share the directory already unzipped in this process.
+
+    Loading an FMU from the same directory, the shared library is mapped
+    only once and its resources are stored only once, whatever the number
+    of models. Each call must be paired with a call to
+    :func:`release_unzipped`.
+
+    Parameters
+    ----------
+    path_fmu : str or path-like
+        Path to the FMU file.
+
+    Returns
+    -------
+    directory : str
+        Unzipped FMU directory.
+
+    key : tuple
+        Key to release the directory.
+    """
+    key = _unzipped_key(path_fmu)
+    entry = _unzipped.get(key)
+    if entry is None:
+        directory = tempfile.mkdtemp(prefix="otfmi_")
+        with zipfile.ZipFile(path_fmu) as zf:
+            zf.extractall(directory)
+        entry = _unzipped[key] = [directory, 0]
+    entry[1] += 1
+    return entry[0], key
+
+
+def release_unzipped(key):
+    """Release an unzipped FMU directory, removed with its last user.
+
+    Parameters
+    ----------
+    key : tuple
+        Key returned by :func:`acquire_unzipped`.
+    """
+    entry = _unzipped.get(key)
+    if entry is None:
+        return
+    entry[1] -= 1
+    if entry[1] == 0:
+        del _unzipped[key]
+        shutil.rmtree(entry[0], ignore_errors=True)
+        if os.path.exists(entry[0]):
+            _leftover.append(entry[0])
+
+
+def get_unzipped():
+    """Get the shared unzipped FMU directories.
+
+    Returns
+    -------
+    unzipped : dict
+        Number of users of each directory.
+    """
+    return {directory: count for directory, count in _unzipped.values()}
+
+
+@atexit.register
+def _remove_leftover():
+    for directory in _leftover:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def clear():
+    """Release the instances cached in this process."""
+    _instances.clear()
+
+
+class FMUHandle:
+    """Lightweight picklable reference to an FMU function.
+
+    Pickling an FMU function, for instance to submit it to a process pool,
+    transfers its meshes and reloads the FMU in the worker for each task.
+    A handle only holds the FMU digest, its path and the constructor
+    arguments: each process builds the function once, on first use, and
+    then reuses it for all the tasks with the same handle, whatever the
+    executor.
+
+    Parameters
+    ----------
+    function_class : class
+        FMU function class, for instance :class:`~otfmi.FMUPointToFieldFunction`.
+
+    path_fmu : str or path-like
+        Path to the FMU file or unzipped FMU directory, which must be
+        readable by the workers. The key of a directory depends on its model
+        description and binaries.
+
+    Additional keyword arguments are passed on to the constructor of the
+    function class. Meshes are stored as their vertices and simplices, or
+    as start, step and number of steps for regular grids.
+
+    Examples
+    --------
+    >>> handle = otfmi.FMUHandle(otfmi.FMUFunction, path_fmu, inputs_fmu=["E", "F", "L", "I"], outputs_fmu="y")  # doctest: +SKIP
+    >>> with concurrent.futures.ProcessPoolExecutor() as executor:  # doctest: +SKIP
+    ...     futures = [executor.submit(handle, x) for x in sample]
+    """
+
+    def __init__(self, function_class, path_fmu, **kwargs):
+        self.function_class = function_class
+        self.path_fmu = str(path_fmu)
+        self._kwargs = {
+            key: ("_mesh", _encode_mesh(value)) if isinstance(value, (ot.Mesh, ot.RegularGrid)) else value
+            for key, value in kwargs.items()
+        }
+        config = (function_class.__module__, function_class.__qualname__, sorted(self._kwargs.items(), key=str))
+        sha = hashlib.sha256(_fmu_digest(path_fmu).encode())
+        sha.update(pickle.dumps(config))
+        self.key = sha.hexdigest()
+
+    def get_kwargs(self):
+        """Get the constructor keyword arguments."""
+        return {
+            key: _decode_mesh(value[1]) if isinstance(value, tuple) and len(value) == 2 and value[0] == "_mesh" else value
+            for key, value in self._kwargs.items()
+        }
+
+    def get_function(self):
+        """Get the function instance of this process, built on first call."""
+        function = _instances.get(self.key)
+        if function is None:
+            function = self.function_class(self.path_fmu, **self.get_kwargs())
+            _instances[self.key] = function
+        return function
+
+    def __call__(self, *args, **kwargs):
+        return self.get_function()(*args, **kwargs)
+
+    def __repr__(self):
+        return f"FMUHandle({self.function_class.__qualname__}, {self.path_fmu!r}, key={self.key[:12]})"
@@ -0,0 +1,233 @@
+# Copyright 2016-2025 EDF Phimeca
+
+"""On-disk storage of field outputs."""
+
+import json
+from pathlib import Path
+import numpy as np
+import openturns as ot
+from .convert import to_numpy, to_sample, to_process_sample, encode, decode
+
+
+class TrajectoryStore:
+    """Trajectories stored in memory-mapped files, one per output variable.
+
+    The store is a directory holding, for each output variable, a .npy file
+    of shape (size, number of mesh vertices), along with the mesh, the
+    variable names and a mask of the completed trajectories. Trajectories
+    are written as they are computed and only read on demand, so that the
+    store can be much larger than the memory, and can be read by another
+    process while it is filled.
+    The values can be stored in reduced precision: float32, or int16 with an
+    offset and a scale per trajectory and output variable.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Directory of an existing store, see :meth:`create`.
+
+    mode : str, one of "r" (default, read-only) or "r+" (read and write)
+        Memory-map mode of the files.
+
+    Examples
+    --------
+    >>> store = TrajectoryStore.create("store", mesh, 100, ["x", "y"])  # doctest: +SKIP
+    >>> store.write(0, values)  # doctest: +SKIP
+    >>> process_sample = TrajectoryStore("store")[:10].to_process_sample()  # doctest: +SKIP
+    """
+
+    _metadata = "metadata.json"
+
+    def __init__(self, path, mode="r"):
+        if mode not in ["r", "r+"]:
+            raise ValueError(f"Unexpected mode: {mode}")
+        self.path = Path(path)
+        self._mode = mode
+        with open(self.path / self._metadata) as f:
+            metadata = json.load(f)
+        self._description = metadata["description"]
+        self._precision = metadata.get("precision", "float64")
+        self._mesh = None
+        self._values = [
+            np.load(self.path / f"output_{k}.npy", mmap_mode=mode)
+            for k in range(len(self._description))
+        ]
+        self._completed = np.load(self.path / "completed.npy", mmap_mode=mode)
+        self._offset = None
+        self._scale = None
+        if self._precision == "int16":
+            self._offset = np.load(self.path / "offset.npy", mmap_mode=mode)
+            self._scale = np.load(self.path / "scale.npy", mmap_mode=mode)
+
+    @classmethod
+    def create(cls, path, mesh, size, description, precision="float64"):
+        """Create an empty store.
+
+        The files are allocated at their final size, but are only filled
+        on disk as the trajectories are written.
+
+        Parameters
+        ----------
+        path : str or path-like
+            Directory of the store, created if needed.
+
+        mesh : :class:`openturns.Mesh`
+            Mesh of the trajectories.
+
+        size : int
+            Number of trajectories.
+
+        description : Sequence of str
+            Output variable names.
+
+        precision : str, one of "float64" (default), "float32" or "int16"
+            Storage precision of the values, see :func:`otfmi.convert.encode`.
+
+        Returns
+        -------
+        store : :class:`TrajectoryStore`
+            Store opened in "r+" mode.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        if (path / cls._metadata).exists():
+            raise FileExistsError(f"A trajectory store already exists in {path}")
+        n_vertices = mesh.getVerticesNumber()
+        np.save(path / "vertices.npy", np.asarray(mesh.getVertices()))
+        np.save(path / "simplices.npy", np.asarray(mesh.getSimplices(), dtype=np.int64).reshape(-1, mesh.getDimension() + 1))
+        encode(np.zeros((1, 1)), precision)  # check the precision
+        for k in range(len(description)):
+            np.lib.format.open_memmap(path / f"output_{k}.npy", mode="w+", dtype=precision, shape=(size, n_vertices))
+        np.lib.format.open_memmap(path / "completed.npy", mode="w+", dtype=bool, shape=(size,))
+        if precision == "int16":
+            for name in ["offset", "scale"]:
+                np.lib.format.open_memmap(path / f"{name}.npy", mode="w+", dtype=float, shape=(size, len(description)))
+        # written last: the store is valid once the metadata exists
+        with open(path / cls._metadata, "w") as f:
+            json.dump({"size": int(size), "description": list(description), "precision": precision}, f)
+        return cls(path, mode="r+")
+
+    def __len__(self):
+        return len(self.get_completed())
+
+    def __getitem__(self, index):
+        """Select trajectories without reading them.
+
+        Parameters
+        ----------
+        index : int, slice or sequence of int
+            Trajectories to select.
+
+        Returns
+        -------
+        store : :class:`TrajectoryStore`
+            Read-only view on the selected trajectories.
+        """
+        if np.ndim(index) == 0 and not isinstance(index, slice):
+            index = slice(index, index + 1 if index != -1 else None)
+        view = object.__new__(TrajectoryStore)
+        view.__dict__.update(self.__dict__)
+        view._mode = "r"
+        view._values = [values[index] for values in self._values]
+        view._completed = self._completed[index]
+        if self._precision == "int16":
+            view._offset = self._offset[index]
+            view._scale = self._scale[index]
+        return view
+
+    def get_description(self):
+        """Get the output variable names."""
+        return ot.Description(self._description)
+
+    def get_mesh(self):
+        """Get the mesh of the trajectories."""
+        if self._mesh is None:
+            vertices = to_sample(np.load(self.path / "vertices.npy"))
+            simplices = np.load(self.path / "simplices.npy")
+            if len(simplices) > 0:
+                self._mesh = ot.Mesh(vertices, ot.IndicesCollection(simplices))
+            else:
+                self._mesh = ot.Mesh(vertices)
+        return self._mesh
+
+    def get_completed(self):
+        """Get the mask of the completed trajectories."""
+        return np.array(self._completed)
+
+    def get_precision(self):
+        """Get the storage precision of the values."""
+        return self._precision
+
+    def get_marginal(self, output):
+        """Get the trajectories of one output variable.
+
+        Parameters
+        ----------
+        output : int or str
+            Output variable index or name.
+
+        Returns
+        -------
+        values : numpy array
+            Values with trajectories as rows, memory-mapped in float64 or
+            float32 precision, read and widened to float64 in int16 precision.
+        """
+        if isinstance(output, str):
+            output = self._description.index(output)
+        if self._precision == "int16":
+            return decode(self._values[output], self._offset[:, output, np.newaxis], self._scale[:, output, np.newaxis])
+        return self._values[output]
+
+    def to_numpy(self):
+        """Read the trajectories, widened to float64.
+
+        Returns
+        -------
+        values : 3-d numpy array
+            Values indexed by trajectory, vertex and output variable.
+        """
+        values = np.stack(self._values, axis=-1)
+        if self._precision == "int16":
+            return decode(values, self._offset[:, np.newaxis], self._scale[:, np.newaxis])
+        return decode(values)
+
+    def to_process_sample(self):
+        """Read the trajectories as a ProcessSample.
+
+        Returns
+        -------
+        process_sample : :class:`openturns.ProcessSample`
+            Trajectories of the store.
+        """
+        return to_process_sample(self.get_mesh(), self.to_numpy())
+
+    def write(self, index, values):
+        """Write a trajectory.
+
+        Parameters
+        ----------
+        index : int
+            Trajectory index.
+
+        values : 2-d array-like
+            Values with vertices as rows and output variables as columns.
+        """
+        if self._mode == "r":
+            raise ValueError("The store is read-only")
+        data, offset, scale = encode(to_numpy(values), self._precision)
+        for k, column in enumerate(self._values):
+            column[index] = data[:, k]
+        if offset is not None:
+            self._offset[index] = offset
+            self._scale[index] = scale
+        # set the mask after the values so that readers only see full trajectories
+        self._completed[index] = True
+
+    def flush(self):
+        """Write the pending changes to disk."""
+        for values in self._values:
+            values.flush()
+        self._completed.flush()
+        if self._precision == "int16":
+            self._offset.flush()
+            self._scale.flush()
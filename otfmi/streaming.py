@@ -0,0 +1,610 @@
+# Copyright 2016-2025 EDF Phimeca
+
+"""Streaming estimators over samples of field outputs."""
+
+import copy
+import numpy as np
+import openturns as ot
+from .convert import to_numpy, to_sample, to_process_sample
+
+
+def _interpolate(x, xp, fp):
+    """Piecewise linear interpolation along the first axis, cell by cell.
+
+    Parameters
+    ----------
+    x : array of shape (m, ...)
+        Abscissas to interpolate at.
+    xp : array of shape (k, ...)
+        Nondecreasing abscissas of the knots along the first axis.
+    fp : array of shape (k, ...)
+        Ordinates of the knots.
+    """
+    index = np.sum(x[:, np.newaxis] >= xp[np.newaxis], axis=1) - 1
+    index = np.clip(index, 0, len(xp) - 2)
+    x0 = np.take_along_axis(xp, index, axis=0)
+    x1 = np.take_along_axis(xp, index + 1, axis=0)
+    f0 = np.take_along_axis(fp, index, axis=0)
+    f1 = np.take_along_axis(fp, index + 1, axis=0)
+    delta = x1 - x0
+    weight = np.clip((x - x0) / np.where(delta > 0.0, delta, 1.0), 0.0, 1.0)
+    return f0 + weight * (f1 - f0)
+
+
+class FieldStatistics:
+    """Per-vertex statistics of a sample of fields, updated one field at a time.
+
+    The mean and variance are updated with Welford's algorithm, the minimum
+    and maximum exactly, and the quantiles with the P² algorithm of Jain and
+    Chlamtac, which tracks 5 markers per vertex, component and level instead
+    of the whole sample. The memory usage does not depend on the sample size.
+    Accumulators filled separately (by parallel workers for instance) are
+    combined with :meth:`merge`: exactly for the moments and extrema, and by
+    merging the piecewise linear distribution functions of the markers for
+    the quantiles.
+
+    Parameters
+    ----------
+    mesh : :class:`openturns.Mesh`
+        Mesh of the fields.
+
+    dimension : int
+        Dimension of the values of the fields.
+
+    quantile_levels : Sequence of float, default=()
+        Levels of the estimated quantiles, in (0, 1).
+    """
+
+    def __init__(self, mesh, dimension, quantile_levels=()):
+        self._mesh = mesh
+        self._quantile_levels = np.asarray(quantile_levels, dtype=float).ravel()
+        if np.any((self._quantile_levels <= 0.0) | (self._quantile_levels >= 1.0)):
+            raise ValueError("Expected quantile levels in (0, 1)")
+        shape = (mesh.getVerticesNumber(), dimension)
+        self.count = 0
+        self._mean = np.zeros(shape)
+        self._m2 = np.zeros(shape)
+        self._min = np.full(shape, np.inf)
+        self._max = np.full(shape, -np.inf)
+        # P² markers heights and positions, indexed by marker, vertex, component, level
+        n_levels = len(self._quantile_levels)
+        self._initial = np.empty((5,) + shape)
+        self._height = np.empty((5,) + shape + (n_levels,))
+        self._position = np.empty((5,) + shape + (n_levels,))
+
+    def _desired_position(self, count):
+        """Desired positions of the markers after count observations."""
+        p = self._quantile_levels
+        increment = np.array([np.zeros_like(p), p / 2.0, p, (1.0 + p) / 2.0, np.ones_like(p)])
+        return 1.0 + (count - 1) * increment
+
+    def update(self, values):
+        """Add a field.
+
+        Parameters
+        ----------
+        values : 2-d array-like
+            Values with vertices as rows.
+        """
+        x = to_numpy(values).reshape(self._mean.shape)
+        self.count += 1
+        delta = x - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (x - self._mean)
+        np.minimum(self._min, x, out=self._min)
+        np.maximum(self._max, x, out=self._max)
+        if len(self._quantile_levels) > 0:
+            self._update_quantile(x)
+
+    def update_sample(self, values):
+        """Add a sample of fields.
+
+        Parameters
+        ----------
+        values : :class:`openturns.ProcessSample` or 3-d array-like
+            Values indexed by field, vertex and component.
+        """
+        if isinstance(values, ot.ProcessSample):
+            values = [np.asarray(values[i]) for i in range(values.getSize())]
+        for x in values:
+            self.update(x)
+
+    def _update_quantile(self, x):
+        """Update the P² markers with a new observation."""
+        if self.count <= 5:
+            self._initial[self.count - 1] = x
+            if self.count == 5:
+                self._height[:] = np.sort(self._initial, axis=0)[..., np.newaxis]
+                self._position[:] = np.arange(1.0, 6.0).reshape((5,) + (1,) * (self._position.ndim - 1))
+            return
+
+        q = self._height
+        n = self._position
+        x = np.broadcast_to(x[..., np.newaxis], q.shape[1:])
+        np.minimum(q[0], x, out=q[0])
+        np.maximum(q[4], x, out=q[4])
+        # cell of the observation, increment the positions of the markers above
+        k = (x >= q[1]).astype(int) + (x >= q[2]) + (x >= q[3])
+        for i in range(1, 5):
+            n[i] += i > k
+
+        desired = self._desired_position(self.count)
+        for i in range(1, 4):
+            d = desired[i] - n[i]
+            move = ((d >= 1.0) & (n[i + 1] - n[i] > 1.0)) | ((d <= -1.0) & (n[i - 1] - n[i] < -1.0))
+            if not np.any(move):
+                continue
+            s = np.where(move, np.sign(d), 0.0)
+            # piecewise parabolic prediction, linear if not monotone
+            parabolic = q[i] + s / (n[i + 1] - n[i - 1]) * (
+                (n[i] - n[i - 1] + s) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                + (n[i + 1] - n[i] - s) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+            )
+            neighbour_height = np.where(s > 0.0, q[i + 1], q[i - 1])
+            neighbour_position = np.where(s > 0.0, n[i + 1], n[i - 1])
+            linear = q[i] + s * (neighbour_height - q[i]) / np.where(move, neighbour_position - n[i], 1.0)
+            height = np.where((q[i - 1] < parabolic) & (parabolic < q[i + 1]), parabolic, linear)
+            q[i] = np.where(move, height, q[i])
+            n[i] += s
+
+    def merge(self, other):
+        """Add the fields of another accumulator.
+
+        Parameters
+        ----------
+        other : :class:`FieldStatistics`
+            Accumulator with the same mesh, dimension and quantile levels.
+        """
+        if other._mean.shape != self._mean.shape or not np.array_equal(other._quantile_levels, self._quantile_levels):
+            raise ValueError("Cannot merge statistics of different shapes or quantile levels")
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.__dict__.update({key: np.copy(value) if isinstance(value, np.ndarray) else value
+                                  for key, value in other.__dict__.items()})
+            return
+        # replay the first observations, which are stored as is for the quantiles
+        if len(self._quantile_levels) > 0 and (other.count < 5 or self.count < 5):
+            source, target = (other, self) if other.count < 5 else (self, other)
+            merged = FieldStatistics(self._mesh, self._mean.shape[1], self._quantile_levels)
+            merged.merge(target)
+            for x in source._initial[:source.count]:
+                merged.update(x)
+            self.__dict__.update(merged.__dict__)
+            return
+
+        count = self.count + other.count
+        delta = other._mean - self._mean
+        self._m2 += other._m2 + delta ** 2 * self.count * other.count / count
+        self._mean += delta * other.count / count
+        np.minimum(self._min, other._min, out=self._min)
+        np.maximum(self._max, other._max, out=self._max)
+        if len(self._quantile_levels) > 0:
+            self._merge_quantile(other, count)
+        self.count = count
+
+    def _merge_quantile(self, other, count):
+        """Merge the P² markers through the sum of their ranks."""
+        candidate = np.sort(np.concatenate((self._height, other._height)), axis=0)
+        rank = np.zeros_like(candidate)
+        for sketch in [self, other]:
+            q = sketch._height
+            r = _interpolate(candidate, q, sketch._position)
+            rank += np.where(candidate < q[0], 0.0, np.where(candidate > q[4], sketch.count, r))
+        desired = self._desired_position(count)
+        desired = np.broadcast_to(desired.reshape((5,) + (1,) * (rank.ndim - 2) + (-1,)), self._height.shape)
+        height = _interpolate(desired, rank, candidate)
+        height[0] = np.minimum(self._height[0], other._height[0])
+        height[4] = np.maximum(self._height[4], other._height[4])
+        position = np.round(desired)
+        for i in range(1, 5):
+            position[i] = np.maximum(position[i], position[i - 1] + 1.0)
+        position[4] = count
+        self._height = height
+        self._position = position
+
+    def _to_field(self, values):
+        return ot.Field(self._mesh, to_sample(values))
+
+    def get_mean(self):
+        """Get the mean field."""
+        return self._to_field(self._mean)
+
+    def get_variance(self):
+        """Get the unbiased variance field."""
+        return self._to_field(self._m2 / max(self.count - 1, 1))
+
+    def get_min(self):
+        """Get the minimum field."""
+        return self._to_field(self._min)
+
+    def get_max(self):
+        """Get the maximum field."""
+        return self._to_field(self._max)
+
+    def get_quantile(self, level):
+        """Get a quantile field.
+
+        Parameters
+        ----------
+        level : float
+            One of the quantile levels of the accumulator.
+        """
+        matching = np.flatnonzero(np.isclose(self._quantile_levels, level))
+        if len(matching) == 0:
+            raise ValueError(f"The quantile of level {level} is not estimated")
+        if self.count < 5:
+            return self._to_field(np.quantile(self._initial[:self.count], level, axis=0))
+        return self._to_field(self._height[2, ..., matching[0]])
+
+
+class IncrementalPOD:
+    """Proper orthogonal decomposition of a sample of fields, updated by blocks.
+
+    The centered fields are decomposed on a truncated basis of modes,
+    updated with the incremental SVD of Brand extended to a moving mean
+    (Ross et al.): each block of fields is decomposed on its own, then
+    merged with the current decomposition through the SVD of a small
+    matrix. Only the modes, the singular values and the modal coefficients
+    of each field are stored, so that the memory usage grows with the
+    number of modes rather than with the number of vertices.
+    The inner product is the Euclidean product of the values at the vertices.
+
+    Parameters
+    ----------
+    mesh : :class:`openturns.Mesh`
+        Mesh of the fields.
+
+    dimension : int
+        Dimension of the values of the fields.
+
+    n_modes : int
+        Maximum number of modes.
+
+    threshold : float, default=0.0
+        Modes whose singular value is below threshold times the largest one
+        are discarded.
+
+    block_size : int, default=100
+        Number of fields added with :meth:`update` before updating the
+        decomposition.
+    """
+
+    def __init__(self, mesh, dimension, n_modes, threshold=0.0, block_size=100):
+        self._mesh = mesh
+        self._dimension = dimension
+        self._n_modes = n_modes
+        self._threshold = threshold
+        self._block_size = block_size
+        self._shape = (mesh.getVerticesNumber(), dimension)
+        n_values = self._shape[0] * dimension
+        self.count = 0
+        self._mean = np.zeros(n_values)
+        self._basis = np.zeros((n_values, 0))
+        self._singular_values = np.zeros(0)
+        self._coefficients = np.zeros((0, 0))
+        self._pending = []
+
+    def update(self, values):
+        """Add a field.
+
+        Parameters
+        ----------
+        values : 2-d array-like
+            Values with vertices as rows.
+        """
+        self._pending.append(to_numpy(values).ravel())
+        if len(self._pending) >= self._block_size:
+            self._flush()
+
+    def update_sample(self, values):
+        """Add a sample of fields.
+
+        Parameters
+        ----------
+        values : :class:`openturns.ProcessSample` or 3-d array-like
+            Values indexed by field, vertex and component.
+        """
+        if isinstance(values, ot.ProcessSample):
+            values = [np.asarray(values[i]) for i in range(values.getSize())]
+        for x in values:
+            self.update(x)
+
+    def _flush(self):
+        """Merge the pending fields into the decomposition."""
+        if len(self._pending) == 0:
+            return
+        block = np.array(self._pending)
+        self._pending = []
+        other = IncrementalPOD(self._mesh, self._dimension, self._n_modes, self._threshold, self._block_size)
+        other.count = len(block)
+        other._mean = block.mean(axis=0)
+        centered = block - other._mean
+        left, singular_values, right = np.linalg.svd(centered, full_matrices=False)
+        rank = other._truncate(singular_values)
+        other._basis = right[:rank].T
+        other._singular_values = singular_values[:rank]
+        other._coefficients = left[:, :rank] * singular_values[:rank]
+        self._merge(other)
+
+    def _truncate(self, singular_values):
+        """Number of modes kept among decreasing singular values."""
+        if len(singular_values) == 0:
+            return 0
+        tolerance = max(self._threshold, 1e-12) * singular_values[0]
+        return min(self._n_modes, int(np.sum(singular_values > tolerance)))
+
+    def merge(self, other):
+        """Add the fields of another decomposition.
+
+        The coefficients of the fields of other are appended to those of this
+        decomposition.
+
+        Parameters
+        ----------
+        other : :class:`IncrementalPOD`
+            Decomposition with the same mesh and dimension.
+        """
+        if other._shape != self._shape:
+            raise ValueError("Cannot merge decompositions of different shapes")
+        other._flush()
+        self._flush()
+        self._merge(other)
+
+    def _merge(self, other):
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count = other.count
+            self._mean = np.copy(other._mean)
+            self._basis = np.copy(other._basis)
+            self._singular_values = np.copy(other._singular_values)
+            self._coefficients = np.copy(other._coefficients)
+            return
+
+        count = self.count + other.count
+        mean = (self.count * self._mean + other.count * other._mean) / count
+        # the other fields, and the shift of the mean between both samples
+        shift = np.sqrt(self.count * other.count / count) * (other._mean - self._mean)
+        new = np.column_stack((other._basis * other._singular_values, shift))
+        projection = self._basis.T @ new
+        orthogonal, triangular = np.linalg.qr(new - self._basis @ projection)
+        k = len(self._singular_values)
+        middle = np.zeros((k + len(triangular), k + new.shape[1]))
+        middle[:k, :k] = np.diag(self._singular_values)
+        middle[:k, k:] = projection
+        middle[k:, k:] = triangular
+        left, singular_values, _ = np.linalg.svd(middle, full_matrices=False)
+        rank = self._truncate(singular_values)
+        basis = np.column_stack((self._basis, orthogonal)) @ left[:, :rank]
+
+        # express the coefficients of both samples in the new basis
+        self._coefficients = np.vstack((
+            self._coefficients @ (self._basis.T @ basis) - (mean - self._mean) @ basis,
+            other._coefficients @ (other._basis.T @ basis) - (mean - other._mean) @ basis,
+        ))
+        self._basis = basis
+        self._singular_values = singular_values[:rank]
+        self._mean = mean
+        self.count = count
+
+    def get_mean(self):
+        """Get the mean field."""
+        self._flush()
+        return ot.Field(self._mesh, to_sample(self._mean.reshape(self._shape)))
+
+    def get_modes(self):
+        """Get the orthonormal modes.
+
+        Returns
+        -------
+        modes : :class:`openturns.ProcessSample`
+            Modes, by decreasing singular value.
+        """
+        self._flush()
+        return to_process_sample(self._mesh, self._basis.T.reshape((-1,) + self._shape))
+
+    def get_singular_values(self):
+        """Get the singular values of the centered sample."""
+        self._flush()
+        return ot.Point(self._singular_values)
+
+    def get_eigenvalues(self):
+        """Get the eigenvalues of the empirical covariance."""
+        self._flush()
+        return ot.Point(self._singular_values ** 2 / max(self.count - 1, 1))
+
+    def get_coefficients(self):
+        """Get the modal coefficients of the fields.
+
+        Returns
+        -------
+        coefficients : :class:`openturns.Sample`
+            Coefficients of each field, in the order they were added.
+        """
+        self._flush()
+        return to_sample(self._coefficients)
+
+    def reconstruct(self, coefficients):
+        """Build fields from modal coefficients.
+
+        Parameters
+        ----------
+        coefficients : 2-d array-like
+            Modal coefficients, one row per field.
+
+        Returns
+        -------
+        fields : :class:`openturns.ProcessSample`
+            Reconstructed fields.
+        """
+        self._flush()
+        values = self._mean + np.atleast_2d(to_numpy(coefficients)) @ self._basis.T
+        return to_process_sample(self._mesh, values.reshape((-1,) + self._shape))
+
+
+class FieldSobolIndices:
+    """Per-vertex Sobol' indices of fields, updated from pick-freeze evaluations.
+
+    The fields are evaluated on the points of a design generated by
+    :class:`openturns.SobolIndicesExperiment`: for each row k, the points
+    :math:`A_k`, :math:`B_k`, and :math:`E^i_k` (:math:`A_k` with its i-th
+    component taken from :math:`B_k`). Only the sums involved in the
+    estimators are kept, per vertex and component, so that the memory usage
+    is proportional to the number of vertices times the input dimension
+    whatever the sample size. The first order indices are estimated as in
+    :class:`openturns.SaltelliSensitivityAlgorithm`, and the total order
+    indices as in :class:`openturns.JansenSensitivityAlgorithm`. Accumulators
+    filled with separate designs are combined with :meth:`merge`.
+
+    Parameters
+    ----------
+    mesh : :class:`openturns.Mesh`
+        Mesh of the fields.
+
+    dimension : int
+        Dimension of the values of the fields.
+
+    input_dimension : int
+        Dimension of the input vector.
+    """
+
+    def __init__(self, mesh, dimension, input_dimension):
+        self._mesh = mesh
+        self._input_dimension = input_dimension
+        shape = (mesh.getVerticesNumber(), dimension)
+        self._shape = shape
+        self.count = 0
+        # the sums are taken on values shifted by the first values for accuracy
+        self._shift = None
+        self._sum_a = np.zeros(shape)
+        self._sum_b = np.zeros(shape)
+        self._sum_aa = np.zeros(shape)
+        self._sum_e = np.zeros((input_dimension,) + shape)
+        self._sum_be = np.zeros((input_dimension,) + shape)
+        self._sum_ea2 = np.zeros((input_dimension,) + shape)
+
+    def update(self, values):
+        """Add the fields of a pick-freeze row.
+
+        Parameters
+        ----------
+        values : 3-d array-like
+            Fields at :math:`A_k`, :math:`B_k`, :math:`E^1_k`, ...,
+            :math:`E^d_k`, indexed by field, vertex and component.
+        """
+        self._update(np.asarray([to_numpy(x) for x in values]).reshape((-1, 1) + self._shape))
+
+    def update_sample(self, values, size):
+        """Add the fields of a whole pick-freeze design.
+
+        Parameters
+        ----------
+        values : :class:`openturns.ProcessSample` or 3-d array-like
+            Fields at the points of a design generated by
+            :class:`openturns.SobolIndicesExperiment`, without second order.
+
+        size : int
+            Size N of the design (number of rows).
+        """
+        if isinstance(values, ot.ProcessSample):
+            values = [np.asarray(values[i]) for i in range(values.getSize())]
+        values = np.asarray(values, dtype=float)
+        if len(values) != size * (self._input_dimension + 2):
+            raise ValueError(f"Expected {size * (self._input_dimension + 2)} fields, got {len(values)}")
+        self._update(values.reshape((self._input_dimension + 2, size) + self._shape))
+
+    def _update(self, values):
+        """Add blocks of fields indexed by design block, row, vertex and component."""
+        if self._shift is None:
+            self._shift = np.copy(values[0, 0])
+        values = values - self._shift
+        a, b, e = values[0], values[1], values[2:]
+        self.count += a.shape[0]
+        self._sum_a += a.sum(axis=0)
+        self._sum_b += b.sum(axis=0)
+        self._sum_aa += (a ** 2).sum(axis=0)
+        self._sum_e += e.sum(axis=1)
+        self._sum_be += (b * e).sum(axis=1)
+        self._sum_ea2 += ((e - a) ** 2).sum(axis=1)
+
+    def _set_shift(self, shift):
+        """Express the sums with respect to another shift."""
+        delta = self._shift - shift
+        n = self.count
+        self._sum_aa += 2.0 * delta * self._sum_a + n * delta ** 2
+        self._sum_be += delta * (self._sum_b + self._sum_e) + n * delta ** 2
+        self._sum_a += n * delta
+        self._sum_b += n * delta
+        self._sum_e += n * delta
+        self._shift = shift
+
+    def merge(self, other):
+        """Add the fields of another accumulator.
+
+        Parameters
+        ----------
+        other : :class:`FieldSobolIndices`
+            Accumulator with the same mesh, dimension and input dimension.
+        """
+        if other._sum_e.shape != self._sum_e.shape:
+            raise ValueError("Cannot merge indices of different shapes")
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.__dict__.update({key: np.copy(value) if isinstance(value, np.ndarray) else value
+                                  for key, value in other.__dict__.items()})
+            return
+        if not np.array_equal(other._shift, self._shift):
+            other = copy.deepcopy(other)
+            other._set_shift(self._shift)
+        self.count += other.count
+        for name in ["_sum_a", "_sum_b", "_sum_aa", "_sum_e", "_sum_be", "_sum_ea2"]:
+            getattr(self, name)[...] += getattr(other, name)
+
+    def _get_variance(self):
+        n = self.count
+        if n < 2:
+            raise ValueError("At least 2 rows are needed to estimate the indices")
+        return (self._sum_aa - self._sum_a ** 2 / n) / (n - 1)
+
+    def get_first_order_indices(self, output=0):
+        """Get the first order indices at each vertex.
+
+        Parameters
+        ----------
+        output : int, default=0
+            Index of the component of the fields.
+
+        Returns
+        -------
+        indices : :class:`openturns.Field`
+            Indices of each input at each vertex.
+        """
+        n = self.count
+        variance = self._get_variance()
+        # center with the mean of the whole design
+        mean = (self._sum_a + self._sum_b + self._sum_e.sum(axis=0)) / (n * (self._input_dimension + 2))
+        centered_be = self._sum_be - mean * (self._sum_b + self._sum_e) + n * mean ** 2
+        numerator = centered_be / (n - 1) - (self._sum_a / n - mean) * (self._sum_b / n - mean)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            indices = numerator / variance
+        return ot.Field(self._mesh, to_sample(indices[..., output].T))
+
+    def get_total_order_indices(self, output=0):
+        """Get the total order indices at each vertex.
+
+        Parameters
+        ----------
+        output : int, default=0
+            Index of the component of the fields.
+
+        Returns
+        -------
+        indices : :class:`openturns.Field`
+            Indices of each input at each vertex.
+        """
+        variance = self._get_variance()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            total = self._sum_ea2 / (2.0 * self.count - 1.0) / variance
+        return ot.Field(self._mesh, to_sample(total[..., output].T))
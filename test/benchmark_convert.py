@@ -0,0 +1,17 @@
+#!/usr/bin/env python
+
+"""Compare the conversion of trajectories with the Sample constructor."""
+
+import numpy as np
+import openturns as ot
+import otfmi.convert
+import timeit
+
+for size in [500, 100000]:
+    values = np.random.default_rng(0).normal(size=(size, 3))
+    number = max(1, 100000 // size)
+    reference = timeit.timeit(lambda: ot.Sample(values), number=number) / number
+    elapsed = timeit.timeit(lambda: otfmi.convert.to_sample(values), number=number) / number
+    buffer = timeit.timeit(lambda: otfmi.convert.to_sample(values, buffer_copy=True), number=number) / number
+    print(f"size={size} Sample(array): {reference * 1e6:.1f}us to_sample: {elapsed * 1e6:.1f}us"
+          f" to_sample(buffer_copy=True): {buffer * 1e6:.1f}us")
@@ -0,0 +1,9 @@
+#!/usr/bin/env python
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep the build cache of the exports out of the user cache directory."""
+    monkeypatch.setenv("OTFMI_CACHE_DIR", str(tmp_path / "cache"))
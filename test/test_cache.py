@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+import openturns as ot
+import otfmi.cache
+import otfmi.function_exporter
+import os
+from pathlib import Path
+import shutil
+import pytest
+
+
+def test_store_lookup(tmp_path, monkeypatch):
+    monkeypatch.setenv("OTFMI_CACHE_DIR", str(tmp_path / "cache"))
+    assert otfmi.cache.get_cache_dir() == tmp_path / "cache"
+    key = otfmi.cache.compute_key("cwrapper", b"source", "cxx")
+    assert key != otfmi.cache.compute_key("cwrapper", b"sourcecxx")
+    assert otfmi.cache.lookup(key, tmp_path) is None
+
+    artifact = tmp_path / "libcwrapper.a"
+    artifact.write_bytes(b"library")
+    otfmi.cache.store(key, [artifact])
+    destination = tmp_path / "destination"
+    destination.mkdir()
+    assert otfmi.cache.lookup(key, destination) == ["libcwrapper.a"]
+    assert (destination / "libcwrapper.a").read_bytes() == b"library"
+
+    otfmi.cache.clear()
+    assert otfmi.cache.lookup(key, destination) is None
+
+
+@pytest.mark.skipif(shutil.which("cmake") is None, reason="requires cmake")
+def test_export_model(tmp_path, monkeypatch):
+    monkeypatch.setenv("OTFMI_CACHE_DIR", str(tmp_path / "cache"))
+    builds = []
+    build_cwrapper = otfmi.function_exporter.FunctionExporter._build_cwrapper
+
+    def record_build(self, *args, **kwargs):
+        builds.append(self)
+        return build_cwrapper(self, *args, **kwargs)
+
+    monkeypatch.setattr(otfmi.function_exporter.FunctionExporter, "_build_cwrapper", record_build)
+    f = ot.SymbolicFunction(["E", "F", "L", "I"], ["(F*L^3)/(3.0*E*I)"])
+    for i in range(2):
+        otfmi.FunctionExporter(f).export_model(tmp_path / f"Deviation{i}.mo", mode="pyprocess")
+        assert len(list(Path(tmp_path).glob("*cwrapper*"))) > 0
+    # the second export reuses the cached libraries without running cmake
+    assert len(builds) == 1
+    assert len(list((tmp_path / "cache").glob("*/*"))) == 1
+
+    # another function is built again
+    g = ot.SymbolicFunction(["E", "F", "L", "I"], ["(F*L^3)/(2.0*E*I)"])
+    otfmi.FunctionExporter(g).export_model(tmp_path / "Deviation2.mo", mode="pyprocess")
+    assert len(builds) == 2
+    assert len(list((tmp_path / "cache").glob("*/*"))) == 2
+
+
+def test_prune(tmp_path, monkeypatch):
+    artifact = tmp_path / "libcwrapper.a"
+    artifact.write_bytes(b"x" * 100)
+    keys = [otfmi.cache.compute_key("cwrapper", str(i)) for i in range(3)]
+    for i, key in enumerate(keys):
+        otfmi.cache.store(key, [artifact])
+        os.utime(otfmi.cache.get_cache_dir() / key[:2] / key, (i, i))
+    # the first entry is used last
+    assert otfmi.cache.lookup(keys[0], tmp_path) == ["libcwrapper.a"]
+    otfmi.cache.prune(200)
+    assert otfmi.cache.lookup(keys[1], tmp_path) is None
+    assert otfmi.cache.lookup(keys[0], tmp_path) is not None
+    assert otfmi.cache.lookup(keys[2], tmp_path) is not None
+
+    # beyond the maximum size, storing removes the least recently used entries
+    for key in [keys[0], keys[2]]:
+        os.utime(otfmi.cache.get_cache_dir() / key[:2] / key, (10, 10))
+    monkeypatch.setenv("OTFMI_CACHE_MAX_SIZE", "150")
+    key = otfmi.cache.compute_key("cwrapper", "new")
+    otfmi.cache.store(key, [artifact])
+    assert [entry.name for entry in otfmi.cache.get_cache_dir().glob("*/*")] == [key]
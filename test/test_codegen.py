@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+import concurrent.futures
+import ctypes
+import openturns as ot
+import openturns.testing as ott
+import otfmi
+import otfmi.codegen
+import pytest
+import shutil
+import subprocess
+import sys
+
+pytestmark = pytest.mark.skipif(sys.platform.startswith("win") or shutil.which("cc") is None, reason="N/A")
+
+
+def build(function, path):
+    """Compile the generated code of a function and return its C evaluation."""
+    code = otfmi.codegen.generate(function)
+    code += "\nvoid c_func(const double *x, double *y)\n{\n  otfmi_evaluate(x, y);\n}\n"
+    (path / "function.c").write_text(code)
+    subprocess.run(["cc", "-shared", "-fPIC", "-o", str(path / "libfunction.so"), str(path / "function.c"), "-lm"],
+                   check=True)
+    lib = ctypes.CDLL(str(path / "libfunction.so"))
+
+    def evaluate(x):
+        y = (ctypes.c_double * model.getOutputDimension())()
+        lib.c_func((ctypes.c_double * len(x))(*x), y)
+        return list(y)
+
+    model = function.getMetaModel() if isinstance(function, ot.FunctionalChaosResult) else function
+    return evaluate, model
+
+
+def check(function, sample, path, rtol=1e-12):
+    evaluate, model = build(function, path)
+    for x in sample:
+        ott.assert_almost_equal(evaluate(x), model(x), rtol, 1e-12)
+
+
+def test_symbolic(tmp_path):
+    formulas = [
+        "2^3^2*x-y", "-x^2 + y^-1", "sin(x)*cos(y)+exp(-abs(x))", "min(x,y,0.5)+max(x,1)",
+        "x < y ? x : y", "if(x>0, ln(1+x*x), sqrt(y^2))", "atan2(y, x) + sign(x)*pi_ + e_",
+        "sum(x,y,1)+avg(x,y)", "3 % 2 + x % 1.5", "1e-1*x + .5 * y", "(x >= 0) and (y < 1)",
+        "floor(x)+ceil(y)+round(x)+trunc(y)+frac(x)", "erf(x)+cbrt(y)",
+    ]
+    ot.RandomGenerator.SetSeed(0)
+    check(ot.SymbolicFunction(["x", "y"], formulas), ot.Normal(2).getSample(20), tmp_path)
+
+
+def test_combination(tmp_path):
+    f = ot.SymbolicFunction(["x", "y"], ["x*y", "x+y"])
+    g = ot.LinearCombinationFunction([f, ot.SymbolicFunction(["a", "b"], ["a", "b^2"])], [2.0, -1.0])
+    linear = ot.LinearFunction([1.0, 2.0], [0.5, 1.0], ot.Matrix([[1.0, 3.0], [2.0, -1.0]]))
+    ot.RandomGenerator.SetSeed(0)
+    check(ot.ComposedFunction(g, linear), ot.Normal(2).getSample(20), tmp_path)
+
+
+def test_chaos(tmp_path):
+    distribution = ot.JointDistribution([ot.Uniform(-1.0, 3.0), ot.Normal(2.0, 0.5), ot.Uniform(0.0, 1.0)])
+    ot.RandomGenerator.SetSeed(0)
+    x = distribution.getSample(300)
+    y = ot.SymbolicFunction(["x", "y", "z"], ["x*y+sin(x)+z^3", "y*z"])(x)
+    algo = ot.LeastSquaresExpansion(x, y, distribution)
+    algo.run()
+    check(algo.getResult(), distribution.getSample(20), tmp_path, 1e-10)
+
+
+def test_unsupported():
+    for function in [ot.PythonFunction(1, 1, lambda x: x), ot.SymbolicFunction(["x"], ["besselJ0(x)"])]:
+        with pytest.raises(TypeError):
+            otfmi.codegen.generate(function)
+
+
+def test_export_model(tmp_path):
+    f = ot.SymbolicFunction(["E", "F", "L", "I"], ["(F*L^3)/(3.0*E*I)"])
+    otfmi.FunctionExporter(f).export_model(tmp_path / "Deviation.mo", binary=False, mode="native")
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["CMakeLists.txt", "Deviation.mo", "wrapper.c"]
+    subprocess.run(["cc", "-Wall", "-Werror", "-shared", "-fPIC", "wrapper.c", "-o", "libcwrapper.so", "-lm"],
+                   cwd=tmp_path, check=True)
+    lib = ctypes.CDLL(str(tmp_path / "libcwrapper.so"))
+    lib.otfmi_context_new.restype = ctypes.c_void_p
+    lib.otfmi_context_free.argtypes = [ctypes.c_void_p]
+    array_type = ctypes.POINTER(ctypes.c_double)
+    lib.otfmi_context_evaluate.argtypes = [ctypes.c_void_p, ctypes.c_int, array_type, ctypes.c_int, array_type]
+
+    # instances evaluated in parallel threads
+    def simulate(i):
+        context = lib.otfmi_context_new()
+        x = (ctypes.c_double * 4)(3.1e7, 3.1e4 + i, 255.0, 420.0)
+        y = (ctypes.c_double * 1)()
+        for j in range(100):
+            x[2] = 250.0 + j % 10
+            lib.otfmi_context_evaluate(context, 4, x, 1, y)
+            ott.assert_almost_equal(list(y), f(list(x)), 1e-12, 0.0)
+        lib.otfmi_context_free(context)
+
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        list(executor.map(simulate, range(8)))
+    hits, misses, cache_size = ctypes.c_ulonglong(), ctypes.c_ulonglong(), ctypes.c_int()
+    lib.otfmi_cache_statistics(ctypes.byref(hits), ctypes.byref(misses), ctypes.byref(cache_size))
+    assert (hits.value, misses.value, cache_size.value) == (0, 800, 1)
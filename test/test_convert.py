@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+import openturns as ot
+import openturns.testing as ott
+import otfmi.convert
+import numpy as np
+import pickle
+import pytest
+
+
+@pytest.mark.parametrize("buffer_copy", [False, True])
+@pytest.mark.parametrize("shape", [(0, 2), (1, 1), (3, 2), (500, 3), (100000, 3)])
+def test_to_sample(shape, buffer_copy):
+    values = np.random.default_rng(0).normal(size=shape)
+    sample = otfmi.convert.to_sample(values, buffer_copy)
+    assert isinstance(sample, ot.Sample)
+    assert (sample.getSize(), sample.getDimension()) == shape
+    np.testing.assert_array_equal(np.asarray(sample), values)
+    if shape[0] > 0:
+        ott.assert_almost_equal(sample[shape[0] - 1], values[-1], 0.0, 0.0)
+    # non contiguous input
+    sample = otfmi.convert.to_sample(np.asfortranarray(values)[::-1], buffer_copy)
+    np.testing.assert_array_equal(np.asarray(sample), values[::-1])
+
+
+def test_writable_view():
+    # the buffer copy is used with this OpenTURNS version, checked through the Sample API
+    assert otfmi.convert._has_writable_view()
+
+
+def test_to_numpy():
+    sample = ot.Normal(3).getSample(10)
+    array = otfmi.convert.to_numpy(sample)
+    np.testing.assert_array_equal(array, sample)
+    point = ot.Point([1.0, 2.0])
+    np.testing.assert_array_equal(otfmi.convert.to_numpy(point), [1.0, 2.0])
+
+
+def test_process_sample():
+    mesh = ot.RegularGrid(0.0, 0.1, 20)
+    values = np.random.default_rng(0).normal(size=(5, 20, 2))
+    process_sample = otfmi.convert.to_process_sample(mesh, values)
+    assert process_sample.getSize() == 5
+    ott.assert_almost_equal(process_sample[3], ot.Sample(values[3]))
+    np.testing.assert_array_equal(otfmi.convert.process_sample_to_numpy(process_sample), values)
+
+
+@pytest.mark.parametrize("precision,tolerance", [("float64", 0.0), ("float32", 1e-6), ("int16", 2e-5)])
+def test_compact_array(precision, tolerance):
+    values = np.random.default_rng(0).normal(size=(1000, 3)) * [1.0, 1e3, 0.0] + [0.0, 1e5, 2.0]
+    compact = otfmi.convert.CompactArray(values, precision)
+    assert compact.nbytes == values.nbytes * np.dtype(precision).itemsize // 8
+    restored = pickle.loads(pickle.dumps(compact)).to_numpy()
+    assert restored.dtype == np.float64
+    error = np.abs(restored - values) / np.maximum(np.abs(values), np.ptp(values, axis=0))
+    assert np.all(error <= tolerance)
+    np.testing.assert_array_equal(np.asarray(compact.to_sample()), restored)
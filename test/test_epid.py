@@ -3,6 +3,7 @@
 import otfmi
 import otfmi.example.deviation
 import otfmi.example.utility
+import numpy as np
 import pyfmi
 import pytest
 
@@ -73,3 +74,56 @@ def test_keyword(path_fmu):
     )
     with pytest.raises(Warning):
         lowlevel_model_fmu._exec(input_value, final_time=50.0)
+
+
+@pytest.mark.parametrize("options", [dict(), dict(final=True), dict(size=3, decimation=7)])
+def test_result_handler(path_fmu, options):
+    """Check the array result handler against pyfmi's memory handler."""
+    model = otfmi.fmi.load_fmu(path_fmu)
+    handler = otfmi.fmi.ArrayResultHandler(model, ["infected", "removed"], **options)
+    result = otfmi.fmi.simulate(model, options={"result_handling": "custom", "result_handler": handler})
+    reference = otfmi.fmi.simulate(model, options={"result_handling": "memory"})
+    time, values = otfmi.fmi.strip_simulation(result, ["removed", "infected"], final="trajectory")
+    assert time[-1] == reference["time"][-1]
+    assert abs(values[-1, 1] - reference.final("infected")) < 1e-12
+    assert abs(values[-1, 0] - reference.final("removed")) < 1e-12
+    if "final" not in options:
+        assert abs(values[0, 1] - reference["infected"][0]) < 1e-12
+
+
+@pytest.mark.parametrize("n_cpus", [1, 2])
+def test_simulate_trajectory(path_fmu, n_cpus):
+    """Simulate a sample of trajectories and compare with single simulations."""
+    value_input = [input_value, [1.5, 0.3], [2.5, 0.7]]
+    time, values = otfmi.fmi.simulate_trajectory(
+        path_fmu, value_input, 0.5, list_input=["infection_rate", "healing_rate"],
+        list_output=["infected", "removed"], final_time=final_time, n_cpus=n_cpus
+    )
+    np.testing.assert_allclose(time, np.linspace(0.0, final_time, 11))
+    assert values.shape == (3, 11, 2)
+    model = otfmi.fmi.load_fmu(path_fmu)
+    model.set(["infection_rate", "healing_rate"], input_value)
+    reference = model.simulate(final_time=final_time, options={"ncp": 10, "silent_mode": True})
+    np.testing.assert_allclose(values[0, :, 0], reference["infected"], rtol=1e-6)
+    np.testing.assert_allclose(values[0, :, 1], reference["removed"], rtol=1e-6)
+
+
+def test_interpolate_trajectory():
+    """Check the batched interpolation against np.interp."""
+    rng = np.random.default_rng(0)
+    time_interpolate = np.linspace(-0.1, 1.1, 17)
+    time = np.sort(rng.uniform(size=20))
+    trajectory = rng.normal(size=(4, 20, 3))
+    reference = [[np.interp(time_interpolate, time, y) for y in yy.T] for yy in trajectory]
+    reference = np.transpose(reference, (0, 2, 1))
+    np.testing.assert_allclose(otfmi.fmi.interpolate_trajectory(time, trajectory, time_interpolate), reference)
+    # one time grid per trajectory
+    list_time = [np.sort(rng.uniform(size=10 + k)) for k in range(4)]
+    list_trajectory = [rng.normal(size=(10 + k, 3)) for k in range(4)]
+    values = otfmi.fmi.interpolate_trajectory(list_time, list_trajectory, time_interpolate)
+    for k in range(4):
+        for j in range(3):
+            np.testing.assert_allclose(values[k, :, j], np.interp(time_interpolate, list_time[k], list_trajectory[k][:, j]))
+    list_output = list(zip(list_time, list_trajectory))
+    _, dict_trajectory = otfmi.fmi.format_sample_trajectory(["a", "b", "c"], list_output, time_interpolate)
+    np.testing.assert_array_equal(dict_trajectory["b"], values[:, :, 1].T)
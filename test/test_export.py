@@ -2,17 +2,21 @@
 
 import glob
 import openturns as ot
+import openturns.testing as ott
 import otfmi
 import os
 import tempfile
 import sys
 import psutil
 import shutil
+import struct
 import subprocess
 import time
 import pytest
 from pathlib import Path
 import importlib
+import ctypes
+import concurrent.futures
 
 
 @pytest.mark.parametrize("mode", ["pyprocess", "pythonfmu"])
@@ -82,8 +86,11 @@ def test_export_fmu_vector(mode, fmuType):
 
 
 @pytest.mark.skipif(sys.platform.startswith("win"), reason="N/A")
+@pytest.mark.parametrize("mode", ["pythonfmu", "cxx"])
 @pytest.mark.parametrize("fmuType", ["cs", "me"])
-def test_export_fmu_field(fmuType, mode="pythonfmu"):
+def test_export_fmu_field(fmuType, mode):
+    if mode == "pythonfmu" and importlib.util.find_spec("pythonfmu") is None:
+        return
 
     N = 100
     start = 0.0
@@ -111,7 +118,14 @@ def test_export_fmu_field(fmuType, mode="pythonfmu"):
         # requires LD_PRELOAD for pythonfmu
         subprocess.run(["OMSimulator", str(path_fmu)], capture_output=True, check=True)
 
-    if importlib.util.find_spec("fmpy") is not None:
+    if mode == "cxx":
+        # reimport fmu, the outputs are interpolated at the simulation time
+        model_fmu = otfmi.FMUPointToFieldFunction(path_fmu, mesh, inputs_fmu=["a", "b"], outputs_fmu=["y0"],
+                                                  final_time=mesh.getEnd())
+        x = [3.0, 2.0]
+        ott.assert_almost_equal(model_fmu(x), f(x), 1e-5, 1e-5)
+
+    elif importlib.util.find_spec("fmpy") is not None:
         import fmpy
         summary = fmpy.dump(path_fmu)
         print(summary)
@@ -157,6 +171,145 @@ def test_export_model(mode, binary):
     shutil.rmtree(temp_path)
 
 
+def test_export_model_field():
+    mesh = ot.RegularGrid(0.0, 0.1, 20)
+    g = ot.SymbolicFunction(["t", "a", "b"], ["a*sin(t)+b"])
+    f = ot.VertexValuePointToFieldFunction(g, mesh)
+    temp_path = Path(tempfile.mkdtemp())
+    fe = otfmi.FunctionExporter(f, [4.0, 5.0])
+    for mode in ["pyprocess", "cpython"]:
+        with pytest.raises(TypeError):
+            fe.export_model(temp_path / "Sin.mo", binary=False, mode=mode)
+    fe.export_model(temp_path / "Sin.mo", binary=False, mode="cxx")
+    assert "ExternalFunc(context, { a, b }, time)" in (temp_path / "Sin.mo").read_text()
+    assert "otfmi_context_field_evaluate" in (temp_path / "wrapper.cxx").read_text()
+    shutil.rmtree(temp_path)
+
+
+def test_blob_object(tmp_path):
+    """Check the COFF object embedding the function for MSVC."""
+    f = ot.SymbolicFunction(["E", "F", "L", "I"], ["(F*L^3)/(3.0*E*I)"])
+    otfmi.FunctionExporter(f).export_model(tmp_path / "Deviation.mo", binary=False, mode="cpython")
+    blob = (tmp_path / "function.xml.z").read_bytes()
+    data = (tmp_path / "function.xml.z.obj").read_bytes()
+    machine, sections, _, offset_symbols, symbols = struct.unpack_from("<HHIII", data)
+    assert (machine, sections, symbols) == (0x8664, 1, 2)
+    name, _, _, size, offset_data = struct.unpack_from("<8sIIII", data, 20)
+    assert name.rstrip(b"\0") == b".rdata"
+    assert data[offset_data:offset_data + size] == blob
+    offset_strings = offset_symbols + 18 * symbols
+    names = {}
+    for i in range(symbols):
+        _, offset, value, section = struct.unpack_from("<IIIh", data, offset_symbols + 18 * i)
+        assert section == 1
+        names[data[offset_strings + offset:].split(b"\0")[0].decode()] = value
+    wrapper = (tmp_path / "wrapper.c").read_text()
+    for name, value in names.items():
+        assert f"extern const unsigned char {name}[]" in wrapper
+        assert value == (len(blob) if name.startswith("otfmi_blob_end_") else 0)
+
+
+@pytest.mark.skipif(sys.platform.startswith("win") or shutil.which("cc") is None, reason="N/A")
+def test_pyprocess_worker():
+    """Drive the pyprocess wrapper as the instances of an fmu would."""
+    f = ot.SymbolicFunction(["E", "F", "L", "I"], ["(F*L^3)/(3.0*E*I)", "E+F"])
+    temp_path = Path(tempfile.mkdtemp())
+    fe = otfmi.FunctionExporter(f, [3e7, 3e4, 250.0, 400.0])
+    fe.export_model(temp_path / "Deviation.mo", binary=False, mode="pyprocess", cache_size=4)
+    assert "extends ExternalObject" in (temp_path / "Deviation.mo").read_text()
+    path_lib = temp_path / "libworker.so"
+    subprocess.run(["cc", "-shared", "-fPIC", "-pthread", "wrapper.c", "-o", str(path_lib)], cwd=temp_path, check=True)
+    lib = ctypes.CDLL(str(path_lib))
+    lib.otfmi_context_new.restype = ctypes.c_void_p
+    lib.otfmi_context_free.argtypes = [ctypes.c_void_p]
+    array_type = ctypes.POINTER(ctypes.c_double)
+    lib.otfmi_context_evaluate.argtypes = [ctypes.c_void_p, ctypes.c_int, array_type, ctypes.c_int, array_type]
+
+    # two instances, each with its own worker
+    workers = [lib.otfmi_context_new() for _ in range(2)]
+    x = (ctypes.c_double * 4)(3.1e7, 3.1e4, 255.0, 420.0)
+    y = (ctypes.c_double * 2)()
+    t0 = time.time()
+    size = 100
+    for i in range(size):
+        x[1] = 3.1e4 + i
+        lib.otfmi_context_evaluate(workers[i % 2], 4, x, 2, y)
+        ott.assert_almost_equal(list(y), f(list(x)))
+    t1 = time.time()
+    print("Speed=", size / (t1 - t0), "evals/s")
+
+    # least recently used cache of each instance
+    hits, misses, cache_size = ctypes.c_ulonglong(), ctypes.c_ulonglong(), ctypes.c_int()
+    for i in [96, 98, 90, 98]:
+        x[1] = 3.1e4 + i
+        lib.otfmi_context_evaluate(workers[0], 4, x, 2, y)
+        ott.assert_almost_equal(list(y), f(list(x)))
+    lib.otfmi_cache_statistics(ctypes.byref(hits), ctypes.byref(misses), ctypes.byref(cache_size))
+    assert (hits.value, misses.value, cache_size.value) == (3, size + 1, 4)
+
+    # instances started and evaluated in parallel threads
+    def simulate(i):
+        worker = lib.otfmi_context_new()
+        x = (ctypes.c_double * 4)(3.1e7, 3.1e4 + i, 255.0, 420.0)
+        y = (ctypes.c_double * 2)()
+        for j in range(20):
+            x[2] = 250.0 + j
+            lib.otfmi_context_evaluate(worker, 4, x, 2, y)
+            ott.assert_almost_equal(list(y), f(list(x)))
+        lib.otfmi_context_free(worker)
+
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        list(executor.map(simulate, range(8)))
+    for worker in workers:
+        lib.otfmi_context_free(worker)
+    shutil.rmtree(temp_path)
+
+
 # note : the GUI model wrapping the OT object is not checked in these tests as
 # tests, as command line omc does not support the input/output connectors used
 # by OMEdit.
+
+
+@pytest.mark.skipif(shutil.which("cmake") is None, reason="requires cmake")
+def test_export_batch(tmp_path, monkeypatch):
+    monkeypatch.setenv("OTFMI_CACHE_DIR", str(tmp_path / "cache"))
+    functions = [ot.SymbolicFunction(["E", "F", "L", "I"], [f"(F*L^3)/({k}.0*E*I)"]) for k in range(1, 4)]
+    paths = [tmp_path / f"f{k}" / f"Deviation{k}.mo" for k in range(len(functions))]
+    with pytest.raises(ValueError):
+        otfmi.export_batch(functions, [tmp_path / "Deviation.mo"] * len(functions), mode="pyprocess")
+    for path in paths:
+        path.parent.mkdir()
+    otfmi.export_batch(functions, paths, mode="pyprocess", n_jobs=2)
+    for path in paths:
+        assert path.exists(), f"model not created in file {path}"
+        assert len(glob.glob(str(path.parent / "*cwrapper*"))) > 0, "lib file not created"
+    assert len(list((tmp_path / "cache").glob("*/*"))) == len(functions)
+
+    # cpython wrapper, which must not depend on the removed batch directory
+    path = tmp_path / "cpython" / "Deviation.mo"
+    path.parent.mkdir()
+    otfmi.export_batch(functions[:1], [path], mode="cpython")
+    path_lib = [lib for lib in path.parent.glob("*cwrapper*") if lib.suffix in [".so", ".dylib", ".dll"]][0]
+    lib = ctypes.CDLL(str(path_lib))
+    lib.otfmi_context_new.restype = ctypes.c_void_p
+    lib.otfmi_context_free.argtypes = [ctypes.c_void_p]
+    array_type = ctypes.POINTER(ctypes.c_double)
+    lib.otfmi_context_evaluate.argtypes = [ctypes.c_void_p, ctypes.c_int, array_type, ctypes.c_int, array_type]
+    context = lib.otfmi_context_new()
+    x = (ctypes.c_double * 4)(3.1e7, 3.1e4, 255.0, 420.0)
+    y = (ctypes.c_double * 1)()
+    lib.otfmi_context_evaluate(context, 4, x, 1, y)
+    ott.assert_almost_equal(list(y), functions[0](list(x)))
+    lib.otfmi_context_free(context)
+
+    # command line, from an OpenTURNS study
+    study = ot.Study()
+    study.setStorageManager(ot.XMLStorageManager(str(tmp_path / "study.xml")))
+    study.add("deviation", functions[0])
+    study.add("distribution", ot.Normal())
+    study.save()
+    subprocess.run([sys.executable, "-c", "from otfmi.function_exporter import main; main()",
+                    str(tmp_path / "study.xml"), str(tmp_path / "cli"), "--format", "mo", "--mode", "pyprocess"],
+                   check=True)
+    assert (tmp_path / "cli" / "deviation" / "Deviation.mo").exists()
+    assert not (tmp_path / "cli" / "distribution").exists()
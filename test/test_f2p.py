@@ -4,7 +4,9 @@ import openturns as ot
 import openturns.testing as ott
 import otfmi
 import otfmi.example.utility
+import numpy as np
 import pytest
+import types
 
 
 @pytest.fixture
@@ -59,3 +61,96 @@ def test_mesh_time(path_fmu, mesh):
                                           inputs_fmu=["infection_rate", "healing_rate"],
                                           outputs_fmu=["infected"],
                                           start_time=30, final_time=40)
+
+
+@pytest.mark.parametrize("kind", ["linear", "zoh", "spline"])
+def test_input_interpolation(kind):
+    """Check the interpolation of inputs with constant runs."""
+    rng = np.random.default_rng(0)
+    time = np.cumsum(rng.uniform(0.1, 1.0, 100))
+    value = rng.normal(size=(100, 2))
+    value[20:50] = value[20]
+    interpolation = otfmi.fmi.InputInterpolation(time, value, kind=kind)
+    reference = otfmi.fmi.InputInterpolation(time, value, kind=kind, compress=False)
+    assert len(interpolation._time) < len(time)
+    if kind == "zoh":
+        # the jumps, the constant run excepted
+        np.testing.assert_array_equal(interpolation.breakpoints, np.delete(time[1:], np.arange(20, 49)))
+    else:
+        assert len(interpolation.breakpoints) == 0
+    query = rng.uniform(time[0] - 1.0, time[-1] + 1.0, 1000)
+    for t in np.concatenate((np.sort(query), query)):
+        np.testing.assert_allclose(interpolation(t), reference(t), atol=1e-14)
+        if kind == "linear":
+            expected = [np.interp(t, time, value[:, j]) for j in range(2)]
+            np.testing.assert_allclose(interpolation(t), expected, atol=1e-14)
+    np.testing.assert_allclose([interpolation(t) for t in time], value, atol=1e-14)
+
+
+@pytest.mark.parametrize("kind", ["zoh", "spline"])
+def test_simulate_interpolation(path_fmu, mesh, kind):
+    """Check the interpolation kind of a constant input field."""
+    midlevel = otfmi.OpenTURNSFMUFieldToPointFunction(path_fmu, mesh,
+                                                      inputs_fmu=["infection_rate", "healing_rate"],
+                                                      outputs_fmu=["infected"])
+    n = mesh.getVerticesNumber()
+    input_value = [[0.007, 0.02]] * n
+    y_linear = midlevel._exec(input_value)
+    y = midlevel._exec(input_value, interpolation=kind)
+    ott.assert_almost_equal(y, y_linear)
+
+
+class FMUModelME2Recorder:
+    """Stand-in model exchange model recording its simulate calls."""
+
+    def __init__(self):
+        self.time = 0.0
+        self.calls = []
+
+    def get_version(self):
+        return "2.0"
+
+    def get_variable_data_type(self, name):
+        return otfmi.fmi.pyfmi.fmi.FMI2_REAL
+
+    def get_variable_valueref(self, name):
+        return 0
+
+    def get_real(self, refs):
+        return [self.u[0]]
+
+    def get_default_experiment_start_time(self):
+        return 0.0
+
+    def get_default_experiment_stop_time(self):
+        return 1.0
+
+    def simulate_options(self):
+        return {"ncp": 500}
+
+    def simulate(self, start_time, final_time, options, input):
+        self.calls.append((start_time, final_time, options["ncp"], options.get("initialize", True)))
+        handler = options["result_handler"]
+        handler.simulation_start()
+        for t in np.linspace(start_time, final_time, options["ncp"] + 1):
+            self.time = t
+            self.u = input[1](t)
+            handler.integration_point()
+        handler.simulation_end()
+        return types.SimpleNamespace(result_data=handler.get_result())
+
+
+def test_simulate_segments():
+    """Check that model exchange simulations are restarted at the input jumps."""
+    model = FMUModelME2Recorder()
+    interpolation = otfmi.fmi.InputInterpolation([0.0, 2.0, 4.0, 6.0, 10.0], [[1.0], [1.0], [3.0], [3.0], [5.0]], kind="zoh")
+    handler = otfmi.fmi.ArrayResultHandler(model, ["u"])
+    simulation = otfmi.fmi.simulate(model, reset=False, start_time=0.0, final_time=8.0,
+                                    options={"ncp": 80, "result_handler": handler}, input=(["u"], interpolation))
+    assert model.calls == [(0.0, 4.0, 40, True), (4.0, 8.0, 40, False)]
+    result = simulation.result_data
+    assert len(result.time) == 82
+    # the end of the first segment and the start of the second one are both recorded
+    np.testing.assert_allclose(result.time[39:43], [3.9, 4.0, 4.0, 4.1])
+    np.testing.assert_array_equal(result.values[39:43, 0], [1.0, 3.0, 3.0, 3.0])
+    assert not handler.append
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+
+import subprocess
+import sys
+
+# generous bound on the import time of otfmi itself, its mandatory
+# dependencies being already imported: importing the exporter eagerly
+# exceeds it, machine load does not
+IMPORT_TIME_BUDGET = 2.0
+
+code = """
+import sys
+import time
+import numpy
+import openturns
+import pyfmi
+t0 = time.perf_counter()
+import otfmi
+print(time.perf_counter() - t0)
+print(" ".join(sorted(sys.modules)))
+"""
+
+
+def test_import_lazy():
+    """Check that importing otfmi is cheap and does not load the exporter and its dependencies."""
+    cp = subprocess.run([sys.executable, "-c", code], capture_output=True, check=True, text=True)
+    elapsed, modules = cp.stdout.splitlines()[-2:]
+    assert float(elapsed) < IMPORT_TIME_BUDGET
+    modules = modules.split()
+    assert "otfmi.otfmi" in modules
+    for name in ["otfmi.function_exporter", "otfmi.codegen", "otfmi.pool", "dill", "jinja2", "pythonfmu"]:
+        assert name not in modules, name
+
+
+def test_lazy_attributes():
+    import otfmi
+
+    assert "FunctionExporter" in dir(otfmi)
+    assert otfmi.FunctionExporter.__module__ == "otfmi.function_exporter"
+    assert callable(otfmi.mo2fmu)
+    assert set(otfmi.__all__) <= set(dir(otfmi))
@@ -1,9 +1,11 @@
 #!/usr/bin/env python
 
 import openturns as ot
+import openturns.testing as ott
 import otfmi
 import otfmi.example.utility
 import pytest
+from pathlib import Path
 
 
 @pytest.fixture
@@ -17,6 +19,22 @@ def mesh():
     return ot.RegularGrid(2.0, 0.5, 50)
 
 
+@pytest.fixture(scope="module")
+def lowlevel(tmp_path_factory):
+    """Model exchange build of the epid model, required by the sensitivities."""
+    path_mo = Path(otfmi.example.utility.__file__).parent / "file" / "epid.mo"
+    path_fmu = tmp_path_factory.mktemp("epid") / "epid.fmu"
+    otfmi.mo2fmu(path_mo, path_fmu, fmuType="me")
+    return otfmi.OpenTURNSFMUPointToFieldFunction(
+        path_fmu,
+        ot.RegularGrid(0.0, 1.0, 51),
+        inputs_fmu=["infection_rate", "healing_rate"],
+        outputs_fmu=["infected"],
+        kind="ME",
+        final_time=50.0,
+    )
+
+
 def test_default_mesh(path_fmu):
     _ = otfmi.FMUPointToFieldFunction(path_fmu,
                                       inputs_fmu=["infection_rate", "healing_rate"],
@@ -52,3 +70,100 @@ def test_mesh_time(path_fmu, mesh):
                                           inputs_fmu=["infection_rate", "healing_rate"],
                                           outputs_fmu=["infected"],
                                           start_time=30, final_time=40)
+
+
+def test_sensitivity(lowlevel):
+    """Check forward sensitivities against finite differences."""
+    x = [0.5, 0.1]
+    values, jacobian = lowlevel.computeSensitivity(x)
+    assert jacobian.getOutputDimension() == 2
+    ott.assert_almost_equal(values.getValues(), lowlevel._exec(x), 1e-6, 1e-6)
+
+    h = 1e-6
+    for i in range(len(x)):
+        xh = list(x)
+        xh[i] += h
+        fd = (ot.Sample(lowlevel._exec(xh)) - values.getValues()) / h
+        ott.assert_almost_equal(jacobian.getValues().getMarginal(i), fd, 1e-3, 1e-2)
+
+
+def test_least_squares_gradient(lowlevel):
+    """Check the least squares objective gradient against finite differences."""
+    observations = lowlevel._exec([0.45, 0.12]).asPoint()
+
+    def objective(x):
+        residual = lowlevel._exec(x).asPoint() - observations
+        return residual.normSquare()
+
+    x = [0.5, 0.1]
+    value, gradient = lowlevel.computeLeastSquaresGradient(x, observations, "infected")
+    ott.assert_almost_equal(value, objective(x), 1e-5, 1e-5)
+    h = 1e-6
+    for i in range(len(x)):
+        xh = list(x)
+        xh[i] += h
+        ott.assert_almost_equal(gradient[i], (objective(xh) - objective(x)) / h, 1e-3, 1e-2)
+
+    # same gradient as the contraction of the forward sensitivities
+    values, jacobian = lowlevel.computeSensitivity(x)
+    residual = values.getValues().asPoint() - observations
+    forward = [2.0 * residual.dot(jacobian.getValues().getMarginal(i).asPoint()) for i in range(len(x))]
+    ott.assert_almost_equal(gradient, forward, 1e-4, 1e-6)
+
+
+def test_trajectory_store(path_fmu, mesh, tmp_path):
+    """Check trajectories written to disk against the ProcessSample."""
+    lowlevel = otfmi.OpenTURNSFMUPointToFieldFunction(
+        path_fmu, mesh,
+        inputs_fmu=["infection_rate", "healing_rate"],
+        outputs_fmu=["infected", "susceptible"])
+    function = ot.PointToFieldFunction(lowlevel)
+    inputs = ot.Sample([[0.007, 0.02], [0.005, 0.03], [0.006, 0.025]])
+    expected = function(inputs)
+
+    store = lowlevel.computeTrajectoryStore(inputs[:2], tmp_path / "partial")
+    assert store.get_completed().tolist() == [True, True]
+
+    store = lowlevel.computeTrajectoryStore(inputs, tmp_path / "store")
+    reader = otfmi.storage.TrajectoryStore(tmp_path / "store")
+    assert reader.get_completed().all()
+    process_sample = reader.to_process_sample()
+    assert process_sample.getSize() == 3
+    for i in range(3):
+        ott.assert_almost_equal(process_sample[i], expected[i])
+    ott.assert_almost_equal(reader[1].to_process_sample()[0], expected[1])
+    ott.assert_almost_equal(reader.get_marginal("susceptible")[2], expected[2].getMarginal(1).asPoint())
+
+
+def test_statistics(path_fmu, mesh):
+    """Check streaming statistics against the ProcessSample ones."""
+    lowlevel = otfmi.OpenTURNSFMUPointToFieldFunction(
+        path_fmu, mesh,
+        inputs_fmu=["infection_rate", "healing_rate"],
+        outputs_fmu=["infected"])
+    function = ot.PointToFieldFunction(lowlevel)
+    inputs = ot.JointDistribution([ot.Uniform(0.005, 0.007), ot.Uniform(0.02, 0.03)]).getSample(10)
+    expected = function(inputs)
+    statistics = lowlevel.computeStatistics(inputs[:4], quantile_levels=[0.5])
+    statistics.merge(lowlevel.computeStatistics(inputs[4:], quantile_levels=[0.5]))
+    ott.assert_almost_equal(statistics.get_mean().getValues(), expected.computeMean().getValues())
+    ott.assert_almost_equal(statistics.get_variance().getValues(), expected.computeVariance().getValues())
+
+
+def test_sobol_indices(path_fmu, mesh):
+    """Check streaming Sobol' indices against the ones of the whole design."""
+    lowlevel = otfmi.OpenTURNSFMUPointToFieldFunction(
+        path_fmu, mesh,
+        inputs_fmu=["infection_rate", "healing_rate"],
+        outputs_fmu=["infected"])
+    function = ot.PointToFieldFunction(lowlevel)
+    distribution = ot.JointDistribution([ot.Uniform(0.005, 0.007), ot.Uniform(0.02, 0.03)])
+    size = 20
+    ot.RandomGenerator.SetSeed(0)
+    sobol = lowlevel.computeSobolIndices(distribution, size)
+    ot.RandomGenerator.SetSeed(0)
+    design = ot.SobolIndicesExperiment(distribution, size).generate()
+    output_design = function(design)
+    vertex = mesh.getVerticesNumber() - 1
+    algorithm = ot.SaltelliSensitivityAlgorithm(design, output_design.getSampleAtVertex(vertex), size)
+    ott.assert_almost_equal(sobol.get_first_order_indices().getValues()[vertex], algorithm.getFirstOrderIndices())
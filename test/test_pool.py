@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+
+import openturns as ot
+import openturns.testing as ott
+import otfmi
+import otfmi.example.utility
+import pytest
+
+
+def test_pool_symbolic():
+    function = ot.SymbolicFunction(["x1", "x2"], ["x1 + 2 * x2", "x1 * x2"])
+    x = ot.Normal(2).getSample(20)
+    with otfmi.FMUPool(function, max_workers=2, warmup_input=[0.0, 0.0]) as pool:
+        y = pool.map(x, chunksize=3)
+        ott.assert_almost_equal(ot.Sample(y), function(x))
+        # the workers are reused
+        ott.assert_almost_equal(ot.Sample(pool.map(x[:5])), function(x[:5]))
+    with pytest.raises(RuntimeError):
+        pool.map(x)
+
+
+def test_pool_error():
+    function = ot.SymbolicFunction(["x"], ["x"])
+    pool = otfmi.FMUPool(function, max_workers=2, prewarm=False)
+    with pytest.raises(Exception):
+        # wrong input dimension
+        pool.map([[1.0, 2.0]])
+    # the pool is still usable
+    assert pool.map([[3.0]]) == [ot.Point([3.0])]
+    pool.shutdown()
+
+
+def test_pool_fmu():
+    path_fmu = otfmi.example.utility.get_path_fmu("deviation")
+    model_fmu = otfmi.FMUFunction(path_fmu, inputs_fmu=["E", "F", "L", "I"], outputs_fmu="y")
+    x = ot.Sample([[3e4, 3e4, 250.0, 400.0], [3.1e4, 2.9e4, 260.0, 390.0]] * 4)
+    with otfmi.FMUPool(model_fmu, max_workers=2, warmup_input=x[0]) as pool:
+        y = pool.map(x)
+    ott.assert_almost_equal(ot.Sample(y), model_fmu(x))
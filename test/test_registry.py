@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+
+import concurrent.futures
+import gc
+import openturns as ot
+import openturns.testing as ott
+import otfmi
+import otfmi.example.utility
+import otfmi.registry
+import os
+import pickle
+import zipfile
+
+
+class Recorder:
+    """Stand-in function class recording its construction."""
+
+    def __init__(self, path_fmu, mesh=None, scale=1.0):
+        self.mesh = mesh
+        self.scale = scale
+
+    def __call__(self, x):
+        return [self.scale * x[0], os.getpid()]
+
+
+def test_handle_cache(tmp_path):
+    path = tmp_path / "model.fmu"
+    path.write_bytes(b"fmu")
+    mesh = ot.Mesh(ot.Sample([[0.0], [0.5], [2.0]]))
+    handle = otfmi.FMUHandle(Recorder, path, mesh=mesh, scale=2.0)
+    function = handle.get_function()
+    assert handle.get_function() is function
+    assert function.mesh.getVertices() == mesh.getVertices()
+    # the handle is resolved to the same instance after a round trip
+    assert pickle.loads(pickle.dumps(handle)).get_function() is function
+    assert handle([3.0])[0] == 6.0
+    # the key depends on the content of the fmu and on the arguments
+    grid = ot.RegularGrid(0.0, 0.1, 11)
+    other = otfmi.FMUHandle(Recorder, path, mesh=grid, scale=2.0)
+    assert other.key != handle.key
+    assert other.get_function().mesh == grid
+    path.write_bytes(b"modified fmu")
+    assert otfmi.FMUHandle(Recorder, path, mesh=mesh, scale=2.0).key != handle.key
+    otfmi.registry.clear()
+    assert handle.get_function() is not function
+
+
+def test_handle_directory(tmp_path):
+    (tmp_path / "binaries" / "linux64").mkdir(parents=True)
+    (tmp_path / "modelDescription.xml").write_text("<fmiModelDescription/>")
+    (tmp_path / "binaries" / "linux64" / "model.so").write_bytes(b"binary")
+    handle = otfmi.FMUHandle(Recorder, tmp_path, scale=2.0)
+    assert handle([3.0])[0] == 6.0
+    assert otfmi.FMUHandle(Recorder, tmp_path, scale=2.0).key == handle.key
+    (tmp_path / "binaries" / "linux64" / "model.so").write_bytes(b"rebuilt binary")
+    assert otfmi.FMUHandle(Recorder, tmp_path, scale=2.0).key != handle.key
+
+
+def test_handle_executor():
+    path_fmu = otfmi.example.utility.get_path_fmu("deviation")
+    handle = otfmi.FMUHandle(otfmi.FMUFunction, path_fmu, inputs_fmu=["E", "F", "L", "I"], outputs_fmu="y")
+    model_fmu = handle.get_function()
+    assert len(pickle.dumps(handle)) < len(pickle.dumps(model_fmu))
+    x = ot.Sample([[3e4, 3e4, 250.0, 400.0], [3.1e4, 2.9e4, 260.0, 390.0]] * 4)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+        y = list(executor.map(handle, x))
+    ott.assert_almost_equal(ot.Sample(y), model_fmu(x))
+
+
+def test_unzipped(tmp_path):
+    path = tmp_path / "model.fmu"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("modelDescription.xml", "<fmiModelDescription/>")
+    directory, key = otfmi.registry.acquire_unzipped(path)
+    assert os.path.isfile(os.path.join(directory, "modelDescription.xml"))
+    assert otfmi.registry.acquire_unzipped(path) == (directory, key)
+    assert otfmi.registry.get_unzipped()[directory] == 2
+    otfmi.registry.release_unzipped(key)
+    assert os.path.isdir(directory)
+    otfmi.registry.release_unzipped(key)
+    assert not os.path.exists(directory)
+    assert directory not in otfmi.registry.get_unzipped()
+
+
+def test_shared_model():
+    path_fmu = otfmi.example.utility.get_path_fmu("deviation")
+    # other functions of this fmu may be alive in this process
+    directory, key = otfmi.registry.acquire_unzipped(path_fmu)
+    count = otfmi.registry.get_unzipped()[directory]
+    model_fmu = otfmi.FMUFunction(path_fmu, inputs_fmu=["E", "F", "L", "I"], outputs_fmu="y")
+    marginal = otfmi.FMUPointToFieldFunction(path_fmu, inputs_fmu=["E", "F", "L", "I"], outputs_fmu="y")
+    assert otfmi.registry.get_unzipped()[directory] == count + 2
+    x = [3e4, 3e4, 250.0, 400.0]
+    assert abs(model_fmu(x)[0] - marginal(x).getValues()[-1, 0]) < 1e-12
+    # pickling does not release the model of the original function
+    assert pickle.loads(pickle.dumps(model_fmu))(x) == model_fmu(x)
+    del model_fmu, marginal
+    gc.collect()
+    assert otfmi.registry.get_unzipped()[directory] == count
+    otfmi.registry.release_unzipped(key)
+
+
+def test_resolve_kind():
+    both = '<fmiModelDescription fmiVersion="2.0"><ModelExchange/><CoSimulation/></fmiModelDescription>'
+    cosimulation = '<fmiModelDescription fmiVersion="2.0"><CoSimulation/></fmiModelDescription>'
+    assert otfmi.otfmi._resolve_kind(both, None) == "CS"
+    assert otfmi.otfmi._resolve_kind(both, "auto") == "ME"
+    assert otfmi.otfmi._resolve_kind(cosimulation, "AUTO") == "CS"
+    assert otfmi.otfmi._resolve_kind(both, "me") == "ME"
+    # other kinds are left to pyfmi
+    assert otfmi.otfmi._resolve_kind(both, "ME_CS") is None
+
+
+def test_instantiated_once(tmp_path, monkeypatch):
+    description = ('<fmiModelDescription fmiVersion="2.0"><ModelExchange modelIdentifier="m"/>'
+                   '<CoSimulation modelIdentifier="m" canBeInstantiatedOnlyOncePerProcess="true"/></fmiModelDescription>')
+    assert otfmi.otfmi._instantiated_once(description, "CS")
+    assert not otfmi.otfmi._instantiated_once(description, "ME")
+    # such a co-simulation fmu is loaded by pyfmi from its own directory
+    path = tmp_path / "model.fmu"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("modelDescription.xml", description)
+    loaded = []
+    monkeypatch.setattr(otfmi.fmi, "load_fmu", lambda path_fmu, kind=None, **kwargs: loaded.append(kind) or "model")
+    base = otfmi.otfmi._FMUBaseFunction.__new__(otfmi.otfmi._FMUBaseFunction)
+    directories = otfmi.registry.get_unzipped()
+    base.load_fmu(path, kind="CS")
+    assert (base._model, loaded) == ("model", ["CS"])
+    assert otfmi.registry.get_unzipped() == directories
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+
+import openturns as ot
+import otfmi.storage
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def mesh():
+    return ot.RegularGrid(0.0, 0.5, 20)
+
+
+def test_store(mesh, tmp_path):
+    values = np.random.default_rng(0).normal(size=(4, 20, 2))
+    store = otfmi.storage.TrajectoryStore.create(tmp_path, mesh, 4, ["x", "y"])
+    for i in [0, 2]:
+        store.write(i, values[i])
+
+    # partial results are readable while the store is filled
+    reader = otfmi.storage.TrajectoryStore(tmp_path)
+    assert reader.get_completed().tolist() == [True, False, True, False]
+    np.testing.assert_array_equal(reader[2].to_numpy()[0], values[2])
+    with pytest.raises(ValueError):
+        reader.write(1, values[1])
+
+    for i in [1, 3]:
+        store.write(i, values[i])
+    store.flush()
+    assert len(reader) == 4
+    assert list(reader.get_description()) == ["x", "y"]
+    assert reader.get_mesh().getVerticesNumber() == 20
+    np.testing.assert_array_equal(reader.to_numpy(), values)
+    np.testing.assert_array_equal(reader[1:3].get_marginal("y"), values[1:3, :, 1])
+    np.testing.assert_array_equal(reader[[3, 0]].to_numpy(), values[[3, 0]])
+    process_sample = reader[::2].to_process_sample()
+    assert process_sample.getSize() == 2
+    np.testing.assert_array_equal(np.asarray(process_sample[1]), values[2])
+
+    with pytest.raises(FileExistsError):
+        otfmi.storage.TrajectoryStore.create(tmp_path, mesh, 4, ["x", "y"])
+
+
+@pytest.mark.parametrize("precision", ["float32", "int16"])
+def test_store_precision(mesh, tmp_path, precision):
+    values = np.random.default_rng(0).normal(size=(3, 20, 2)) * [1.0, 100.0]
+    store = otfmi.storage.TrajectoryStore.create(tmp_path, mesh, 3, ["x", "y"], precision)
+    for i in range(3):
+        store.write(i, values[i])
+    store.flush()
+    reader = otfmi.storage.TrajectoryStore(tmp_path)
+    assert reader.get_precision() == precision
+    assert np.load(tmp_path / "output_0.npy", mmap_mode="r").dtype == np.dtype(precision)
+    tolerance = 1e-6 if precision == "float32" else 1e-4
+    restored = reader.to_numpy()
+    assert restored.dtype == np.float64
+    np.testing.assert_allclose(restored, values, rtol=tolerance, atol=tolerance * np.ptp(values))
+    np.testing.assert_allclose(reader[1:].get_marginal("y"), values[1:, :, 1], rtol=tolerance, atol=tolerance * np.ptp(values))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+import openturns as ot
+import otfmi.streaming
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def mesh():
+    return ot.RegularGrid(0.0, 0.5, 10)
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(0)
+    return rng.normal(size=(2000, 10, 2)) * np.linspace(1.0, 2.0, 10)[:, np.newaxis] + np.arange(2.0)
+
+
+def test_field_statistics(mesh, values):
+    statistics = otfmi.streaming.FieldStatistics(mesh, 2, [0.1, 0.5, 0.9])
+    statistics.update_sample(values)
+    assert statistics.count == len(values)
+    np.testing.assert_allclose(statistics.get_mean().getValues(), values.mean(axis=0))
+    np.testing.assert_allclose(statistics.get_variance().getValues(), values.var(axis=0, ddof=1))
+    np.testing.assert_array_equal(statistics.get_min().getValues(), values.min(axis=0))
+    np.testing.assert_array_equal(statistics.get_max().getValues(), values.max(axis=0))
+    for level in [0.1, 0.5, 0.9]:
+        quantile = np.asarray(statistics.get_quantile(level).getValues())
+        np.testing.assert_allclose(quantile, np.quantile(values, level, axis=0), atol=0.15)
+    with pytest.raises(ValueError):
+        statistics.get_quantile(0.2)
+
+
+@pytest.mark.parametrize("split", [3, 700])
+def test_merge(mesh, values, split):
+    statistics = otfmi.streaming.FieldStatistics(mesh, 2, [0.25, 0.75])
+    statistics.update_sample(values[:split])
+    other = otfmi.streaming.FieldStatistics(mesh, 2, [0.25, 0.75])
+    other.update_sample(values[split:])
+    statistics.merge(other)
+    assert statistics.count == len(values)
+    np.testing.assert_allclose(statistics.get_mean().getValues(), values.mean(axis=0))
+    np.testing.assert_allclose(statistics.get_variance().getValues(), values.var(axis=0, ddof=1))
+    np.testing.assert_array_equal(statistics.get_max().getValues(), values.max(axis=0))
+    for level in [0.25, 0.75]:
+        quantile = np.asarray(statistics.get_quantile(level).getValues())
+        np.testing.assert_allclose(quantile, np.quantile(values, level, axis=0), atol=0.15)
+
+
+def test_merge_moments(mesh, values):
+    statistics = otfmi.streaming.FieldStatistics(mesh, 2)
+    statistics.update_sample(values[:2])
+    other = otfmi.streaming.FieldStatistics(mesh, 2)
+    other.update_sample(values[2:])
+    statistics.merge(other)
+    np.testing.assert_allclose(statistics.get_mean().getValues(), values.mean(axis=0))
+    np.testing.assert_allclose(statistics.get_variance().getValues(), values.var(axis=0, ddof=1))
+
+
+@pytest.mark.parametrize("block_size", [7, 100])
+def test_incremental_pod(mesh, block_size):
+    rng = np.random.default_rng(0)
+    t = np.linspace(0.0, 1.0, 10)
+    coefficients = rng.normal(size=(300, 3)) * [3.0, 2.0, 1.0]
+    values = np.stack([coefficients @ np.array([np.sin(t), t, t ** 2]),
+                       coefficients @ np.array([np.cos(t), t ** 3, -t])], axis=-1) + 5.0
+    pod = otfmi.streaming.IncrementalPOD(mesh, 2, n_modes=5, block_size=block_size)
+    pod.update_sample(values[:200])
+    other = otfmi.streaming.IncrementalPOD(mesh, 2, n_modes=5, block_size=block_size)
+    other.update_sample(values[200:])
+    pod.merge(other)
+
+    assert pod.count == 300
+    centered = (values - values.mean(axis=0)).reshape(300, -1)
+    expected = np.linalg.svd(centered, compute_uv=False)[:3]
+    np.testing.assert_allclose(pod.get_singular_values(), expected, rtol=1e-8)
+    np.testing.assert_allclose(pod.get_mean().getValues(), values.mean(axis=0))
+    reconstructed = pod.reconstruct(pod.get_coefficients())
+    assert reconstructed.getSize() == 300
+    np.testing.assert_allclose(np.asarray(reconstructed[123]), values[123], atol=1e-8)
+    modes = pod.get_modes()
+    assert modes.getSize() == 3
+
+
+def test_field_sobol_indices(mesh):
+    ot.RandomGenerator.SetSeed(0)
+    distribution = ot.JointDistribution([ot.Uniform(-np.pi, np.pi)] * 3)
+    size = 200
+    design = np.asarray(ot.SobolIndicesExperiment(distribution, size).generate())
+    t = np.linspace(0.5, 1.5, 10)
+    x1, x2, x3 = design[:, 0:1], design[:, 1:2], design[:, 2:3]
+    values = np.stack([np.sin(x1) * t + 7.0 * np.sin(x2) ** 2 + 0.1 * x3 ** 4 * np.sin(x1) * t ** 2,
+                       x1 * t + x2], axis=-1) + 100.0
+
+    sobol = otfmi.streaming.FieldSobolIndices(mesh, 2, 3)
+    sobol.update_sample(values, size)
+    # same design fed by rows to two accumulators
+    rows = values.reshape(5, size, 10, 2)
+    first = otfmi.streaming.FieldSobolIndices(mesh, 2, 3)
+    second = otfmi.streaming.FieldSobolIndices(mesh, 2, 3)
+    for k in range(size):
+        (first if k < 80 else second).update(rows[:, k])
+    first.merge(second)
+
+    for output in range(2):
+        for vertex in [0, 9]:
+            output_design = ot.Sample(values[:, vertex, output:output + 1])
+            saltelli = ot.SaltelliSensitivityAlgorithm(ot.Sample(design), output_design, size)
+            jansen = ot.JansenSensitivityAlgorithm(ot.Sample(design), output_design, size)
+            for estimator in [sobol, first]:
+                np.testing.assert_allclose(estimator.get_first_order_indices(output).getValues()[vertex],
+                                           saltelli.getFirstOrderIndices(), atol=1e-10)
+                np.testing.assert_allclose(estimator.get_total_order_indices(output).getValues()[vertex],
+                                           jansen.getTotalOrderIndices(), atol=1e-10)